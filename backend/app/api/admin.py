@@ -0,0 +1,52 @@
+"""Admin API: POST /api/admin/storage/sweep (storage lifecycle; dry run by default), GET /api/admin/cache, GET /api/admin/profiles."""
+import hmac
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from app.config import settings
+from app.profiling import PROFILE_DIRNAME, list_profiles, resolve_profile
+from app.schemas import ProfileInfo
+
+from app.services.artifacts import artifact_cache
+from app.services.lifecycle import sweep
+
+router = APIRouter()
+
+
+@router.post("/admin/storage/sweep")
+def storage_sweep(
+    dry_run: bool = Query(True, description="Only report what would be deleted/compacted and the bytes reclaimed"),
+    x_admin_token: str | None = Header(None),
+):
+    """Run one lifecycle sweep now (retention deletes + compaction of completed jobs) and return its report.
+
+    Applying it (dry_run=false) deletes files and jobs: it needs X-Admin-Token matching admin_token.
+    """
+    if not dry_run:
+        if not settings.admin_token:
+            raise HTTPException(403, "Applying a sweep over HTTP is disabled (set ADMIN_TOKEN), use python -m app.services.lifecycle --apply")
+        if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.admin_token):
+            raise HTTPException(403, "Invalid or missing X-Admin-Token")
+    return sweep(dry_run=dry_run)
+
+
+@router.get("/admin/cache")
+def cache_stats():
+    """Hit/miss counts and size of this process's parsed-artifact cache."""
+    return {"artifacts": artifact_cache.stats()}
+
+
+@router.get("/admin/profiles", response_model=list[ProfileInfo])
+def request_profiles():
+    """Saved profiles of requests not tied to a job (job routes save theirs with the job), newest first."""
+    return list_profiles(settings.storage_root / PROFILE_DIRNAME)
+
+
+@router.get("/admin/profiles/{name}")
+def request_profile(name: str):
+    """Download one request profile (.pstats or .folded)."""
+    path = resolve_profile(settings.storage_root / PROFILE_DIRNAME, name)
+    if path is None:
+        raise HTTPException(404, "Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
@@ -1,20 +1,46 @@
-"""Export API: GET /api/jobs/:id/export?format=md|json, PATCH /api/jobs/:id/spec (edit), POST regenerate AC."""
+"""Export API: GET /api/jobs/:id/export?format=md|json|csv|jira|linear, POST /api/jobs/bulk-export (ZIP), POST regenerate AC, screenshots, timeline sprites, execution trace, profiles."""
+import copy
 import json
+import logging
+from datetime import datetime
 from pathlib import Path
-from fastapi import APIRouter, Depends, HTTPException, Query, Body
-from fastapi.responses import PlainTextResponse, JSONResponse, FileResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, JSONResponse, FileResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, undefer_group
 
-from app.database import get_db
-from app.models import Job
+from app.database import get_async_db, get_db, SessionLocal
+from app.models import BLOBS, Job
 from app.config import settings
-from app.services.acceptance_criteria import generate_acceptance_criteria
+from app.schemas import BulkExportRequest, ProfileInfo
+from app.services.artifacts import read_json
+from app.services.export_cache import etag_matches, export_cache, negotiate_encoding
+from app.services.export_render import EXPORT_FORMATS, referenced_screenshot_ids, render_transcript_text
+from app.services.scheduler import INTERACTIVE, request_priority
+from app.services import stories
+from app.services.usage import UsageLedger, activate_ledger, job_budget_usd
+from app.services.screenshots import file_etag, resolve_screenshot, thumbnail
+from app.services.zip_stream import stream_zip
+from app.profiling import PROFILE_DIRNAME, list_profiles, resolve_profile
+from app.tracing import TRACE_FILENAME
+from app.workers.events import notify_job_changed
+from app.workers.pipeline import merge_ac_into_spec, record_checkpoint
 
 router = APIRouter()
+log = logging.getLogger("app.api.export")
 
+# Screenshot files are write-once per job (named by timestamp), so clients may cache them forever
+SCREENSHOT_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
-def _get_job_and_dir(job_id: str, db: Session):
-    job = db.query(Job).filter(Job.id == job_id).first()
+
+def _get_job_and_dir(job_id: str, db: Session, load_blobs: bool = False):
+    """Job row and its artifact dir; spec/AC/evidence columns stay unloaded unless load_blobs."""
+    q = db.query(Job)
+    if load_blobs:
+        q = q.options(undefer_group(BLOBS))
+    job = q.filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(404, "Job not found")
     job_dir = Path(settings.storage_root) / "jobs" / job_id
@@ -23,203 +49,287 @@ def _get_job_and_dir(job_id: str, db: Session):
     return job, job_dir
 
 
+async def _job_row_and_dir(job_id: str, db: AsyncSession, *columns):
+    """Async lookup of a few job columns plus the artifact dir; 404s like _get_job_and_dir."""
+    row = (await db.execute(select(Job.id, *columns).where(Job.id == job_id))).first()
+    if row is None:
+        raise HTTPException(404, "Job not found")
+    job_dir = Path(settings.storage_root) / "jobs" / job_id
+    if not job_dir.exists():
+        raise HTTPException(404, "Job artifacts not found")
+    return row, job_dir
+
+
 @router.get("/jobs/{job_id}/export")
-def export_job(
+async def export_job(
     job_id: str,
+    request: Request,
     format: str = Query("md", alias="format"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Export as markdown or JSON (Jira/Linear friendly)."""
-    job, job_dir = _get_job_and_dir(job_id, db)
+    """Export as markdown, JSON, CSV or Jira/Linear bulk-import JSON; cached per job version, compressed, ETag-aware."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(400, f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    job, job_dir = await _job_row_and_dir(job_id, db, Job.status, Job.updated_at)
     if job.status != "completed":
         raise HTTPException(400, "Job not completed")
-    spec = job.spec or {}
-    evidence_map = job.evidence_map or {}
-    # User stories now have nested acceptance_criteria
-    user_stories = spec.get("user_stories", []) or []
-
-    if format == "md":
-        lines = [
-            "# Feature summary",
-            "",
-            spec.get("feature_summary", ""),
-            "",
-            "## User stories",
-            "",
-        ]
-        for us in user_stories:
-            title = us.get("title", "")
-            persona = us.get("persona", "")
-            story_text = us.get("story_text", "")
-            tags = us.get("tags", [])
-            desc = us.get("description", "")
-            refs = us.get("evidence_refs", [])
-            acs = us.get("acceptance_criteria", [])
-            lines.append(f"### {title}")
-            lines.append("")
-            if persona:
-                persona_str = ", ".join(persona) if isinstance(persona, list) else persona
-                lines.append(f"**Persona:** {persona_str}")
-                lines.append("")
-            if story_text:
-                lines.append(f"*{story_text}*")
-                lines.append("")
-            elif desc:
-                lines.append(desc)
-                lines.append("")
-            if tags:
-                lines.append(f"**Tags:** {', '.join(tags)}")
-                lines.append("")
-            if refs:
-                lines.append("**Evidence:**")
-                for r in refs:
-                    ts = r.get("timestamp", 0)
-                    excerpt = r.get("transcript_excerpt", "")[:200]
-                    sid = r.get("screenshot_id", "")
-                    lines.append(f"- {ts}ms | {sid} | {excerpt}...")
-                lines.append("")
-            if acs:
-                lines.append("#### Acceptance criteria")
-                lines.append("")
-                for ac in acs:
-                    ac_id = ac.get('id', '')
-                    lines.append(f"**{ac_id}**")
-                    lines.append("")
-                    lines.append(f"**GIVEN** {ac.get('given', '')}")
-                    lines.append("")
-                    lines.append(f"**WHEN** {ac.get('when', '')}")
-                    lines.append("")
-                    lines.append(f"**THEN** {ac.get('then', '')}")
-                    and_list = ac.get("and", [])
-                    if and_list:
-                        for and_item in and_list:
-                            lines.append("")
-                            lines.append(f"**AND** {and_item}")
-                    lines.append("")
-                    ac_refs = ac.get("evidence_refs", [])
-                    if ac_refs:
-                        lines.append("Evidence:")
-                        for r in ac_refs:
-                            ts = r.get("timestamp", 0)
-                            excerpt = (r.get("transcript_excerpt", "") or "")[:200]
-                            sid = r.get("screenshot_id", "")
-                            lines.append(f"- {ts}ms | {sid} | {excerpt}...")
-                        lines.append("")
-            lines.append("")
-        lines.append("## Open questions")
-        lines.append("")
-        for q in spec.get("open_questions", []) or []:
-            lines.append(f"- {q}")
-        return PlainTextResponse("\n".join(lines), media_type="text/markdown")
-    elif format == "json":
-        payload = {
-            "feature_summary": spec.get("feature_summary", ""),
-            "user_stories": user_stories,
-            "open_questions": spec.get("open_questions", []),
-            "evidence_map": evidence_map,
-        }
-        return JSONResponse(payload)
-    raise HTTPException(400, "format must be md or json")
+    render, media_type, ext = EXPORT_FORMATS[format]
+    rendered = export_cache.get(job_id, format, job.updated_at)
+    if rendered is None:
+        # spec/evidence_map are only read from the DB on a cache miss; rendering is CPU work, off the loop
+        blobs = (
+            await db.execute(select(Job.spec, Job.evidence_map, Job.spec_version, Job.spec_view_version).where(Job.id == job_id))
+        ).one()
+        spec = blobs.spec
+        if blobs.spec_version != blobs.spec_view_version:  # story/AC edits since the blob was built
+            spec = await db.run_sync(stories.spec_from_rows, job_id, spec)
+        text = await run_in_threadpool(render, spec or {}, blobs.evidence_map or {})
+        rendered = export_cache.put(job_id, format, job.updated_at, media_type, text)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), len(rendered.body))
+    headers = {
+        "ETag": rendered.etag_for(encoding),
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept-Encoding",
+        "Content-Disposition": f'inline; filename="job-{job_id[:8]}.{ext}"',
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        body = rendered.cached_encoding(encoding)
+        if body is None:  # first request in this encoding: compressing a large export is CPU work too
+            body = await run_in_threadpool(export_cache.encoded, rendered, encoding)
+        return Response(body, media_type=rendered.media_type, headers=headers)
+    return Response(rendered.body, media_type=rendered.media_type, headers=headers)
+
+
+def _job_archive_entries(job_id: str, req: BulkExportRequest, summary: list[dict]):
+    """Archive entries for one job; loads the row in its own short session (the response outlives the request's)."""
+    with SessionLocal() as db:
+        job = db.query(Job).options(undefer_group(BLOBS)).filter(Job.id == job_id).first()
+        if job is None:
+            summary.append({"id": job_id, "included": False, "reason": "not found"})
+            return
+        status, updated_at = job.status, job.updated_at
+        spec, evidence_map = stories.current_spec(db, job) or {}, job.evidence_map or {}
+    job_dir = Path(settings.storage_root) / "jobs" / job_id
+    files = []
+    if status == "completed":
+        for fmt in req.formats:
+            render, media_type, ext = EXPORT_FORMATS[fmt]
+            rendered = export_cache.get_or_render(job_id, fmt, updated_at, media_type, lambda: render(spec, evidence_map))
+            files.append(f"spec.{ext}")
+            yield f"{job_id}/spec.{ext}", rendered.body
+    transcript_path = job_dir / "transcript.json"
+    if req.include_transcripts and transcript_path.exists():
+        files += ["transcript.json", "transcript.txt"]
+        yield f"{job_id}/transcript.json", transcript_path
+        segments = read_json(transcript_path).get("segments", [])
+        yield f"{job_id}/transcript.txt", render_transcript_text(segments).encode("utf-8")
+    manifest_path = job_dir / "screenshots" / "manifest.json"
+    if req.screenshots != "none" and manifest_path.exists():
+        wanted = referenced_screenshot_ids(spec) if req.screenshots == "referenced" else None
+        for entry in read_json(manifest_path):
+            sid = str(entry.get("timestamp_ms", ""))
+            path = job_dir / "screenshots" / entry.get("path", f"{sid}.png")
+            if (wanted is None or sid in wanted) and path.exists():
+                files.append(f"screenshots/{path.name}")
+                yield f"{job_id}/screenshots/{path.name}", path
+    summary.append({"id": job_id, "status": status, "included": True, "files": files})
+
+
+def _archive_entries(job_ids: list[str], req: BulkExportRequest):
+    summary: list[dict] = []
+    for job_id in job_ids:
+        yield from _job_archive_entries(job_id, req, summary)
+    yield "index.json", json.dumps({"generated_at": datetime.utcnow().isoformat(), "jobs": summary}, indent=2).encode()
+
+
+@router.post("/jobs/bulk-export")
+def bulk_export(req: BulkExportRequest, db: Session = Depends(get_db)):
+    """Stream a ZIP of specs, transcripts and (optionally) screenshots for many jobs, built on the fly."""
+    bad = [f for f in req.formats if f not in EXPORT_FORMATS]
+    if bad:
+        raise HTTPException(400, f"Unknown formats {bad}; use: {', '.join(EXPORT_FORMATS)}")
+    if req.job_ids:
+        job_ids = list(dict.fromkeys(req.job_ids))[: req.limit]
+    else:
+        q = db.query(Job.id)
+        if req.status:
+            q = q.filter(Job.status == req.status)
+        if req.created_after:
+            q = q.filter(Job.created_at >= req.created_after)
+        if req.created_before:
+            q = q.filter(Job.created_at < req.created_before)
+        job_ids = [row.id for row in q.order_by(Job.created_at, Job.id).limit(req.limit)]
+    if not job_ids:
+        raise HTTPException(404, "No jobs match")
+    log.info("bulk_export jobs=%s formats=%s screenshots=%s", len(job_ids), req.formats, req.screenshots)
+    filename = f"video2ac-export-{datetime.utcnow():%Y%m%d-%H%M%S}.zip"
+    return StreamingResponse(
+        stream_zip(_archive_entries(job_ids, req)),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.get("/jobs/{job_id}/transcript")
-def get_transcript(
+async def get_transcript(
     job_id: str,
     format: str = Query("txt", alias="format"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Download full transcript as JSON or plain text (one line per segment with timestamp)."""
-    job, job_dir = _get_job_and_dir(job_id, db)
+    job, job_dir = await _job_row_and_dir(job_id, db)
     transcript_path = job_dir / "transcript.json"
     if not transcript_path.exists():
         raise HTTPException(404, "Transcript not found")
-    data = json.loads(transcript_path.read_text())
+    data = await run_in_threadpool(read_json, transcript_path)
     segments = data.get("segments", [])
 
     if format == "json":
         return JSONResponse(data)
     if format == "txt":
-        lines = []
-        for s in segments:
-            start = s.get("start", 0)
-            end = s.get("end", 0)
-            text = (s.get("text", "") or "").strip()
-            # [MM:SS.mmm] text or [MM:SS.mmm - MM:SS.mmm] text
-            start_m = int(start // 60)
-            start_s = start % 60
-            end_m = int(end // 60)
-            end_s = end % 60
-            ts = f"[{start_m:02d}:{start_s:06.3f} - {end_m:02d}:{end_s:06.3f}]"
-            lines.append(f"{ts} {text}")
-        body = "\n".join(lines)
-        return PlainTextResponse(body, media_type="text/plain")
+        return PlainTextResponse(render_transcript_text(segments), media_type="text/plain")
     raise HTTPException(400, "format must be json or txt")
 
 
-@router.patch("/jobs/{job_id}/spec")
-def update_spec(job_id: str, body: dict = Body(...), db: Session = Depends(get_db)):
-    """Update job spec (for editing in UI); persist to DB and spec.json."""
-    job, job_dir = _get_job_and_dir(job_id, db)
-    job.spec = body
-    spec_path = job_dir / "spec.json"
-    spec_path.write_text(json.dumps(body, indent=2))
-    db.commit()
-    db.refresh(job)
-    return {"ok": True, "spec": job.spec}
-
-
 @router.post("/jobs/{job_id}/regenerate-ac")
 def regenerate_acceptance_criteria(job_id: str, db: Session = Depends(get_db)):
-    """Re-run AC generation from current spec; merge into spec.user_stories and update job."""
-    job, job_dir = _get_job_and_dir(job_id, db)
-    spec_path = job_dir / "spec.json"
-    if not spec_path.exists():
+    """Re-run AC generation from current spec; merge into spec.user_stories and update job.
+
+    The spec is written back only if nobody edited it during the model call (409 otherwise).
+    """
+    job, job_dir = _get_job_and_dir(job_id, db, load_blobs=True)
+    if not job.spec:
         raise HTTPException(400, "Spec not found; run pipeline first")
-    spec_data = json.loads(spec_path.read_text())
+    # The DB holds the current spec (row edits land there first); generate from it, and write the
+    # result back conditional on its version
+    base_spec, base_version = copy.deepcopy(stories.current_spec(db, job)), job.spec_version or 0
+    spec_path = job_dir / "spec.json"
+    stories.write_spec_file(job_dir, base_spec)
     ac_path = job_dir / "acceptance_criteria.json"
-    ac_data = generate_acceptance_criteria(str(spec_path), str(ac_path), job_dir)
+    from app.services.acceptance_criteria import generate_acceptance_criteria  # pulls in openai; keep off the import path
+
+    ledger = UsageLedger(job.usage, budget_usd=job_budget_usd(job))
+    ledger.stage = "regenerate_ac"
+    with request_priority(INTERACTIVE), activate_ledger(ledger):  # a user is waiting; go ahead of queued pipeline calls
+        ac_data = generate_acceptance_criteria(str(spec_path), str(ac_path), job_dir)
     # Merge ACs into spec.user_stories (preserve persona, story_text, tags from spec)
-    ac_stories = ac_data.get("user_stories", [])
-    if ac_stories:
-        spec_user_stories = spec_data.get("user_stories", [])
-        for i, spec_us in enumerate(spec_user_stories):
-            spec_us_id = spec_us.get("id", f"us-{i+1}")
-            matched = False
-            for ac_us in ac_stories:
-                if ac_us.get("id") == spec_us_id or (i < len(ac_stories) and ac_stories[i].get("id") == ac_us.get("id")):
-                    spec_us["acceptance_criteria"] = ac_us.get("acceptance_criteria", [])
-                    matched = True
-                    break
-            if not matched:
-                if i < len(ac_stories):
-                    spec_us["acceptance_criteria"] = ac_stories[i].get("acceptance_criteria", [])
-                else:
-                    spec_us["acceptance_criteria"] = []
-        spec_data["user_stories"] = spec_user_stories
-        spec_path.write_text(json.dumps(spec_data, indent=2))
-        job.spec = spec_data
+    spec_data = merge_ac_into_spec(copy.deepcopy(base_spec), ac_data) if ac_data.get("user_stories") else base_spec
+    try:
+        changed = stories.replace_spec(db, job, spec_data, if_match=base_version)
+    except stories.SpecConflict:
+        db.rollback()
+        db.refresh(job)
+        job.usage = ledger.to_dict()  # the call was billed all the same
+        db.commit()
+        stories.write_spec_file(job_dir, stories.current_spec(db, job) or {})  # back to the edited spec
+        raise HTTPException(409, "The spec was edited while acceptance criteria were generated; regenerate again")
+    job.usage = ledger.to_dict()
     job.acceptance_criteria = ac_data
+    stories.write_spec_file(job_dir, spec_data)
+    stories.index_changes(db, job_id, job_dir, spec_data, changed)
+    # The regenerated ACs match the current spec, so a later retry need not redo the AC stage
+    record_checkpoint(job, "ac", job_dir)
     db.commit()
+    export_cache.invalidate(job_id)
+    notify_job_changed(job_id)
     db.refresh(job)
-    return {"ok": True, "acceptance_criteria": ac_data, "spec": job.spec}
+    return {"ok": True, "acceptance_criteria": ac_data, "spec": job.spec, "spec_version": job.spec_version}
 
 
 @router.get("/jobs/{job_id}/screenshots/{screenshot_id}")
-def get_screenshot(job_id: str, screenshot_id: str, db: Session = Depends(get_db)):
-    """Serve a screenshot image for evidence display."""
-    job, job_dir = _get_job_and_dir(job_id, db)
-    screens_dir = job_dir / "screenshots"
-    manifest_path = screens_dir / "manifest.json"
-    if not manifest_path.exists():
-        raise HTTPException(404, "Screenshots not found")
-    manifest = json.loads(manifest_path.read_text())
-    path = None
-    for e in manifest:
-        if str(e.get("timestamp_ms")) == screenshot_id or e.get("path", "").startswith(screenshot_id):
-            path = screens_dir / e.get("path", f"{screenshot_id}.png")
-            break
+async def get_screenshot(
+    job_id: str,
+    screenshot_id: str,
+    request: Request,
+    w: int | None = Query(None, ge=16, le=4096, description="Thumbnail width (snapped to a few cached sizes)"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Serve a screenshot (or a cached JPEG thumbnail with ?w=) for evidence display; immutable caching."""
+    job, job_dir = await _job_row_and_dir(job_id, db)
+    path = await run_in_threadpool(resolve_screenshot, job_dir / "screenshots", screenshot_id)
     if path is None:
-        path = screens_dir / f"{screenshot_id}.png"
+        raise HTTPException(404, "Screenshots not found")
     if not path.exists():
         raise HTTPException(404, "Screenshot not found")
-    return FileResponse(path, media_type="image/png")
+    media_type = "image/png"
+    if w is not None:
+        try:
+            path = await run_in_threadpool(thumbnail, path, w)
+        except FileNotFoundError:
+            raise HTTPException(404, "Screenshot not found")  # removed meanwhile (e.g. storage compaction)
+        except ValueError as e:
+            log.warning("thumbnail failed job_id=%s screenshot_id=%s: %s", job_id, screenshot_id, e)
+            raise HTTPException(422, "Screenshot is not a readable image")
+        media_type = "image/jpeg"
+    etag = file_etag(path)
+    headers = {"ETag": etag, "Cache-Control": SCREENSHOT_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
+def _revalidated_file(request: Request, path: Path, media_type: str):
+    """Serve a file that may be regenerated (same name, new content): ETag + no-cache so clients revalidate."""
+    if not path.exists():
+        raise HTTPException(404, "Timeline sprites not found")
+    etag = file_etag(path)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
+@router.get("/jobs/{job_id}/sprites")
+async def get_sprite_map(job_id: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Tile map of the timeline sprite sheets: per screenshot, its sheet index and x/y/w/h."""
+    job, job_dir = await _job_row_and_dir(job_id, db)
+    return _revalidated_file(request, job_dir / "sprites" / "sprites.json", "application/json")
+
+
+@router.get("/jobs/{job_id}/sprites/{sheet}.jpg")
+async def get_sprite_sheet(job_id: str, sheet: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """One contact sheet (up to 10x10 screenshot tiles)."""
+    job, job_dir = await _job_row_and_dir(job_id, db)
+    return _revalidated_file(request, job_dir / "sprites" / f"{sheet}.jpg", "image/jpeg")
+
+
+@router.get("/jobs/{job_id}/thumbnails.vtt")
+async def get_thumbnail_track(job_id: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """WebVTT thumbnail track mapping time ranges to sprite coordinates (for video scrubbing previews)."""
+    job, job_dir = await _job_row_and_dir(job_id, db)
+    return _revalidated_file(request, job_dir / "sprites" / "thumbnails.vtt", "text/vtt")
+
+
+@router.get("/jobs/{job_id}/trace")
+async def get_trace(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Execution trace of the job's latest pipeline run (Chrome trace JSON; open in ui.perfetto.dev)."""
+    job, job_dir = await _job_row_and_dir(job_id, db)
+    path = job_dir / TRACE_FILENAME
+    if not path.exists():
+        raise HTTPException(404, "Trace not found")
+    return FileResponse(
+        path,
+        media_type="application/json",
+        headers={"Cache-Control": "no-cache"},
+        filename=f"job-{job_id[:8]}-trace.json",
+    )
+
+
+@router.get("/jobs/{job_id}/profiles", response_model=list[ProfileInfo])
+async def get_profiles(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Saved profiles of the job's pipeline runs and of requests to its routes, newest first."""
+    job, job_dir = await _job_row_and_dir(job_id, db)
+    return await run_in_threadpool(list_profiles, job_dir / PROFILE_DIRNAME)
+
+
+@router.get("/jobs/{job_id}/profiles/{name}")
+async def get_profile(job_id: str, name: str, db: AsyncSession = Depends(get_async_db)):
+    """Download one profile: .pstats (python -m pstats, snakeviz) or .folded (flame graph tools)."""
+    job, job_dir = await _job_row_and_dir(job_id, db)
+    path = resolve_profile(job_dir / PROFILE_DIRNAME, name)
+    if path is None:
+        raise HTTPException(404, "Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
@@ -1,14 +1,28 @@
-"""Jobs API: POST /api/jobs, GET /api/jobs/:id."""
+"""Jobs API: POST /api/jobs, GET /api/jobs (paginated), GET /api/jobs/:id, GET /api/jobs/:id/status, GET /api/jobs/:id/usage, GET /api/jobs/:id/similar, POST /api/jobs/:id/retry."""
+import base64
+import hashlib
+import json
 import logging
+import time
 import uuid
+from datetime import datetime
 from pathlib import Path
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from typing import Literal
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Request, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, undefer_group
 
-from app.database import get_db
-from app.models import Job
-from app.schemas import JobResponse, JobStatus
+from app.database import AsyncSessionLocal, get_async_db, get_db
+from app.models import BLOBS, Job
+from app.schemas import JobListItem, JobListResponse, JobProgress, JobResponse, JobSimilar, JobStatus, JobUsage
 from app.config import settings
+from app.metrics import RETRIES
+from app.services import dedup, stories
+from app.services.export_cache import etag_matches
+from app.services.usage import UsageLedger, job_budget_usd
+from app.workers.events import job_version, notify_job_changed, wait_for_job_change
 from app.workers.process_job import run_pipeline_background
 
 router = APIRouter()
@@ -18,9 +32,14 @@ log = logging.getLogger("app.api.jobs")
 CLOUD_RUN_MAX_BYTES = 32 * 1024 * 1024
 MAX_SIZE = settings.max_upload_mb * 1024 * 1024
 ALLOWED_TYPES = settings.allowed_video_types
+# Long-poll: longest a status request may be held, and how often to re-read the DB while held
+# (in-process changes wake the request immediately; the re-read catches other workers)
+MAX_STATUS_WAIT_S = 30.0
+STATUS_DB_RECHECK_S = 5.0
 
 
-def job_to_response(job: Job, base_url: str = "") -> JobResponse:
+def job_to_response(job: Job, base_url: str = "", spec: dict | None = None) -> JobResponse:
+    """`spec`: the current spec when the blob is stale (stories.current_spec)."""
     return JobResponse(
         id=job.id,
         status=job.status,
@@ -28,20 +47,33 @@ def job_to_response(job: Job, base_url: str = "") -> JobResponse:
         created_at=job.created_at,
         updated_at=job.updated_at,
         error_message=job.error_message,
-        spec=job.spec,
+        spec=spec if spec is not None else job.spec,
         acceptance_criteria=job.acceptance_criteria,
         evidence_map=job.evidence_map,
         transcript_segments=job.transcript_segments,
         screenshots_captured=job.screenshots_captured,
         screenshots_analyzed=job.screenshots_analyzed,
+        current_stage=job.current_stage,
+        stage_checkpoints=job.stage_checkpoints,
+        budget_usd=job.budget_usd,
+        usage=job.usage,
+        profile=job.profile,
+        spec_version=job.spec_version or 0,
     )
 
 
+def _write_video(video_path: Path, content: bytes) -> None:
+    video_path.parent.mkdir(parents=True)
+    video_path.write_bytes(content)
+
+
 @router.post("/jobs", response_model=JobResponse)
 async def create_job(
     request: Request,
     video: UploadFile = File(..., alias="video"),
-    db: Session = Depends(get_db),
+    budget_usd: float | None = Form(None, ge=0, description="Spend budget for this job in USD (0 = unlimited; default JOB_BUDGET_USD)"),
+    profile: Literal["cpu", "sample"] | None = Form(None, description="Profile the pipeline runs: cProfile (cpu) or stack sampling (sample)"),
+    db: AsyncSession = Depends(get_async_db),
 ):
     content_length = request.headers.get("content-length")
     filename = video.filename or "(no filename)"
@@ -81,27 +113,176 @@ async def create_job(
 
     job_id = str(uuid.uuid4())
     job_dir = settings.storage_root / "jobs" / job_id
-    job_dir.mkdir(parents=True)
     video_path = job_dir / f"video{ext}"
-    video_path.write_bytes(content)
+    await run_in_threadpool(_write_video, video_path, content)
     log.info("create_job wrote file path=%s", video_path)
 
     job = Job(
         id=job_id,
         status="pending",
         video_path=str(video_path),
+        budget_usd=budget_usd,
+        profile=profile,
     )
     db.add(job)
-    db.commit()
-    db.refresh(job)
+    await db.commit()
+    # Reload with the blob columns: async sessions can't lazy-load them when the response reads them
+    job = await db.get(Job, job_id, options=[undefer_group(BLOBS)], populate_existing=True)
     run_pipeline_background(job_id)
     log.info("create_job success job_id=%s", job_id)
     return job_to_response(job)
 
 
+def _encode_cursor(created_at: datetime, job_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), job_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, job_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(job_id)
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+
+
+# Columns a listing needs; the JSON blobs are never selected
+_LIST_COLUMNS = (
+    Job.id,
+    Job.status,
+    Job.current_stage,
+    Job.transcript_segments,
+    Job.screenshots_captured,
+    Job.screenshots_analyzed,
+    Job.created_at,
+    Job.updated_at,
+    Job.error_message,
+)
+
+
+@router.get("/jobs", response_model=JobListResponse)
+async def list_jobs(
+    status: str | None = Query(None, description="Only jobs with this status"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Newest jobs first, keyset-paginated on (created_at, id) so deep pages cost the same as the first."""
+    q = select(*_LIST_COLUMNS)
+    if status:
+        q = q.where(Job.status == status)
+    if cursor:
+        c_created, c_id = _decode_cursor(cursor)
+        q = q.where(or_(Job.created_at < c_created, and_(Job.created_at == c_created, Job.id < c_id)))
+    rows = (await db.execute(q.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit + 1))).all()
+    items = [JobListItem(**row._asdict()) for row in rows[:limit]]
+    next_cursor = _encode_cursor(items[-1].created_at, items[-1].id) if len(rows) > limit else None
+    return JobListResponse(items=items, next_cursor=next_cursor)
+
+
 @router.get("/jobs/{job_id}", response_model=JobResponse)
-def get_job(job_id: str, db: Session = Depends(get_db)):
+async def get_job(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await db.scalar(select(Job).options(undefer_group(BLOBS)).where(Job.id == job_id))
+    if not job:
+        raise HTTPException(404, "Job not found")
+    spec = await db.run_sync(stories.current_spec, job) if stories.spec_is_stale(job) else None
+    return job_to_response(job, spec=spec)
+
+
+async def _load_progress(job_id: str) -> JobProgress | None:
+    """Read only the small status columns in a short session of its own (not held across the long-poll wait)."""
+    async with AsyncSessionLocal() as db:
+        row = (
+            await db.execute(
+                select(
+                    Job.id,
+                    Job.status,
+                    Job.current_stage,
+                    Job.transcript_segments,
+                    Job.screenshots_captured,
+                    Job.screenshots_analyzed,
+                    Job.updated_at,
+                    Job.error_message,
+                ).where(Job.id == job_id)
+            )
+        ).first()
+    return JobProgress(**row._asdict()) if row else None
+
+
+def _progress_etag(progress: JobProgress) -> str:
+    return '"' + hashlib.sha1(progress.model_dump_json().encode()).hexdigest() + '"'
+
+
+@router.get("/jobs/{job_id}/status", response_model=JobProgress)
+async def get_job_status(
+    job_id: str,
+    request: Request,
+    response: Response,
+    wait: float = Query(0, ge=0, le=MAX_STATUS_WAIT_S, description="Long-poll: seconds to hold the request until the job changes"),
+):
+    """Compact job status for polling. Honors If-None-Match (304) and holds the request up to `wait` seconds for a change."""
+    if_none_match = request.headers.get("if-none-match")
+    deadline = time.monotonic() + wait
+    while True:
+        since = job_version(job_id)
+        progress = await _load_progress(job_id)
+        if progress is None:
+            raise HTTPException(404, "Job not found")
+        etag = _progress_etag(progress)
+        remaining = deadline - time.monotonic()
+        if not etag_matches(if_none_match, etag) or remaining <= 0:
+            break
+        await wait_for_job_change(job_id, since, min(remaining, STATUS_DB_RECHECK_S))
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return progress
+
+
+@router.get("/jobs/{job_id}/usage", response_model=JobUsage)
+async def get_job_usage(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Tokens, audio seconds, images and estimated cost of the job's model calls, per stage and model."""
+    row = (await db.execute(select(Job.budget_usd, Job.usage).where(Job.id == job_id))).first()
+    if not row:
+        raise HTTPException(404, "Job not found")
+    ledger = UsageLedger(row.usage, budget_usd=job_budget_usd(row))
+    return JobUsage(id=job_id, **ledger.to_dict())
+
+
+@router.get("/jobs/{job_id}/similar", response_model=JobSimilar)
+async def get_similar(
+    job_id: str,
+    kind: Literal["story", "ac"] = Query("story"),
+    min_similarity: float = Query(dedup.DEFAULT_MIN_SIMILARITY, ge=0.1, le=1.0),
+    limit: int = Query(10, ge=1, le=50, description="Matches per item"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Near-duplicate stories (or ACs) in other jobs, found through the MinHash LSH index."""
+    if not await db.scalar(select(Job.id).where(Job.id == job_id)):
+        raise HTTPException(404, "Job not found")
+    items = await dedup.find_similar(db, job_id, kind=kind, min_similarity=min_similarity, limit=limit)
+    return JobSimilar(id=job_id, kind=kind, items=items)
+
+
+@router.post("/jobs/{job_id}/retry", response_model=JobResponse)
+def retry_job(job_id: str, db: Session = Depends(get_db)):
+    """Re-queue a failed or completed job; the pipeline resumes from the first incomplete or invalidated stage."""
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(404, "Job not found")
-    return job_to_response(job)
+    requeued = (
+        db.query(Job)
+        .filter(Job.id == job_id, Job.status.in_(("failed", "completed")))
+        .update({"status": "pending", "error_message": None}, synchronize_session=False)
+    )
+    db.commit()
+    notify_job_changed(job_id)
+    if not requeued:
+        raise HTTPException(409, f"Job is {job.status}; only failed or completed jobs can be retried")
+    db.refresh(job)
+    RETRIES.labels(kind="job_retry").inc()
+    run_pipeline_background(job_id)
+    log.info("retry_job queued job_id=%s", job_id)
+    return job_to_response(job, spec=stories.current_spec(db, job))
@@ -0,0 +1,23 @@
+"""Search API: GET /api/search?q= across transcripts, user stories and acceptance criteria of completed jobs."""
+from typing import Literal
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_async_db
+from app.schemas import SearchHit, SearchResponse
+from app.services.search import search as run_search
+
+router = APIRouter()
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find (all must match; the last may be a prefix)"),
+    limit: int = Query(20, ge=1, le=100),
+    job_id: str | None = Query(None, description="Only this job"),
+    kind: Literal["transcript", "story", "ac"] | None = Query(None, description="Only this kind of hit"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Ranked hits with job id, evidence timestamp and screenshot id, so results deep-link to the evidence."""
+    hits = await run_search(db, q, limit=limit, job_id=job_id, kind=kind)
+    return SearchResponse(query=q, hits=[SearchHit(**h) for h in hits])
@@ -0,0 +1,149 @@
+"""Stories API: PATCH /api/jobs/:id/spec (whole spec or JSON Patch), user stories and acceptance criteria as versioned rows.
+
+Every edit honors If-Match (412 when the version is stale; no header = last write wins) and
+returns the new version as ETag: "spec-N" for the spec, "N" for a story or AC row.
+"""
+import logging
+from typing import Callable
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.api.export import _get_job_and_dir
+from app.database import get_async_db, get_db
+from app.models import Job
+from app.schemas import AcRow, JobStories, StoryRow
+from app.services import stories
+from app.services.export_cache import export_cache
+from app.workers.events import notify_job_changed
+
+router = APIRouter()
+log = logging.getLogger("app.api.stories")
+
+SPEC_ETAG_PREFIX = "spec-"
+MAX_EDIT_ATTEMPTS = 3  # concurrent edits of other rows only make us redo ours
+
+
+def _edit(job_id: str, db: Session, apply: Callable, whole_spec: bool = False):
+    """Run `apply(job) -> (result, changed story keys)` and commit it, retrying when a concurrent edit won the race.
+
+    Only a whole-spec edit loads and rewrites the spec blob and spec.json; a story/AC edit leaves them stale.
+    """
+    for attempt in range(MAX_EDIT_ATTEMPTS):
+        job, job_dir = _get_job_and_dir(job_id, db, load_blobs=whole_spec)
+        try:
+            result, changed = apply(job)
+            # The changed stories as they are now (a story-only view is enough for their index rows)
+            spec = job.spec if whole_spec else stories.spec_from_rows(db, job_id, None)
+            stories.index_changes(db, job_id, job_dir, spec, changed)
+            db.commit()
+        except (stories.SpecConflict, OperationalError) as e:
+            db.rollback()
+            log.info("spec edit retry job_id=%s attempt=%s: %s", job_id, attempt + 1, type(e).__name__)
+            continue
+        except stories.NotFound as e:
+            db.rollback()
+            raise HTTPException(404, str(e))
+        except stories.VersionMismatch as e:
+            db.rollback()
+            raise HTTPException(412, f"Precondition failed: {e}")
+        except stories.PatchTestFailed as e:
+            db.rollback()
+            raise HTTPException(409, str(e))
+        except stories.PatchError as e:
+            db.rollback()
+            raise HTTPException(422, str(e))
+        if whole_spec:
+            stories.write_spec_file(job_dir, spec)
+        export_cache.invalidate(job_id)
+        notify_job_changed(job_id)
+        return job, result
+    raise HTTPException(409, "The spec is being edited concurrently; retry")
+
+
+@router.patch("/jobs/{job_id}/spec")
+def update_spec(
+    job_id: str,
+    response: Response,
+    body: dict | list = Body(..., description="The whole spec (object) or an RFC 6902 JSON Patch against it (array)"),
+    if_match: str | None = Header(None),
+    db: Session = Depends(get_db),
+):
+    """Update the job spec (editing in the UI): replace it, or apply a JSON Patch. Only changed stories are rewritten and reindexed."""
+    version = stories.parse_if_match(if_match, SPEC_ETAG_PREFIX)
+
+    def apply(job: Job):
+        if isinstance(body, list):
+            _, changed = stories.patch_spec(db, job, body, version)
+        else:
+            changed = stories.replace_spec(db, job, body, version)
+        return None, changed
+
+    job, _ = _edit(job_id, db, apply, whole_spec=True)
+    response.headers["ETag"] = stories.etag(job.spec_version, SPEC_ETAG_PREFIX)
+    return {"ok": True, "spec": job.spec, "spec_version": job.spec_version}
+
+
+@router.get("/jobs/{job_id}/stories", response_model=JobStories)
+async def get_stories(job_id: str, response: Response, db: AsyncSession = Depends(get_async_db)):
+    """The job's user stories with their acceptance criteria, each with its version."""
+    spec_version = (await db.execute(select(Job.spec_version).where(Job.id == job_id))).scalar_one_or_none()
+    if spec_version is None:
+        raise HTTPException(404, "Job not found")
+    rows = await stories.list_stories(db, job_id)
+    response.headers["ETag"] = stories.etag(spec_version, SPEC_ETAG_PREFIX)
+    return JobStories(job_id=job_id, spec_version=spec_version, user_stories=[StoryRow(**r) for r in rows])
+
+
+@router.get("/jobs/{job_id}/stories/{ref}", response_model=StoryRow)
+async def get_story(job_id: str, ref: str, response: Response, db: AsyncSession = Depends(get_async_db)):
+    row = next((r for r in await stories.list_stories(db, job_id) if r["ref"] == ref), None)
+    if row is None:
+        raise HTTPException(404, f"Story {ref} not found")
+    response.headers["ETag"] = stories.etag(row["version"])
+    return StoryRow(**row)
+
+
+@router.patch("/jobs/{job_id}/stories/{ref}", response_model=StoryRow)
+def update_story(
+    job_id: str,
+    ref: str,
+    response: Response,
+    changes: dict = Body(..., description="Fields to set on the story; null removes a field"),
+    if_match: str | None = Header(None),
+    db: Session = Depends(get_db),
+):
+    """Merge fields into one user story. Its acceptance criteria are edited through their own endpoint."""
+    version = stories.parse_if_match(if_match)
+
+    def apply(job: Job):
+        row, key = stories.update_story(db, job, ref, changes, version)
+        return row, {key}
+
+    _, row = _edit(job_id, db, apply)
+    response.headers["ETag"] = stories.etag(row.version)
+    return StoryRow(**stories.story_out(row, stories.ac_rows(db, row.id)))
+
+
+@router.patch("/jobs/{job_id}/stories/{ref}/acceptance-criteria/{ac_ref}", response_model=AcRow)
+def update_acceptance_criterion(
+    job_id: str,
+    ref: str,
+    ac_ref: str,
+    response: Response,
+    changes: dict = Body(..., description="Fields to set on the acceptance criterion; null removes a field"),
+    if_match: str | None = Header(None),
+    db: Session = Depends(get_db),
+):
+    """Merge fields into one acceptance criterion."""
+    version = stories.parse_if_match(if_match)
+
+    def apply(job: Job):
+        ac, key = stories.update_ac(db, job, ref, ac_ref, changes, version)
+        return ac, {key}
+
+    _, ac = _edit(job_id, db, apply)
+    response.headers["ETag"] = stories.etag(ac.version)
+    return AcRow(**stories.ac_out(ac))
@@ -22,9 +22,80 @@ class Settings(BaseSettings):
     # Cloud Run max HTTP request size is 32MB; keep default 32 so uploads don't fail silently
     max_upload_mb: int = 32
     allowed_video_types: set[str] = {"video/mp4", "video/webm"}
+    startup_budget_ms: int = 2000  # import + init time before serving; over budget logs a warning
+    # Database connection pool (QueuePool; in-memory SQLite keeps SQLAlchemy's single-connection pool)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout_s: float = 30.0
+    # SQLite: WAL lets API reads proceed while a pipeline commits; writers wait up to the busy timeout
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 15000
+    # Storage lifecycle (app.services.lifecycle): compact completed jobs after a grace period and delete
+    # jobs older than their status's retention (days since last change; statuses not listed are kept).
+    # Deletes irreversibly, so off unless opted in: set an interval and e.g. RETENTION_DAYS={"failed": 30}
+    lifecycle_sweep_interval_s: int = 0  # background sweep in the API process; 0 disables it
+    lifecycle_compact_after_s: int = 3600
+    lifecycle_batch_size: int = 200  # jobs per action per sweep
+    retention_days: dict[str, int] = {}
+    admin_token: str = ""  # X-Admin-Token required to apply a sweep over HTTP; unset = dry runs only
+    artifact_cache_mb: int = 64  # parsed job artifacts (transcripts, manifests, specs), by file size
+    export_cache_mb: int = 64  # in-memory cache of rendered exports (all formats, incl. compressed variants)
     openai_api_key: str | None = None
     openai_org_id: str | None = None  # optional; for multi-org or project keys
     openai_project_id: str | None = None  # optional; required for sk-proj- project keys
+    openai_base_url: str | None = None  # optional; OpenAI-compatible endpoint (e.g. benchmarks' fake server)
+    # Process-wide model call scheduler: per-model requests/tokens per minute (0 = unlimited). Defaults
+    # are around OpenAI usage tier 2; set your account's limits, as JSON per model, e.g.
+    # OPENAI_RPM='{"whisper-1": 50}' OPENAI_TPM='{"gpt-4o": 30000}'
+    openai_default_rpm: int = 500
+    openai_default_tpm: int = 450000
+    openai_rpm: dict[str, int] = {}
+    openai_tpm: dict[str, int] = {}
+    openai_max_attempts: int = 5  # per call, including the first; 429/5xx/connection errors are retried
+    openai_backoff_base_s: float = 1.0
+    openai_backoff_max_s: float = 60.0
+    # Voice activity detection before transcription (app.services.vad): only voiced regions are sent to
+    # Whisper and segment times are mapped back. Frames louder than the noise floor + threshold are speech.
+    vad_enabled: bool = True
+    vad_frame_ms: int = 30
+    vad_threshold_db: float = 12.0
+    vad_min_speech_ms: int = 90  # shorter bursts (clicks) are ignored
+    vad_min_silence_ms: int = 1000  # shorter pauses are kept
+    vad_padding_ms: int = 250  # kept around each voiced region
+    vad_min_savings: float = 0.1  # send the original audio unless trimming cuts at least this fraction
+    # Media stage (ffmpeg + OpenCV screenshot capture) in worker processes (app.workers.media_pool), so a
+    # large video doesn't take the API's CPU and memory. 0 workers = run it in the pipeline thread.
+    media_workers: int = 2  # media stages running at once; more jobs wait for a slot
+    media_worker_nice: int = 10  # added niceness: the API wins the CPU over media work (0 = same priority)
+    media_worker_memory_mb: int = 4096  # address-space limit (RLIMIT_AS) per worker, ffmpeg included; 0 = none
+    media_worker_timeout_s: int = 3600  # wall time per media stage before the worker is stopped; 0 = none
+    # Model per stage. Vision has two tiers: screenshots that changed little from the previous one
+    # (manifest "diff" below vision_fast_max_diff) go to vision_fast_model, and are re-asked of
+    # vision_model when the fast answer isn't valid JSON or is mostly empty. "" disables the fast tier.
+    vision_model: str = "gpt-4o"
+    vision_fast_model: str = "gpt-4o-mini"
+    vision_fast_max_diff: float = 0.08
+    spec_model: str = "gpt-4o"
+    ac_model: str = "gpt-4o"
+    # USD per 1M tokens (chat) / per audio minute (transcription), for the per-job usage ledger
+    openai_prices_usd: dict[str, dict[str, float]] = {
+        "gpt-4o": {"input_per_1m": 2.50, "output_per_1m": 10.00},
+        "gpt-4o-mini": {"input_per_1m": 0.15, "output_per_1m": 0.60},
+        "whisper-1": {"per_minute": 0.006},
+    }
+    # Per-job spend budget (USD; 0 = unlimited; a job may set its own at upload). Past degrade_ratio of
+    # it, vision sends low-detail images; once spent, vision stops describing further screenshots.
+    job_budget_usd: float = 0.0
+    job_budget_degrade_ratio: float = 0.5
+    # Profiling (app.profiling): "cpu" = cProfile (.pstats), "sample" = stack sampler (folded stacks for
+    # flame graphs). Jobs opt in with profile= at upload, requests with X-Profile or ?profile=.
+    profile_jobs: str = ""  # profile every pipeline run in this mode ("" = only jobs that asked)
+    profile_requests: bool = False  # honor X-Profile / ?profile= on /api/admin/* requests
+    profile_token: str = ""  # when set, requests to any route carrying X-Profile-Token: <token> may be profiled too
+    profile_max_files: int = 50  # per profiles/ folder; the oldest go first
+    profile_max_age_days: int = 7  # the lifecycle sweep deletes older profiles (0 = keep)
+    profile_sample_interval_ms: float = 5.0
     redis_url: str | None = os.getenv("REDIS_URL")  # optional for ARQ
     # Supabase (optional): set DATABASE_URL to Supabase Postgres connection string
     supabase_url: str | None = os.getenv("SUPABASE_URL")
@@ -56,10 +127,14 @@ os.environ.pop("OPENAI_ORG_ID", None)
 
 
 def openai_client_kwargs() -> dict:
-    """Kwargs for OpenAI(): api_key only (no project/org header)."""
+    """Kwargs for OpenAI(): api_key (+ base_url when set), no client-side retries; no project/org header."""
     if not settings.openai_api_key:
         return {}
-    return {"api_key": settings.openai_api_key}
+    # Retries are done by the scheduler (app.services.scheduler), not the client
+    kwargs = {"api_key": settings.openai_api_key, "max_retries": 0}
+    if settings.openai_base_url:
+        kwargs["base_url"] = settings.openai_base_url
+    return kwargs
 
 
 logger.info(
@@ -1,12 +1,28 @@
-"""Database session and engine. Supports SQLite (default) and Supabase/PostgreSQL."""
+"""Database session and engine. Supports SQLite (default) and Supabase/PostgreSQL.
+
+The engine is created on first use (first session or get_engine() call), not at import, so
+importing the app doesn't load a DB driver or touch the filesystem.
+
+SQLite connections are tuned for one writer plus many readers: WAL journal (readers never block
+the writer or each other), synchronous=NORMAL (fsync at checkpoints, still crash-safe in WAL) and
+a busy timeout so a writer waits for the lock instead of failing with "database is locked".
+
+Read-heavy API routes use the async engine (get_async_db): aiosqlite for SQLite, asyncpg for
+Postgres, same URL and tuning, so they run on the event loop instead of in the threadpool.
+"""
 import os
+import threading
 from pathlib import Path
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config import settings
 
 # Default DB in project root storage (backend/app/database.py -> backend -> project root)
 _default_db_path = Path(__file__).resolve().parent.parent.parent / "storage" / "video2ac.db"
-_default_db_path.parent.mkdir(parents=True, exist_ok=True)
 DATABASE_URL = os.getenv(
     "DATABASE_URL",
     f"sqlite:///{_default_db_path}",
@@ -16,18 +32,126 @@ DATABASE_URL = os.getenv(
 if DATABASE_URL.startswith("postgresql://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg2://", 1)
 
-# SQLite needs check_same_thread=False for FastAPI
-connect_args = {}
-if DATABASE_URL.startswith("sqlite"):
-    connect_args["check_same_thread"] = False
+_SQLITE_JOURNAL_MODES = {"WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "OFF"}
+_SQLITE_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+_engine: Engine | None = None
+_async_engine: AsyncEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def _engine_kwargs() -> dict:
+    kwargs: dict = {"pool_pre_ping": "postgresql" in DATABASE_URL}
+    if DATABASE_URL.startswith("sqlite"):
+        # SQLite needs check_same_thread=False for FastAPI; busy timeout is also set as a PRAGMA below
+        kwargs["connect_args"] = {"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000}
+    if not _is_memory_sqlite(DATABASE_URL):
+        kwargs.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_s,
+        )
+    return kwargs
+
+
+def _tune_sqlite(engine: Engine) -> None:
+    journal_mode = settings.sqlite_journal_mode.upper()
+    synchronous = settings.sqlite_synchronous.upper()
+    if journal_mode not in _SQLITE_JOURNAL_MODES:
+        raise ValueError(f"Unsupported sqlite_journal_mode: {settings.sqlite_journal_mode}")
+    if synchronous not in _SQLITE_SYNCHRONOUS:
+        raise ValueError(f"Unsupported sqlite_synchronous: {settings.sqlite_synchronous}")
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            cur.execute(f"PRAGMA journal_mode={journal_mode}")  # persistent for WAL; ignored for :memory:
+            cur.execute(f"PRAGMA synchronous={synchronous}")
+            cur.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        finally:
+            cur.close()
+
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if DATABASE_URL == f"sqlite:///{_default_db_path}":
+                    _default_db_path.parent.mkdir(parents=True, exist_ok=True)
+                engine = create_engine(DATABASE_URL, **_engine_kwargs())
+                if DATABASE_URL.startswith("sqlite"):
+                    _tune_sqlite(engine)
+                _engine = engine
+    return _engine
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args=connect_args,
-    pool_pre_ping=True if "postgresql" in DATABASE_URL else False,
-)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _async_url(url: str) -> str:
+    """Same database through an asyncio driver: sqlite -> aiosqlite, postgresql(+psycopg2) -> asyncpg."""
+    u = make_url(url)
+    if u.get_backend_name() == "sqlite":
+        return u.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if u.get_backend_name() == "postgresql":
+        query = dict(u.query)
+        if "sslmode" in query:  # libpq spelling (Supabase URLs); asyncpg calls it ssl
+            query["ssl"] = query.pop("sslmode")
+        return u.set(drivername="postgresql+asyncpg", query=query).render_as_string(hide_password=False)
+    raise ValueError(f"No async driver configured for {u.drivername}")
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                if DATABASE_URL == f"sqlite:///{_default_db_path}":
+                    _default_db_path.parent.mkdir(parents=True, exist_ok=True)
+                kwargs = _engine_kwargs()
+                if DATABASE_URL.startswith("sqlite") and not _is_memory_sqlite(DATABASE_URL):
+                    kwargs["poolclass"] = AsyncAdaptedQueuePool  # aiosqlite otherwise opens a connection per session
+                elif DATABASE_URL.startswith("postgresql"):
+                    # No cached prepared statements (asyncpg's or SQLAlchemy's): behind a transaction-mode
+                    # pooler (Supabase, PgBouncer) the next transaction may run on a server connection that
+                    # never prepared them
+                    kwargs["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+                engine = create_async_engine(_async_url(DATABASE_URL), **kwargs)
+                if DATABASE_URL.startswith("sqlite"):
+                    _tune_sqlite(engine.sync_engine)
+                _async_engine = engine
+    return _async_engine
+
+
+def __getattr__(name: str):
+    # `from app.database import engine` keeps working; the engine is still only created on access
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class _LazyBindSession(Session):
+    """Session bound to get_engine() at construction, so SessionLocal() works without an eager engine."""
+
+    def __init__(self, *args, **kwargs):
+        if not args and kwargs.get("bind") is None:
+            kwargs["bind"] = get_engine()
+        super().__init__(*args, **kwargs)
+
+
+class _LazyBindAsyncSession(AsyncSession):
+    def __init__(self, *args, **kwargs):
+        if not args and kwargs.get("bind") is None:
+            kwargs["bind"] = get_async_engine()
+        super().__init__(*args, **kwargs)
+
+
+SessionLocal = sessionmaker(class_=_LazyBindSession, autocommit=False, autoflush=False)
+# expire_on_commit=False: attribute access after commit would need a lazy load, which async can't do
+AsyncSessionLocal = async_sessionmaker(class_=_LazyBindAsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 
@@ -37,3 +161,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
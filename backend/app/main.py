@@ -1,61 +1,105 @@
 """FastAPI app: CORS, routes, startup."""
+from app import startup  # first, so the import phase covers everything below
+
+import asyncio
 import logging
+import re
 import sys
 import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from sqlalchemy import text
-from app.database import engine, Base
+from app.database import get_engine
 from app.config import settings
-from app.api import jobs, export
-
-# Ensure config/key diagnostics are visible in console
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(name)s %(levelname)s %(message)s",
-    stream=sys.stdout,
-    force=True,
-)
-logging.getLogger("app").setLevel(logging.INFO)
+from app.metrics import HTTP_REQUEST_DURATION, render_latest
+from app.api import admin, jobs, export, search, stories
+from app.migrations import run_migrations
+from app.profiling import PROFILE_DIRNAME, Profile, request_mode
+from app.services.lifecycle import run_sweeper
+from app.workers import media_pool
+
 logger = logging.getLogger("app.main")
 
 
+def configure_logging() -> None:
+    """Ensure config/key diagnostics are visible in console (done at startup, not on import)."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(name)s %(levelname)s %(message)s",
+        stream=sys.stdout,
+        force=True,
+    )
+    logging.getLogger("app").setLevel(logging.INFO)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
-    # Add new columns to existing jobs table if missing (SQLite only; Postgres uses create_all)
-    if "sqlite" in str(engine.url):
-        for col in ("transcript_segments", "screenshots_captured", "screenshots_analyzed"):
-            try:
-                with engine.connect() as conn:
-                    conn.execute(text(f"ALTER TABLE jobs ADD COLUMN {col} INTEGER"))
-                    conn.commit()
-            except Exception:
-                pass  # column already exists
+    startup.mark("server")  # import finished -> server calls lifespan
+    configure_logging()
+    startup.mark("logging")
+    engine = get_engine()
+    startup.mark("engine")
+    run_migrations(engine)
+    startup.mark("migrations")
     settings.storage_root.mkdir(parents=True, exist_ok=True)
     (settings.storage_root / "jobs").mkdir(parents=True, exist_ok=True)
+    startup.mark("storage")
+    startup.log_report()
+    sweeper = None
+    if settings.lifecycle_sweep_interval_s > 0:
+        sweeper = asyncio.create_task(run_sweeper(settings.lifecycle_sweep_interval_s))
     yield
-    # shutdown if needed
+    if sweeper is not None:
+        sweeper.cancel()
+    media_pool.shutdown()
 
 
 app = FastAPI(title="Video to Acceptance Criteria", lifespan=lifespan)
 
 
+def _route_template(request: Request) -> str:
+    """Route path template (e.g. /api/jobs/{job_id}) so metric labels don't grow with job ids."""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+_JOB_ID = re.compile(r"[0-9a-f-]{36}")
+
+
+def _save_request_profile(profile: Profile, request: Request) -> str:
+    """Stop and save a request profile: with the job for job routes, else under {storage_root}/profiles."""
+    profile.stop()
+    job_id = (request.scope.get("path_params") or {}).get("job_id", "")
+    job_dir = settings.storage_root / "jobs" / job_id
+    out_dir = job_dir / PROFILE_DIRNAME if _JOB_ID.fullmatch(job_id) and job_dir.is_dir() else settings.storage_root / PROFILE_DIRNAME
+    return profile.save(out_dir, f"{request.method} {_route_template(request)}").name
+
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     """Log every request so we can see if uploads reach the backend and when they fail."""
     cl = request.headers.get("content-length", "?")
     logger.info("request start method=%s path=%s content_length=%s", request.method, request.url.path, cl)
+    # Opt-in (X-Profile / ?profile=); covers the handler up to the response headers, not a streamed body
+    profile_mode = request_mode(request)
+    profile = Profile(profile_mode, all_threads=True).start() if profile_mode else None
     start = time.monotonic()
     try:
         response = await call_next(request)
         elapsed = time.monotonic() - start
+        if profile is not None:
+            response.headers["X-Profile-File"] = _save_request_profile(profile, request)
+        HTTP_REQUEST_DURATION.labels(
+            method=request.method, route=_route_template(request), status=response.status_code
+        ).observe(elapsed)
         logger.info("request done method=%s path=%s status=%s elapsed=%.2fs", request.method, request.url.path, response.status_code, elapsed)
         return response
     except Exception as e:
         elapsed = time.monotonic() - start
+        HTTP_REQUEST_DURATION.labels(method=request.method, route=_route_template(request), status=500).observe(elapsed)
+        if profile is not None:
+            _save_request_profile(profile, request)
         logger.exception("request failed method=%s path=%s elapsed=%.2fs error=%s", request.method, request.url.path, elapsed, e)
         raise
 
@@ -66,6 +110,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Profile-File"],
 )
 @app.get("/api/health")
 def health():
@@ -73,5 +118,23 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/api/health/startup")
+def startup_report():
+    """Import and initialization timings of this process, against startup_budget_ms."""
+    return startup.report()
+
+
+@app.get("/api/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (request latency, stage durations, OpenAI latency, job gauges)."""
+    body, content_type = render_latest()
+    return Response(body, media_type=content_type)
+
+
 app.include_router(jobs.router, prefix="/api", tags=["jobs"])
 app.include_router(export.router, prefix="/api", tags=["export"])
+app.include_router(stories.router, prefix="/api", tags=["stories"])
+app.include_router(search.router, prefix="/api", tags=["search"])
+app.include_router(admin.router, prefix="/api", tags=["admin"])
+
+startup.mark("import")
@@ -0,0 +1,56 @@
+"""Prometheus metrics for the API and pipeline (scraped from GET /api/metrics).
+
+Metrics live in the default in-process registry; with several uvicorn workers each worker
+reports its own values.
+"""
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Pipeline stages run for minutes, model calls for seconds; give each a bucket range that fits
+_STAGE_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 2400)
+_OPENAI_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120, 300)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "video2ac_http_request_duration_seconds",
+    "API request latency by route template.",
+    ["method", "route", "status"],
+)
+STAGE_DURATION = Histogram(
+    "video2ac_pipeline_stage_duration_seconds",
+    "Pipeline stage wall time.",
+    ["stage", "outcome"],
+    buckets=_STAGE_BUCKETS,
+)
+OPENAI_REQUEST_DURATION = Histogram(
+    "video2ac_openai_request_duration_seconds",
+    "OpenAI API call latency by model.",
+    ["model", "endpoint", "outcome"],
+    buckets=_OPENAI_BUCKETS,
+)
+OPENAI_QUEUE_WAIT = Histogram(
+    "video2ac_openai_queue_wait_seconds",
+    "Time a model call waited in the scheduler for rate-limit capacity.",
+    ["model", "priority"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120),
+)
+OPENAI_TOKENS = Counter("video2ac_openai_tokens_total", "Tokens billed by model and kind (prompt, completion).", ["model", "kind"])
+OPENAI_COST = Counter("video2ac_openai_cost_usd_total", "Estimated model spend in USD (settings.openai_prices_usd).", ["model"])
+OPENAI_QUEUE_DEPTH = Gauge("video2ac_openai_queue_depth", "Model calls waiting in the scheduler.", ["model"])
+VISION_TIER_DURATION = Histogram(
+    "video2ac_vision_tier_duration_seconds",
+    "Vision call latency by model tier; outcome escalated = fast answer unusable, re-asked of the full tier.",
+    ["tier", "outcome"],
+    buckets=_OPENAI_BUCKETS,
+)
+SCREENSHOTS_CAPTURED = Counter("video2ac_screenshots_captured_total", "Screenshots captured by frame diff.")
+SCREENSHOTS_ANALYZED = Counter("video2ac_screenshots_analyzed_total", "Screenshots sent to the vision model.")
+CACHE_HITS = Counter("video2ac_cache_hits_total", "Cache hits by cache name.", ["cache"])
+CACHE_MISSES = Counter("video2ac_cache_misses_total", "Cache misses by cache name.", ["cache"])
+RETRIES = Counter("video2ac_retries_total", "Retries by kind (json_repair, job_retry, ...).", ["kind"])
+FAILURES = Counter("video2ac_pipeline_failures_total", "Failed pipeline runs by the stage that failed.", ["stage"])
+JOBS_IN_FLIGHT = Gauge("video2ac_jobs_in_flight", "Jobs currently running the pipeline.")
+MEDIA_WORKERS_BUSY = Gauge("video2ac_media_workers_busy", "Media stage worker processes running (at most media_workers).")
+
+
+def render_latest() -> tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, with its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
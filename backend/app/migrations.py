@@ -0,0 +1,149 @@
+"""Versioned schema migrations.
+
+The applied version is kept in `schema_migrations`; at startup an up-to-date database costs one
+SELECT. Each migration runs in its own transaction and is recorded when it commits. Add new
+migrations at the end of MIGRATIONS with the next version number; never renumber or edit applied ones.
+"""
+import logging
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import Base
+from app.models import AcceptanceCriterion, Job, LshBucket, StorySignature, UserStory
+
+logger = logging.getLogger("app.migrations")
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _meta,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(128), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _add_missing_columns(conn: Connection, table, names: tuple[str, ...]) -> None:
+    """ALTER TABLE ADD COLUMN for model columns the live table lacks (DBs created before they existed)."""
+    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    for name in names:
+        if name in existing:
+            continue
+        col = table.c[name]
+        col_type = col.type.compile(dialect=conn.dialect)
+        conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {name} {col_type}")
+
+
+def _baseline(conn: Connection) -> None:
+    Base.metadata.create_all(bind=conn)
+
+
+def _job_progress_columns(conn: Connection) -> None:
+    _add_missing_columns(
+        conn,
+        Job.__table__,
+        ("transcript_segments", "screenshots_captured", "screenshots_analyzed", "current_stage", "stage_checkpoints"),
+    )
+
+
+def _job_list_indexes(conn: Connection) -> None:
+    # create_all skips indexes on tables that already exist
+    for index in Job.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+
+def _job_usage_columns(conn: Connection) -> None:
+    _add_missing_columns(conn, Job.__table__, ("budget_usd", "usage"))
+
+
+def _job_compacted_at(conn: Connection) -> None:
+    _add_missing_columns(conn, Job.__table__, ("compacted_at",))
+
+
+def _search_index(conn: Connection) -> None:
+    from app.services import search
+
+    search.create_index(conn)
+    # Backfill jobs completed before search existed
+    jobs_root = settings.storage_root / "jobs"
+    for job_id, spec in conn.execute(select(Job.id, Job.spec).where(Job.status == "completed")).all():
+        search.index_job(conn, job_id, jobs_root / job_id, spec)
+
+
+def _story_signatures(conn: Connection) -> None:
+    from app.services import dedup
+
+    Base.metadata.create_all(bind=conn, tables=[StorySignature.__table__, LshBucket.__table__])
+    # Backfill completed jobs, as for search
+    with Session(bind=conn) as db:
+        for job_id, spec in conn.execute(select(Job.id, Job.spec).where(Job.status == "completed")).all():
+            dedup.index_job(db, job_id, spec)
+        db.flush()
+
+
+def _job_profile_column(conn: Connection) -> None:
+    _add_missing_columns(conn, Job.__table__, ("profile",))
+
+
+def _story_rows(conn: Connection) -> None:
+    from app.services import stories
+
+    Base.metadata.create_all(bind=conn, tables=[UserStory.__table__, AcceptanceCriterion.__table__])
+    _add_missing_columns(conn, Job.__table__, ("spec_version",))
+    conn.execute(update(Job).where(Job.spec_version.is_(None)).values(spec_version=0))
+    # Rows for every job that has a spec (edits of any job go through them)
+    with Session(bind=conn) as db:
+        for job_id, spec in conn.execute(select(Job.id, Job.spec).where(Job.spec.is_not(None))).all():
+            stories.sync_from_spec(db, job_id, spec)
+        db.flush()
+
+
+def _spec_view_version(conn: Connection) -> None:
+    _add_missing_columns(conn, Job.__table__, ("spec_view_version",))
+    conn.execute(update(Job).where(Job.spec_view_version.is_(None)).values(spec_view_version=Job.spec_version))
+
+
+# (version, name, migration)
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "baseline", _baseline),
+    (2, "job_progress_columns", _job_progress_columns),
+    (3, "job_list_indexes", _job_list_indexes),
+    (4, "job_usage_columns", _job_usage_columns),
+    (5, "job_compacted_at", _job_compacted_at),
+    (6, "search_index", _search_index),
+    (7, "story_signatures", _story_signatures),
+    (8, "job_profile_column", _job_profile_column),
+    (9, "story_rows", _story_rows),
+    (10, "spec_view_version", _spec_view_version),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(engine: Engine) -> int:
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(schema_migrations.name):
+            return 0
+        return conn.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+
+
+def run_migrations(engine: Engine) -> list[str]:
+    """Apply pending migrations in order; return the names applied (empty when already current)."""
+    version = current_version(engine)
+    if version >= LATEST_VERSION:
+        return []
+    _meta.create_all(bind=engine)
+    applied = []
+    for number, name, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(version=number, name=name, applied_at=datetime.utcnow()))
+        logger.info("migration applied version=%s name=%s", number, name)
+        applied.append(name)
+    return applied
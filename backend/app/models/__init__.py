@@ -1,3 +1,5 @@
-from .job import Job
+from .job import BLOBS, Job
+from .similarity import LshBucket, StorySignature
+from .story import AcceptanceCriterion, UserStory
 
-__all__ = ["Job"]
+__all__ = ["AcceptanceCriterion", "BLOBS", "Job", "LshBucket", "StorySignature", "UserStory"]
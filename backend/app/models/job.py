@@ -1,21 +1,37 @@
 """Job model for video processing pipeline."""
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Text, Integer, JSON
+from sqlalchemy import Column, String, DateTime, Text, Integer, Float, JSON, Index
+from sqlalchemy.orm import deferred
 from app.database import Base
 
 
+# Large JSON columns are deferred: queries load them only when asked (undefer_group(BLOBS)),
+# so listings and status checks never pull specs/ACs off disk
+BLOBS = "blobs"
+
+
 class Job(Base):
     __tablename__ = "jobs"
+    # Keyset pagination on (created_at, id) for GET /api/jobs
+    __table_args__ = (Index("ix_jobs_created_at_id", "created_at", "id"),)
 
     id = Column(String(36), primary_key=True, index=True)
-    status = Column(String(32), nullable=False, default="pending")  # pending | processing | completed | failed
+    status = Column(String(32), nullable=False, default="pending", index=True)  # pending | processing | completed | failed
     video_path = Column(String(512), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     error_message = Column(Text, nullable=True)
-    spec = Column(JSON, nullable=True)
-    acceptance_criteria = Column(JSON, nullable=True)
-    evidence_map = Column(JSON, nullable=True)  # screenshot_id -> path/url
+    spec = deferred(Column(JSON, nullable=True), group=BLOBS)
+    acceptance_criteria = deferred(Column(JSON, nullable=True), group=BLOBS)
+    evidence_map = deferred(Column(JSON, nullable=True), group=BLOBS)  # screenshot_id -> path/url
     transcript_segments = Column(Integer, nullable=True)
     screenshots_captured = Column(Integer, nullable=True)
     screenshots_analyzed = Column(Integer, nullable=True)
+    current_stage = Column(String(32), nullable=True)  # stage being run (or the one that failed)
+    stage_checkpoints = Column(JSON, nullable=True)  # stage -> {completed_at, fingerprint}
+    budget_usd = Column(Float, nullable=True)  # per-job spend budget; None = settings.job_budget_usd
+    usage = deferred(Column(JSON, nullable=True), group=BLOBS)  # token/cost ledger (app.services.usage)
+    compacted_at = Column(DateTime, nullable=True)  # storage lifecycle pruned/compacted artifacts (reset by a rerun)
+    profile = Column(String(16), nullable=True)  # "cpu" / "sample": profile pipeline runs (app.profiling)
+    spec_version = Column(Integer, nullable=False, default=0)  # bumped on every spec/story/AC change (ETag)
+    spec_view_version = Column(Integer, nullable=False, default=0)  # spec_version `spec`/spec.json were built at (app.services.stories)
@@ -0,0 +1,28 @@
+"""MinHash signatures and LSH buckets for near-duplicate story/AC detection (app.services.dedup)."""
+from sqlalchemy import Column, ForeignKey, Index, Integer, JSON, String, Text
+from app.database import Base
+
+
+class StorySignature(Base):
+    """One story or acceptance criterion of a job, with the MinHash signature of its normalized text."""
+    __tablename__ = "story_signatures"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(String(36), nullable=False, index=True)
+    kind = Column(String(8), nullable=False)  # story | ac
+    ref = Column(String(128), nullable=False)  # story id, or "{story id}/{AC id}"
+    title = Column(Text, nullable=True)  # story title (for ACs, their story's)
+    text = Column(Text, nullable=False)  # what was hashed, before normalization
+    signature = Column(JSON, nullable=False)  # NUM_PERM ints
+
+
+class LshBucket(Base):
+    """(band, hash of that band of a signature): signatures sharing any bucket are candidate near-duplicates."""
+    __tablename__ = "lsh_buckets"
+    __table_args__ = (Index("ix_lsh_buckets_band_bucket", "band", "bucket"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    band = Column(Integer, nullable=False)
+    bucket = Column(String(16), nullable=False)
+    signature_id = Column(Integer, ForeignKey("story_signatures.id", ondelete="CASCADE"), nullable=False, index=True)
+    job_id = Column(String(36), nullable=False, index=True)
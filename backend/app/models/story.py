@@ -0,0 +1,35 @@
+"""User stories and acceptance criteria of a job, one row each (app.services.stories).
+
+Rows are the source of truth for edits; `Job.spec` is a materialized view of the whole spec
+(non-story fields + these rows in position order), rebuilt lazily after story/AC edits.
+"""
+from datetime import datetime
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, JSON, String, UniqueConstraint
+from app.database import Base
+
+
+class UserStory(Base):
+    __tablename__ = "user_stories"
+    __table_args__ = (UniqueConstraint("job_id", "ref", name="uq_user_stories_job_ref"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(String(36), ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    ref = Column(String(128), nullable=False)  # the story's id in the spec (e.g. "us-1")
+    position = Column(Integer, nullable=False)  # index in spec.user_stories
+    data = Column(JSON, nullable=False)  # the story without its acceptance_criteria
+    version = Column(Integer, nullable=False, default=1)  # bumped on every change (If-Match)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class AcceptanceCriterion(Base):
+    __tablename__ = "acceptance_criteria"
+    __table_args__ = (UniqueConstraint("story_id", "ref", name="uq_acceptance_criteria_story_ref"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    story_id = Column(Integer, ForeignKey("user_stories.id", ondelete="CASCADE"), nullable=False, index=True)
+    job_id = Column(String(36), nullable=False, index=True)
+    ref = Column(String(128), nullable=False)  # the AC's id within its story (e.g. "AC1")
+    position = Column(Integer, nullable=False)
+    data = Column(JSON, nullable=False)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
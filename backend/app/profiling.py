@@ -0,0 +1,204 @@
+"""Opt-in profiling of pipeline runs and API requests: "cpu" (cProfile .pstats) or "sample" (folded stacks)."""
+import cProfile
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from app.config import settings
+
+MODES = ("cpu", "sample")
+PROFILE_DIRNAME = "profiles"
+_EXTENSIONS = {"cpu": ".pstats", "sample": ".folded"}
+_APP_ROOT = Path(__file__).resolve().parent.parent
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9]+")
+
+
+def _label(code) -> str:
+    path = Path(code.co_filename)
+    try:
+        path = path.relative_to(_APP_ROOT)
+    except ValueError:
+        path = Path(*path.parts[-2:])
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """Counts the stacks of `thread_ids` (None = every other thread) every `interval_s`."""
+
+    def __init__(self, interval_s: float, thread_ids: set[int] | None = None):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval_s = interval_s
+        self.thread_ids = thread_ids
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._labels: dict = {}  # code object -> frame label
+        self._stop_event = threading.Event()
+
+    def _fold(self, frame, root: str | None) -> str:
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = _label(code)
+            labels.append(label)
+            frame = frame.f_back
+        if root:
+            labels.append(root)
+        return ";".join(reversed(labels))
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        while True:  # sample first, so even a block shorter than the interval gets a sample
+            names = {t.ident: t.name for t in threading.enumerate()} if self.thread_ids is None else {}
+            for tid, frame in sys._current_frames().items():
+                if tid == own or (self.thread_ids is not None and tid not in self.thread_ids):
+                    continue
+                self.stacks[self._fold(frame, names.get(tid, str(tid)) if self.thread_ids is None else None)] += 1
+            self.samples += 1
+            if self._stop_event.wait(self.interval_s):
+                break
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profile:
+    """One profiling session; start() and stop() must be called from the profiled thread."""
+
+    def __init__(self, mode: str, all_threads: bool = False):
+        if mode not in MODES:
+            raise ValueError(f"profile mode must be one of {MODES}")
+        self.mode = mode
+        self.all_threads = all_threads
+        self._profiler: cProfile.Profile | None = None
+        self._sampler: StackSampler | None = None
+        self._started = 0.0
+        self.duration_s = 0.0
+
+    def start(self) -> "Profile":
+        self._started = time.perf_counter()
+        if self.mode == "cpu":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            thread_ids = None if self.all_threads else {threading.get_ident()}
+            self._sampler = StackSampler(settings.profile_sample_interval_ms / 1000, thread_ids)
+            self._sampler.start()
+        return self
+
+    def stop(self) -> None:
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        self.duration_s = time.perf_counter() - self._started
+
+    def save(self, out_dir: Path, name: str) -> Path:
+        """Write the profile to out_dir as {name}-{timestamp}-{id}.pstats|.folded; returns the path."""
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{_SAFE_NAME.sub('_', name).strip('_')}-{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+        path = out_dir / f"{stem}{_EXTENSIONS[self.mode]}"
+        tmp = path.with_name(f"{path.name}.tmp")
+        if self._profiler is not None:
+            self._profiler.dump_stats(str(tmp))
+        else:
+            tmp.write_text(self._sampler.folded())
+        os.replace(tmp, path)
+        prune_profiles(out_dir, max_files=settings.profile_max_files)
+        return path
+
+
+@contextmanager
+def profiled(mode: str | None, out_dir: Path, name: str) -> Iterator[Profile | None]:
+    """Profile the block in `mode` and save it to out_dir (also when the block raises); no-op for None."""
+    if mode is None:
+        yield None
+        return
+    profile = Profile(mode).start()
+    try:
+        yield profile
+    finally:
+        profile.stop()
+        profile.save(out_dir, name)
+
+
+def request_mode(request) -> str | None:
+    """Profile mode a request asks for (X-Profile header or ?profile=), if valid and allowed."""
+    if not settings.profile_requests or not _request_allowed(request):
+        return None
+    mode = request.headers.get("x-profile")
+    if mode is None and b"profile=" in request.scope.get("query_string", b""):
+        mode = request.query_params.get("profile")
+    if mode == "cpu" and sys.getprofile() is not None:
+        return None  # a cProfile of another request is running on this (event loop) thread
+    return mode if mode in MODES else None
+
+
+def _request_allowed(request) -> bool:
+    """Admin routes, or any route with the right X-Profile-Token: a profile costs CPU and disk."""
+    if request.url.path.startswith("/api/admin/"):
+        return True
+    token = request.headers.get("x-profile-token")
+    return bool(settings.profile_token and token and hmac.compare_digest(token, settings.profile_token))
+
+
+def job_mode(job) -> str | None:
+    """Profile mode for a pipeline run: the job's own, else `profile_jobs`."""
+    mode = job.profile or settings.profile_jobs or None
+    return mode if mode in MODES else None
+
+
+def list_profiles(out_dir: Path) -> list[dict]:
+    """Saved profiles in out_dir, newest first."""
+    if not out_dir.is_dir():
+        return []
+    out = []
+    for path in out_dir.iterdir():
+        mode = next((m for m, ext in _EXTENSIONS.items() if path.suffix == ext), None)
+        if mode is None:
+            continue
+        st = path.stat()
+        out.append({"name": path.name, "mode": mode, "bytes": st.st_size, "created_at": datetime.utcfromtimestamp(st.st_mtime)})
+    out.sort(key=lambda p: p["created_at"], reverse=True)
+    return out
+
+
+def prune_profiles(out_dir: Path, max_files: int = 0, max_age_s: float = 0, now: float | None = None, dry_run: bool = False) -> tuple[int, int]:
+    """Delete profiles in out_dir older than max_age_s, then all but the newest max_files (0 = no limit).
+
+    Returns (files, bytes) removed, or that would be with dry_run.
+    """
+    if not out_dir.is_dir():
+        return 0, 0
+    now = time.time() if now is None else now
+    saved = sorted(((p.stat(), p) for p in out_dir.iterdir() if p.suffix in _EXTENSIONS.values()), key=lambda s: s[0].st_mtime, reverse=True)
+    files = freed = 0
+    for i, (st, path) in enumerate(saved):
+        if (max_files and i >= max_files) or (max_age_s and now - st.st_mtime > max_age_s):
+            if not dry_run:
+                path.unlink(missing_ok=True)
+            files += 1
+            freed += st.st_size
+    return files, freed
+
+
+def resolve_profile(out_dir: Path, name: str) -> Path | None:
+    """Path of a saved profile by file name (None for unknown names; never outside out_dir)."""
+    if Path(name).name != name or Path(name).suffix not in _EXTENSIONS.values():
+        return None
+    path = out_dir / name
+    return path if path.is_file() else None
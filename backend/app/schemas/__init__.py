@@ -1,3 +1,26 @@
-from .job import JobCreate, JobResponse, JobStatus
+from .export import BulkExportRequest
+from .job import JobCreate, JobListItem, JobListResponse, JobProgress, JobResponse, JobSimilar, JobStatus, JobUsage, SimilarItem, SimilarMatch, UsageCounts
+from .profile import ProfileInfo
+from .search import SearchHit, SearchResponse
+from .story import AcRow, JobStories, StoryRow
 
-__all__ = ["JobCreate", "JobResponse", "JobStatus"]
+__all__ = [
+    "AcRow",
+    "BulkExportRequest",
+    "JobCreate",
+    "JobListItem",
+    "JobListResponse",
+    "JobProgress",
+    "JobResponse",
+    "JobSimilar",
+    "JobStories",
+    "JobStatus",
+    "JobUsage",
+    "ProfileInfo",
+    "SearchHit",
+    "SearchResponse",
+    "SimilarItem",
+    "SimilarMatch",
+    "StoryRow",
+    "UsageCounts",
+]
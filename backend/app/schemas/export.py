@@ -0,0 +1,16 @@
+"""Pydantic schemas for the Export API."""
+from datetime import datetime
+from typing import Literal
+from pydantic import BaseModel, Field
+
+
+class BulkExportRequest(BaseModel):
+    """Jobs to archive: explicit ids, or a status/date filter when job_ids is omitted."""
+    job_ids: list[str] | None = None
+    status: str | None = "completed"
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+    formats: list[str] = Field(default_factory=lambda: ["md", "json"])
+    include_transcripts: bool = True
+    screenshots: Literal["none", "referenced", "all"] = "none"
+    limit: int = Field(200, ge=1, le=1000)
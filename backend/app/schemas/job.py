@@ -24,3 +24,71 @@ class JobResponse(JobStatus):
     transcript_segments: int | None = None
     screenshots_captured: int | None = None
     screenshots_analyzed: int | None = None
+    current_stage: str | None = None
+    stage_checkpoints: dict[str, Any] | None = None
+    budget_usd: float | None = None
+    usage: dict[str, Any] | None = None
+    profile: str | None = None
+    spec_version: int = 0  # bumped on every spec change; If-Match for PATCH /spec
+
+
+class JobProgress(BaseModel):
+    """Compact status for polling: no spec/AC/evidence blobs."""
+    id: str
+    status: str
+    current_stage: str | None = None
+    transcript_segments: int | None = None
+    screenshots_captured: int | None = None
+    screenshots_analyzed: int | None = None
+    updated_at: datetime
+    error_message: str | None = None
+
+
+class JobListItem(JobProgress):
+    created_at: datetime
+
+
+class JobListResponse(BaseModel):
+    items: list[JobListItem]
+    next_cursor: str | None = None  # pass as ?cursor= to get the next page; None on the last page
+
+
+class UsageCounts(BaseModel):
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    audio_seconds: float = 0.0
+    images: int = 0
+    cost_usd: float = 0.0
+
+
+class JobUsage(BaseModel):
+    """Token/cost ledger of a job: totals, per stage and model, and budget state changes."""
+    id: str
+    budget_usd: float  # 0 = unlimited
+    budget_state: str  # ok | degraded | exhausted
+    totals: UsageCounts
+    by_stage: dict[str, dict[str, UsageCounts]]
+    events: list[dict[str, Any]]
+
+
+class SimilarMatch(BaseModel):
+    job_id: str
+    ref: str
+    title: str | None = None
+    text: str
+    similarity: float  # estimated Jaccard similarity of normalized text (0-1)
+
+
+class SimilarItem(BaseModel):
+    ref: str  # story id, or "{story id}/{AC id}"
+    title: str | None = None
+    text: str
+    matches: list[SimilarMatch]
+
+
+class JobSimilar(BaseModel):
+    """Near-duplicates in other jobs of each of this job's stories (or ACs)."""
+    id: str
+    kind: str
+    items: list[SimilarItem]
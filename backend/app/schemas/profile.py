@@ -0,0 +1,10 @@
+"""Pydantic schemas for saved profiles (app.profiling)."""
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class ProfileInfo(BaseModel):
+    name: str  # file name; download with GET .../profiles/{name}
+    mode: str  # "cpu" (.pstats) or "sample" (.folded)
+    bytes: int
+    created_at: datetime
@@ -0,0 +1,19 @@
+"""Pydantic schemas for the Search API."""
+from typing import Literal
+from pydantic import BaseModel
+
+
+class SearchHit(BaseModel):
+    job_id: str
+    kind: Literal["transcript", "story", "ac"]
+    ref: str | None = None  # segment index, story id, or "{story id}/{AC id}"
+    title: str | None = None  # story title for stories and ACs
+    snippet: str  # matched text, matches wrapped in « »
+    timestamp_ms: int | None = None  # evidence moment in the recording
+    screenshot_id: str | None = None  # GET /api/jobs/{job_id}/screenshots/{screenshot_id}
+    score: float  # higher is better; comparable within one response only
+
+
+class SearchResponse(BaseModel):
+    query: str
+    hits: list[SearchHit]
@@ -0,0 +1,23 @@
+"""Pydantic schemas for the Stories API (one row per user story and acceptance criterion)."""
+from pydantic import BaseModel
+
+
+class AcRow(BaseModel):
+    ref: str  # the AC's id, unique within its story
+    position: int
+    version: int  # send as If-Match to edit
+    data: dict
+
+
+class StoryRow(BaseModel):
+    ref: str  # the story's id, unique within the job
+    position: int
+    version: int  # send as If-Match to edit
+    data: dict  # the story without its acceptance_criteria
+    acceptance_criteria: list[AcRow]
+
+
+class JobStories(BaseModel):
+    job_id: str
+    spec_version: int  # send as If-Match ("spec-N") to PATCH /spec
+    user_stories: list[StoryRow]
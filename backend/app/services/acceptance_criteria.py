@@ -1,9 +1,13 @@
 """Acceptance criteria generation: convert spec to GIVEN/WHEN/THEN with evidence_refs."""
 import json
 from pathlib import Path
-from openai import OpenAI
 
 from app.config import settings, openai_client_kwargs
+from app.metrics import RETRIES
+from app.services.artifacts import full_transcript_text, read_json
+from app.services.dedup import flag_duplicate_acs
+from app.services.llm import chat_completion
+from app.tracing import traced
 
 AC_SCHEMA_KEYS = ("id", "given", "when", "then", "and", "evidence_refs")
 AC_REPAIR_PROMPT = """Fix the following JSON. It must be an object with key "user_stories" which is an array. Each user story must have: id, title, persona (string or array), story_text (string), acceptance_criteria (array). Each acceptance criterion must have: id (local numbering like AC1, AC2 per story), given, when, then, and (optional array of strings), evidence_refs (array of { timestamp, transcript_excerpt, screenshot_id }). Each story must have at least 1 acceptance criterion. Return only valid JSON."""
@@ -20,27 +24,13 @@ def _validate_ac_item(item: dict) -> dict:
     }
 
 
-def _full_transcript_text(transcript_path: Path) -> str:
-    """Build full transcript as continuous text (primary source for AC)."""
-    if not transcript_path.exists():
-        return ""
-    data = json.loads(transcript_path.read_text())
-    segments = data.get("segments", [])
-    lines = []
-    for s in segments:
-        start = s.get("start", 0)
-        end = s.get("end", 0)
-        text = (s.get("text", "") or "").strip()
-        if text:
-            lines.append(f"[{start:.1f}s - {end:.1f}s] {text}")
-    return "\n".join(lines)
-
-
+@traced()
 def generate_acceptance_criteria(spec_path: str, ac_path: str, job_dir: Path) -> dict:
     """Generate acceptance criteria nested under each user story in GIVEN/WHEN/THEN/AND format; attach evidence_refs; save and return."""
-    spec_data = json.loads(Path(spec_path).read_text())
-    transcript_path = job_dir / "transcript.json"
-    full_transcript = _full_transcript_text(transcript_path)
+    spec_data = read_json(spec_path)
+    full_transcript = full_transcript_text(job_dir / "transcript.json")
+    from openai import OpenAI
+
     client = OpenAI(**openai_client_kwargs())
     
     user_stories = spec_data.get("user_stories", [])
@@ -73,8 +63,9 @@ CRITICAL RULES:
 ## User stories (generate ACs for each)
 {json.dumps(user_stories, indent=2)}"""
 
-    resp = client.chat.completions.create(
-        model="gpt-4o",
+    resp = chat_completion(
+        client,
+        model=settings.ac_model,
         messages=[
             {"role": "system", "content": "You output only valid JSON with key user_stories. Each user story must have an acceptance_criteria array. Generate exhaustive acceptance criteria from the transcript for each story."},
             {"role": "user", "content": prompt},
@@ -90,8 +81,10 @@ CRITICAL RULES:
     try:
         data = json.loads(text)
     except json.JSONDecodeError:
-        repair_resp = client.chat.completions.create(
-            model="gpt-4o",
+        RETRIES.labels(kind="json_repair").inc()
+        repair_resp = chat_completion(
+            client,
+            model=settings.ac_model,
             messages=[{"role": "user", "content": f"{AC_REPAIR_PROMPT}\n\n{text}"}],
             max_tokens=16384,
         )
@@ -134,6 +127,8 @@ CRITICAL RULES:
         us_copy["acceptance_criteria"] = validated_ac
         validated_stories.append(us_copy)
     
+    # ACs restating an earlier one (in any story) get duplicate_of, so they can be skipped on import
+    flag_duplicate_acs(validated_stories)
     out = {"user_stories": validated_stories}
     Path(ac_path).write_text(json.dumps(out, indent=2))
     return out
@@ -0,0 +1,107 @@
+"""Process-wide cache of parsed job artifacts (transcript.json, manifest.json, spec.json, ...).
+
+Entries are keyed by (path, parser) and checked against the file's (mtime_ns, size) on every
+lookup, so a rewritten artifact is re-read on next use and nothing needs explicit invalidation.
+Size-bounded LRU, weighted by file size (`artifact_cache_mb`). Thread-safe; two threads missing
+on the same file at once may both parse it, and the last one stored wins.
+
+Cached values are shared between callers: treat them as read-only (copy before mutating).
+"""
+import copy
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable
+
+from app.config import settings
+from app.metrics import CACHE_HITS, CACHE_MISSES
+
+
+class ArtifactCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        # (path, parser) -> ((mtime_ns, size), value)
+        self._entries: OrderedDict[tuple[str, Callable], tuple[tuple[int, int], Any]] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def load(self, path: Path | str, parse: Callable[[bytes], Any]) -> Any:
+        """parse(file bytes), cached until the file changes. Raises FileNotFoundError like open()."""
+        path = Path(path)
+        st = path.stat()
+        key, stamp = (str(path), parse), (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == stamp:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                CACHE_HITS.labels(cache="artifact").inc()
+                return cached[1]
+            self._misses += 1
+        CACHE_MISSES.labels(cache="artifact").inc()
+        raw = path.read_bytes()
+        # Stamp from before the read: a write racing the read leaves a stale stamp, so it re-reads next time
+        value = parse(raw)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[0][1]
+            if st.st_size <= self.max_bytes:
+                self._entries[key] = (stamp, value)
+                self._bytes += st.st_size
+                while self._bytes > self.max_bytes:
+                    _, ((_, size), _) = self._entries.popitem(last=False)
+                    self._bytes -= size
+        return value
+
+    def invalidate(self, path: Path | str) -> None:
+        """Drop every cached view of `path` (not needed after ordinary writes; mtime/size catch those)."""
+        path = str(path)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == path]:
+                self._bytes -= self._entries.pop(key)[0][1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else None,
+            }
+
+
+artifact_cache = ArtifactCache(settings.artifact_cache_mb * 1024 * 1024)
+
+
+def read_json(path: Path | str) -> Any:
+    """Parsed JSON file through the shared cache (read-only; see module docstring)."""
+    return artifact_cache.load(path, json.loads)
+
+
+def read_json_copy(path: Path | str) -> Any:
+    """read_json() for callers that modify the result."""
+    return copy.deepcopy(read_json(path))
+
+
+def _transcript_text(raw: bytes) -> str:
+    lines = []
+    for s in json.loads(raw).get("segments", []):
+        text = (s.get("text", "") or "").strip()
+        if text:
+            lines.append(f"[{s.get('start', 0):.1f}s - {s.get('end', 0):.1f}s] {text}")
+    return "\n".join(lines)
+
+
+def full_transcript_text(transcript_path: Path | str) -> str:
+    """Whole transcript as "[start - end] text" lines, the primary source for spec and AC prompts ("" if missing)."""
+    try:
+        return artifact_cache.load(transcript_path, _transcript_text)
+    except FileNotFoundError:
+        return ""
@@ -0,0 +1,182 @@
+"""Near-duplicate user stories and acceptance criteria, within a job and across jobs (MinHash + LSH)."""
+import hashlib
+import random
+import re
+from collections import defaultdict
+
+from sqlalchemy import delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from app.models import LshBucket, StorySignature
+
+NUM_PERM = 64
+BANDS, ROWS = 16, 4  # a pair at similarity 0.5 shares a bucket with probability ~0.64, at 0.8 ~1.0
+SHINGLE_WORDS = 2
+DEFAULT_MIN_SIMILARITY = 0.5
+IN_JOB_DUPLICATE_SIMILARITY = 0.8  # stricter: flags restated ACs, not merely related ones
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(0x5EED)  # fixed: stored signatures stay comparable across processes and restarts
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can for from has have i in is it its of on or so that the their then "
+    "this to was when will with".split()
+)
+
+
+def _stem(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def normalize(text: str) -> list[str]:
+    return [_stem(w) for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def _shingles(words: list[str]) -> set[str]:
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash(text: str) -> list[int] | None:
+    """MinHash signature of the text's shingles; None for text with no words."""
+    shingles = _shingles(normalize(text))
+    if not shingles:
+        return None
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "big") for s in shingles]
+    return [min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH for a, b in _PERMS]
+
+
+def similarity(sig_a: list[int], sig_b: list[int]) -> float:
+    """Estimated Jaccard similarity: the fraction of matching hashes."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _bands(signature: list[int]) -> list[tuple[int, str]]:
+    return [
+        (band, hashlib.blake2b(repr(signature[band * ROWS : (band + 1) * ROWS]).encode(), digest_size=8).hexdigest())
+        for band in range(BANDS)
+    ]
+
+
+def story_text(story: dict) -> str:
+    return f"{story.get('title') or ''}\n{story.get('story_text') or ''}"
+
+
+def ac_text(ac: dict) -> str:
+    ands = ac.get("and") if isinstance(ac.get("and"), list) else []
+    return "\n".join(str(p) for p in (ac.get("given"), ac.get("when"), ac.get("then"), *ands) if p)
+
+
+def flag_duplicate_acs(stories: list[dict]) -> int:
+    """Mark ACs that restate an earlier AC of the same job: `duplicate_of` = "{story id}/{AC id}". Returns the count."""
+    seen: list[tuple[str, list[int]]] = []
+    flagged = 0
+    for n, story in enumerate(stories):
+        story_id = str(story.get("id") or f"us-{n + 1}")
+        for ac in story.get("acceptance_criteria", []):
+            sig = minhash(ac_text(ac))
+            if sig is None:
+                continue
+            match = next((ref for ref, other in seen if similarity(sig, other) >= IN_JOB_DUPLICATE_SIMILARITY), None)
+            if match:
+                ac["duplicate_of"] = match
+                flagged += 1
+            else:
+                seen.append((f"{story_id}/{ac.get('id', '')}", sig))
+    return flagged
+
+
+def _items(spec: dict | None, story_ids: set[str] | None = None):
+    """(kind, ref, title, text) for each story and AC of a spec (only story_ids' if given)."""
+    for n, story in enumerate((spec or {}).get("user_stories") or []):
+        if not isinstance(story, dict):
+            continue
+        story_id = str(story.get("id") or f"us-{n + 1}")
+        if story_ids is not None and story_id not in story_ids:
+            continue
+        title = str(story.get("title") or "")
+        yield "story", story_id, title, story_text(story)
+        for ac in story.get("acceptance_criteria") or []:
+            if isinstance(ac, dict):
+                yield "ac", f"{story_id}/{ac.get('id', '')}", title, ac_text(ac)
+
+
+def remove_job(db: Session, job_id: str) -> None:
+    db.execute(delete(LshBucket).where(LshBucket.job_id == job_id))
+    db.execute(delete(StorySignature).where(StorySignature.job_id == job_id))
+
+
+def _remove_stories(db: Session, job_id: str, story_ids: set[str]) -> None:
+    refs = [StorySignature.ref == s for s in story_ids] + [StorySignature.ref.startswith(f"{s}/", autoescape=True) for s in story_ids]
+    ids = select(StorySignature.id).where(StorySignature.job_id == job_id, or_(*refs))
+    db.execute(delete(LshBucket).where(LshBucket.signature_id.in_(ids)))
+    db.execute(delete(StorySignature).where(StorySignature.id.in_(ids)))
+
+
+def index_job(db: Session, job_id: str, spec: dict | None, story_ids: set[str] | None = None) -> int:
+    """Replace the job's signatures and buckets (caller commits); returns the number of items indexed.
+
+    With story_ids only those stories and their ACs are replaced (after a story/AC edit).
+    """
+    if story_ids is None:
+        remove_job(db, job_id)
+    elif story_ids:
+        _remove_stories(db, job_id, story_ids)
+    count = 0
+    for kind, ref, title, text in _items(spec, story_ids):
+        sig = minhash(text)
+        if sig is None:
+            continue
+        row = StorySignature(job_id=job_id, kind=kind, ref=ref, title=title, text=text, signature=sig)
+        db.add(row)
+        db.flush()  # row.id for the buckets
+        db.add_all(LshBucket(band=band, bucket=bucket, signature_id=row.id, job_id=job_id) for band, bucket in _bands(sig))
+        count += 1
+    return count
+
+
+async def find_similar(
+    db: AsyncSession, job_id: str, kind: str = "story", min_similarity: float = DEFAULT_MIN_SIMILARITY, limit: int = 10
+) -> list[dict]:
+    """For each of the job's items of `kind`, the most similar items of other jobs (best first)."""
+    mine = aliased(LshBucket)
+    theirs = aliased(LshBucket)
+    # Candidate pairs: same (band, bucket), via the band/bucket index
+    pairs = (
+        await db.execute(
+            select(mine.signature_id, theirs.signature_id)
+            .join(theirs, (theirs.band == mine.band) & (theirs.bucket == mine.bucket))
+            .where(mine.job_id == job_id, theirs.job_id != job_id)
+            .distinct()
+        )
+    ).all()
+    own = (
+        await db.scalars(select(StorySignature).where(StorySignature.job_id == job_id, StorySignature.kind == kind).order_by(StorySignature.id))
+    ).all()
+    candidate_ids = {theirs_id for _, theirs_id in pairs}
+    candidates = {
+        s.id: s
+        for s in (
+            await db.scalars(select(StorySignature).where(StorySignature.id.in_(candidate_ids), StorySignature.kind == kind))
+        ).all()
+    } if candidate_ids else {}
+    by_own: dict[int, set[int]] = defaultdict(set)
+    for own_id, other_id in pairs:
+        if other_id in candidates:
+            by_own[own_id].add(other_id)
+
+    results = []
+    for item in own:
+        matches = []
+        for other_id in by_own.get(item.id, ()):
+            other = candidates[other_id]
+            score = similarity(item.signature, other.signature)
+            if score >= min_similarity:
+                matches.append({"job_id": other.job_id, "ref": other.ref, "title": other.title, "text": other.text, "similarity": round(score, 3)})
+        matches.sort(key=lambda m: m["similarity"], reverse=True)
+        results.append({"ref": item.ref, "title": item.title, "text": item.text, "matches": matches[:limit]})
+    return results
@@ -0,0 +1,136 @@
+"""Rendered-export cache: keyed by (job id, format, updated_at), size-bounded LRU (compressed variants count), with precompressed variants."""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable
+
+try:  # optional: brotli is preferred over gzip when the client accepts it
+    import brotli
+except ImportError:
+    brotli = None
+
+from app.config import settings
+from app.metrics import CACHE_HITS
+
+MIN_COMPRESS_BYTES = 1024  # below this, compression costs more than it saves
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+@dataclass
+class RenderedExport:
+    body: bytes
+    media_type: str
+    etag: str
+    _encoded: dict[str, bytes] = field(default_factory=dict)  # added by ExportCache.encoded(), under its lock
+
+    def etag_for(self, encoding: str | None) -> str:
+        """Strong ETag of the representation sent: each content-coding has its own bytes, so its own tag."""
+        return self.etag if not encoding else f'{self.etag[:-1]}-{encoding}"'
+
+    def cached_encoding(self, encoding: str) -> bytes | None:
+        """The body compressed with `encoding` if already computed (cheap; ExportCache.encoded() may compress)."""
+        return self._encoded.get(encoding)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(v) for v in self._encoded.values())
+
+
+class ExportCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[str, str, str], RenderedExport] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(job_id: str, variant: str, updated_at: datetime | None) -> tuple[str, str, str]:
+        return (job_id, variant, updated_at.isoformat() if updated_at else "")
+
+    def get(self, job_id: str, variant: str, updated_at: datetime | None) -> RenderedExport | None:
+        key = self._key(job_id, variant, updated_at)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                CACHE_HITS.labels(cache="export").inc()
+            return entry
+
+    def put(self, job_id: str, variant: str, updated_at: datetime | None, media_type: str, text: str) -> RenderedExport:
+        body = text.encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        entry = RenderedExport(body=body, media_type=media_type, etag=etag)
+        with self._lock:
+            self._entries[self._key(job_id, variant, updated_at)] = entry
+            self._evict()
+        return entry
+
+    def get_or_render(
+        self, job_id: str, variant: str, updated_at: datetime | None, media_type: str, render: Callable[[], str]
+    ) -> RenderedExport:
+        entry = self.get(job_id, variant, updated_at)
+        if entry is None:
+            entry = self.put(job_id, variant, updated_at, media_type, render())
+        return entry
+
+    def encoded(self, entry: RenderedExport, encoding: str) -> bytes:
+        """entry's body compressed with `encoding` ("br" or "gzip"), computed once per cache entry.
+
+        Compresses outside the lock; adding the variant grows the entry, so the cache is trimmed again.
+        """
+        data = entry.cached_encoding(encoding)
+        if data is None:
+            data = _compress(entry.body, encoding)
+            with self._lock:
+                data = entry._encoded.setdefault(encoding, data)  # a concurrent request may have won
+                self._evict()
+        return data
+
+    def invalidate(self, job_id: str) -> None:
+        """Drop every cached export of a job (spec edited or ACs regenerated)."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == job_id]:
+                del self._entries[key]
+
+    def _evict(self) -> None:
+        total = sum(e.size for e in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            total -= old.size
+
+
+export_cache = ExportCache(settings.export_cache_mb * 1024 * 1024)
+
+
+def negotiate_encoding(accept_encoding: str | None, size: int) -> str | None:
+    """Pick "br" (if available) or "gzip" from Accept-Encoding; None for small bodies or no match."""
+    if not accept_encoding or size < MIN_COMPRESS_BYTES:
+        return None
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match (RFC 9110 13.1.2): "*", or any tag of the comma-separated list, compared weakly (W/ ignored)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    ours = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == ours for tag in if_none_match.split(","))
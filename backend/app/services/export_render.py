@@ -0,0 +1,219 @@
+"""Export renderers: turn a job spec into Markdown, JSON, CSV, Jira or Linear bulk-import payloads."""
+import csv
+import io
+import json
+from typing import Any, Callable
+
+
+def _persona_str(persona: Any) -> str:
+    return ", ".join(persona) if isinstance(persona, list) else (persona or "")
+
+
+def _evidence_lines(refs: list[dict]) -> list[str]:
+    lines = []
+    for r in refs:
+        ts = r.get("timestamp", 0)
+        excerpt = (r.get("transcript_excerpt", "") or "")[:200]
+        sid = r.get("screenshot_id", "")
+        lines.append(f"- {ts}ms | {sid} | {excerpt}...")
+    return lines
+
+
+def render_markdown(spec: dict, evidence_map: dict) -> str:
+    # User stories now have nested acceptance_criteria
+    user_stories = spec.get("user_stories", []) or []
+    lines = [
+        "# Feature summary",
+        "",
+        spec.get("feature_summary", ""),
+        "",
+        "## User stories",
+        "",
+    ]
+    for us in user_stories:
+        title = us.get("title", "")
+        persona = us.get("persona", "")
+        story_text = us.get("story_text", "")
+        tags = us.get("tags", [])
+        desc = us.get("description", "")
+        refs = us.get("evidence_refs", [])
+        acs = us.get("acceptance_criteria", [])
+        lines.append(f"### {title}")
+        lines.append("")
+        if persona:
+            lines.append(f"**Persona:** {_persona_str(persona)}")
+            lines.append("")
+        if story_text:
+            lines.append(f"*{story_text}*")
+            lines.append("")
+        elif desc:
+            lines.append(desc)
+            lines.append("")
+        if tags:
+            lines.append(f"**Tags:** {', '.join(tags)}")
+            lines.append("")
+        if refs:
+            lines.append("**Evidence:**")
+            lines.extend(_evidence_lines(refs))
+            lines.append("")
+        if acs:
+            lines.append("#### Acceptance criteria")
+            lines.append("")
+            for ac in acs:
+                ac_id = ac.get('id', '')
+                lines.append(f"**{ac_id}**")
+                lines.append("")
+                lines.append(f"**GIVEN** {ac.get('given', '')}")
+                lines.append("")
+                lines.append(f"**WHEN** {ac.get('when', '')}")
+                lines.append("")
+                lines.append(f"**THEN** {ac.get('then', '')}")
+                and_list = ac.get("and", [])
+                if and_list:
+                    for and_item in and_list:
+                        lines.append("")
+                        lines.append(f"**AND** {and_item}")
+                lines.append("")
+                ac_refs = ac.get("evidence_refs", [])
+                if ac_refs:
+                    lines.append("Evidence:")
+                    lines.extend(_evidence_lines(ac_refs))
+                    lines.append("")
+        lines.append("")
+    lines.append("## Open questions")
+    lines.append("")
+    for q in spec.get("open_questions", []) or []:
+        lines.append(f"- {q}")
+    return "\n".join(lines)
+
+
+def render_json(spec: dict, evidence_map: dict) -> str:
+    payload = {
+        "feature_summary": spec.get("feature_summary", ""),
+        "user_stories": spec.get("user_stories", []) or [],
+        "open_questions": spec.get("open_questions", []),
+        "evidence_map": evidence_map,
+    }
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+CSV_COLUMNS = ("story_id", "story_title", "persona", "story_text", "tags", "ac_id", "given", "when", "then", "and", "evidence")
+
+
+def render_csv(spec: dict, evidence_map: dict) -> str:
+    """One row per acceptance criterion (a story without ACs gets one row with empty AC columns)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_COLUMNS)
+    for us in spec.get("user_stories", []) or []:
+        story = [
+            us.get("id", ""),
+            us.get("title", ""),
+            _persona_str(us.get("persona")),
+            us.get("story_text", "") or us.get("description", ""),
+            "; ".join(us.get("tags", []) or []),
+        ]
+        acs = us.get("acceptance_criteria", []) or []
+        for ac in acs or [{}]:
+            refs = ac.get("evidence_refs") or us.get("evidence_refs") or []
+            writer.writerow(story + [
+                ac.get("id", ""),
+                ac.get("given", ""),
+                ac.get("when", ""),
+                ac.get("then", ""),
+                "; ".join(ac.get("and", []) or []),
+                "; ".join(f"{r.get('timestamp', 0)}ms/{r.get('screenshot_id', '')}" for r in refs),
+            ])
+    return buf.getvalue()
+
+
+def _story_description(us: dict, bold: Callable[[str], str], heading: str) -> str:
+    """Story text followed by its acceptance criteria, using the target tracker's markup."""
+    parts = []
+    text = us.get("story_text", "") or us.get("description", "")
+    if text:
+        parts.append(text)
+    persona = _persona_str(us.get("persona"))
+    if persona:
+        parts.append(f"{bold('Persona:')} {persona}")
+    acs = us.get("acceptance_criteria", []) or []
+    if acs:
+        parts.append(heading)
+        for ac in acs:
+            block = [
+                bold(ac.get("id", "")),
+                f"{bold('GIVEN')} {ac.get('given', '')}",
+                f"{bold('WHEN')} {ac.get('when', '')}",
+                f"{bold('THEN')} {ac.get('then', '')}",
+            ]
+            block += [f"{bold('AND')} {a}" for a in ac.get("and", []) or []]
+            parts.append("\n".join(block))
+    return "\n\n".join(parts)
+
+
+def render_jira(spec: dict, evidence_map: dict) -> str:
+    """Jira JSON importer payload: one Story issue per user story, ACs in the description (wiki markup)."""
+    issues = []
+    for us in spec.get("user_stories", []) or []:
+        issues.append({
+            "externalId": us.get("id", ""),
+            "issueType": "Story",
+            "summary": us.get("title", ""),
+            "description": _story_description(us, lambda s: f"*{s}*", "h3. Acceptance criteria"),
+            "labels": [t.replace(" ", "-") for t in us.get("tags", []) or []],
+        })
+    return json.dumps({"projects": [{"issues": issues}]})
+
+
+def render_linear(spec: dict, evidence_map: dict) -> str:
+    """Linear bulk-import payload (issueCreate inputs): title, Markdown description, labels."""
+    issues = []
+    for us in spec.get("user_stories", []) or []:
+        issues.append({
+            "title": us.get("title", ""),
+            "description": _story_description(us, lambda s: f"**{s}**", "### Acceptance criteria"),
+            "labels": us.get("tags", []) or [],
+        })
+    return json.dumps({"issues": issues})
+
+
+def render_transcript_text(segments: list[dict]) -> str:
+    """One line per segment: [MM:SS.mmm - MM:SS.mmm] text."""
+    lines = []
+    for s in segments:
+        start = s.get("start", 0)
+        end = s.get("end", 0)
+        text = (s.get("text", "") or "").strip()
+        start_m = int(start // 60)
+        start_s = start % 60
+        end_m = int(end // 60)
+        end_s = end % 60
+        ts = f"[{start_m:02d}:{start_s:06.3f} - {end_m:02d}:{end_s:06.3f}]"
+        lines.append(f"{ts} {text}")
+    return "\n".join(lines)
+
+
+def referenced_screenshot_ids(spec: Any) -> set[str]:
+    """screenshot_id of every evidence_ref anywhere in the spec (stories, ACs, workflows, rules, ...)."""
+    ids: set[str] = set()
+    stack = [spec]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for ref in node.get("evidence_refs") or []:
+                if isinstance(ref, dict) and ref.get("screenshot_id") not in (None, ""):
+                    ids.add(str(ref["screenshot_id"]))
+            stack.extend(v for v in node.values() if isinstance(v, (dict, list)))
+        elif isinstance(node, list):
+            stack.extend(v for v in node if isinstance(v, (dict, list)))
+    return ids
+
+
+# format -> (renderer, media type, file extension)
+EXPORT_FORMATS: dict[str, tuple[Callable[[dict, dict], str], str, str]] = {
+    "md": (render_markdown, "text/markdown; charset=utf-8", "md"),
+    "json": (render_json, "application/json", "json"),
+    "csv": (render_csv, "text/csv; charset=utf-8", "csv"),
+    "jira": (render_jira, "application/json", "jira.json"),
+    "linear": (render_linear, "application/json", "linear.json"),
+}
@@ -2,7 +2,11 @@
 import json
 from pathlib import Path
 
+from app.services.artifacts import read_json
+from app.tracing import traced
 
+
+@traced()
 def build_grounded_chunks(job_dir: Path, grounded_path: str) -> None:
     """Produce grounded_chunks.json: each item has timestamp_ms, screenshot_id, screenshot_path, vision_summary, transcript_excerpt."""
     manifest_path = job_dir / "screenshots" / "manifest.json"
@@ -14,8 +18,8 @@ def build_grounded_chunks(job_dir: Path, grounded_path: str) -> None:
         Path(grounded_path).write_text(json.dumps([]))
         return
 
-    manifest = json.loads(manifest_path.read_text())
-    transcript_data = json.loads(transcript_path.read_text())
+    manifest = read_json(manifest_path)
+    transcript_data = read_json(transcript_path)
     segments = transcript_data.get("segments", [])
 
     chunks = []
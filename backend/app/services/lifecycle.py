@@ -0,0 +1,269 @@
+"""Storage lifecycle: compact completed jobs, delete jobs past their retention, prune old profiles (`python -m app.services.lifecycle [--apply]`)."""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, undefer_group
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import BLOBS, Job
+from app.profiling import PROFILE_DIRNAME, prune_profiles
+from app.services.artifacts import read_json
+from app.services.export_cache import export_cache
+from app.services.export_render import referenced_screenshot_ids
+from app.services import dedup, search, stories
+from app.workers.events import notify_job_changed
+from app.workers.pipeline import refresh_checkpoints, valid_stages
+
+logger = logging.getLogger("app.lifecycle")
+
+ACTIVE_STATUSES = ("pending", "processing")
+# Intermediate artifacts deleted on compaction: path -> stage that produced it
+PRUNABLE = {"audio.wav": "media"}
+
+
+def _size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _dir_bytes(path: Path) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        total += sum(_size(Path(root) / f) for f in files)
+    return total
+
+
+def _compact_json(path: Path, dry_run: bool) -> int:
+    """Bytes saved by rewriting `path` without indentation (0 if already compact or not JSON)."""
+    try:
+        text = path.read_text()
+        compact = json.dumps(json.loads(text), separators=(",", ":"), ensure_ascii=False)
+    except (OSError, ValueError):
+        return 0
+    saved = len(text.encode()) - len(compact.encode())
+    if saved <= 0:
+        return 0
+    if not dry_run:
+        tmp = path.with_name(f"{path.name}.tmp")
+        tmp.write_text(compact)
+        os.replace(tmp, path)
+    return saved
+
+
+def _unreferenced_screenshots(job: Job, job_dir: Path, spec: dict | None) -> list[Path]:
+    screens_dir = job_dir / "screenshots"
+    manifest_path = screens_dir / "manifest.json"
+    if not manifest_path.exists():
+        return []
+    keep = referenced_screenshot_ids(spec) | referenced_screenshot_ids(job.acceptance_criteria)
+    out = []
+    for entry in read_json(manifest_path):
+        sid = str(entry.get("timestamp_ms", ""))
+        path = screens_dir / entry.get("path", f"{sid}.png")
+        if sid not in keep and path.stem not in keep and path.exists():
+            out.append(path)
+    return out
+
+
+def _write_json(path: Path, data) -> None:
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_text(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+    os.replace(tmp, path)
+
+
+def _drop_screenshots(job: Job, job_dir: Path, names: set[str]) -> None:
+    """Remove deleted screenshots (file names) from the manifest, the grounded chunks and the evidence map."""
+    manifest_path = job_dir / "screenshots" / "manifest.json"
+    manifest = read_json(manifest_path)
+    gone = {str(e["timestamp_ms"]) for e in manifest if e.get("path") in names and e.get("timestamp_ms") is not None}
+    _write_json(manifest_path, [e for e in manifest if e.get("path") not in names])
+    grounded_path = job_dir / "grounded_chunks.json"
+    if grounded_path.exists():
+        chunks = read_json(grounded_path)
+        _write_json(grounded_path, [c for c in chunks if Path(c.get("screenshot_path") or "").name not in names])
+    if job.evidence_map:
+        job.evidence_map = {sid: path for sid, path in job.evidence_map.items() if sid not in gone and path not in names}
+
+
+def compact_job(db: Session, job: Job, job_dir: Path, dry_run: bool = False) -> dict:
+    """Prune intermediates and minify JSON for one completed job; returns bytes per category."""
+    # Story/AC edits may have left the spec blob and spec.json stale: evidence refs come from the rows
+    spec = stories.current_spec(db, job) if dry_run else stories.materialize(db, job, job_dir)
+    valid = valid_stages(job, job_dir)
+    reclaimed = {"intermediates": 0, "screenshots": 0, "json": 0}
+    pruned: dict[str, list[str]] = {}
+
+    for rel, stage in PRUNABLE.items():
+        path = job_dir / rel
+        if path.exists():
+            reclaimed["intermediates"] += _size(path)
+            pruned.setdefault(stage, []).append(rel)
+            if not dry_run:
+                path.unlink()
+
+    screenshots = _unreferenced_screenshots(job, job_dir, spec)
+    if screenshots and not dry_run:
+        # Unlist them first: a crash in between leaves unlisted files, never listed missing ones
+        _drop_screenshots(job, job_dir, {png.name for png in screenshots})
+    for png in screenshots:
+        files = [png, *png.parent.glob(f"thumbs/*/{png.stem}.jpg")]
+        reclaimed["screenshots"] += sum(_size(f) for f in files)
+        pruned.setdefault("media", []).append(str(png.relative_to(job_dir)))
+        if not dry_run:
+            for f in files:
+                f.unlink(missing_ok=True)
+
+    for path in job_dir.rglob("*.json"):
+        reclaimed["json"] += _compact_json(path, dry_run)
+
+    if not dry_run:
+        refresh_checkpoints(job, job_dir, valid, pruned)
+    return reclaimed
+
+
+def _delete_job(db: Session, job: Job, job_dir: Path, dry_run: bool) -> int:
+    freed = _dir_bytes(job_dir) if job_dir.exists() else 0
+    if not dry_run:
+        search.remove_job(db, job.id)
+        dedup.remove_job(db, job.id)
+        stories.remove_job(db, job.id)
+        db.delete(job)
+        db.commit()
+        # Files go only once the row is: a failed commit must not leave a job without its directory
+        shutil.rmtree(job_dir, ignore_errors=True)
+        export_cache.invalidate(job.id)
+        notify_job_changed(job.id, finished=True)
+    return freed
+
+
+def _prune_profiles(jobs_root: Path, now: datetime, dry_run: bool) -> dict:
+    """Age out profiles under {storage_root}/profiles and every job's profiles/ folder."""
+    total = {"files": 0, "bytes": 0}
+    if settings.profile_max_age_days <= 0:
+        return total
+    max_age_s = settings.profile_max_age_days * 86400
+    for out_dir in [Path(settings.storage_root) / PROFILE_DIRNAME, *jobs_root.glob(f"*/{PROFILE_DIRNAME}")]:
+        files, freed = prune_profiles(out_dir, max_age_s=max_age_s, now=(now - datetime(1970, 1, 1)).total_seconds(), dry_run=dry_run)
+        total["files"] += files
+        total["bytes"] += freed
+    return total
+
+
+def sweep(dry_run: bool = False, now: datetime | None = None) -> dict:
+    """One lifecycle pass over all jobs: retention deletes first, then compaction. Returns the report."""
+    now = now or datetime.utcnow()
+    jobs_root = Path(settings.storage_root) / "jobs"
+    batch = settings.lifecycle_batch_size
+    report: dict = {"dry_run": dry_run, "started_at": now.isoformat(), "deleted": [], "compacted": [], "errors": []}
+
+    with SessionLocal() as db:
+        for status, days in settings.retention_days.items():
+            if status in ACTIVE_STATUSES or days <= 0:
+                continue
+            expired = db.scalars(
+                select(Job).where(Job.status == status, Job.updated_at < now - timedelta(days=days)).limit(batch)
+            ).all()
+            for job in expired:
+                try:
+                    freed = _delete_job(db, job, jobs_root / job.id, dry_run)
+                except Exception as e:
+                    db.rollback()
+                    logger.exception("lifecycle delete failed job_id=%s", job.id)
+                    report["errors"].append({"id": job.id, "action": "delete", "error": str(e)})
+                    continue
+                report["deleted"].append({"id": job.id, "status": status, "bytes": freed})
+
+        due = db.scalars(
+            select(Job)
+            .options(undefer_group(BLOBS))
+            .where(
+                Job.status == "completed",
+                Job.compacted_at.is_(None),
+                Job.updated_at < now - timedelta(seconds=settings.lifecycle_compact_after_s),
+            )
+            .limit(batch)
+        ).all()
+        for job in due:
+            job_dir = jobs_root / job.id
+            if not job_dir.exists():
+                continue
+            if not dry_run:
+                # Claim it (committed right away, so no write lock is held while files are rewritten);
+                # another worker's sweep, or a retry that re-queued the job, wins the race
+                claimed = db.execute(
+                    update(Job)
+                    .where(Job.id == job.id, Job.status == "completed", Job.compacted_at.is_(None))
+                    .values(compacted_at=now)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                db.commit()
+                if not claimed:
+                    continue
+            try:
+                reclaimed = compact_job(db, job, job_dir, dry_run)
+                if not dry_run:
+                    if reclaimed["screenshots"]:
+                        # Transcript rows link screenshots; story rows are the editors' (not re-read from a stale spec)
+                        search.index_transcript(db, job.id, job_dir)
+                    db.commit()  # refreshed checkpoints, evidence map
+                    notify_job_changed(job.id)
+            except Exception as e:
+                db.rollback()
+                if not dry_run:
+                    db.execute(update(Job).where(Job.id == job.id).values(compacted_at=None))
+                    db.commit()
+                logger.exception("lifecycle compaction failed job_id=%s", job.id)
+                report["errors"].append({"id": job.id, "action": "compact", "error": str(e)})
+                continue
+            report["compacted"].append({"id": job.id, "bytes": sum(reclaimed.values()), **reclaimed})
+
+    report["profiles"] = _prune_profiles(jobs_root, now, dry_run)
+    report["bytes_reclaimed"] = sum(j["bytes"] for j in report["deleted"] + report["compacted"]) + report["profiles"]["bytes"]
+    logger.info(
+        "lifecycle sweep dry_run=%s deleted=%s compacted=%s profiles=%s bytes_reclaimed=%s errors=%s",
+        dry_run,
+        len(report["deleted"]),
+        len(report["compacted"]),
+        report["profiles"]["files"],
+        report["bytes_reclaimed"],
+        len(report["errors"]),
+    )
+    return report
+
+
+async def run_sweeper(interval_s: float, first_delay_s: float = 60.0) -> None:
+    """Background loop for the API process: sweep every `interval_s`; failures are logged, not raised."""
+    await asyncio.sleep(min(first_delay_s, interval_s))
+    while True:
+        try:
+            await asyncio.to_thread(sweep)
+        except Exception:
+            logger.exception("lifecycle sweep failed")
+        await asyncio.sleep(interval_s)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apply", action="store_true", help="delete and compact (default: dry run, report only)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(name)s %(levelname)s %(message)s")
+    from app.database import get_engine
+    from app.migrations import run_migrations
+
+    run_migrations(get_engine())
+    print(json.dumps(sweep(dry_run=not args.apply), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+"""Thin wrappers around OpenAI calls so every model request is scheduled, timed, traced and costed in one place."""
+import json
+import os
+import time
+
+from app.metrics import OPENAI_REQUEST_DURATION
+from app.services.scheduler import scheduler
+from app.services.usage import record_call
+from app.tracing import current_tracer, span
+
+# Rough token costs for rate limiting (the response's usage corrects the estimate afterwards)
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = {"low": 85, "high": 765, "auto": 765}
+
+
+def _observe(model: str, endpoint: str, outcome: str, start: float) -> None:
+    OPENAI_REQUEST_DURATION.labels(model=model, endpoint=endpoint, outcome=outcome).observe(time.monotonic() - start)
+
+
+def _usage_args(resp) -> dict:
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return {}
+    return {
+        k: getattr(usage, k)
+        for k in ("prompt_tokens", "completion_tokens", "total_tokens")
+        if getattr(usage, k, None) is not None
+    }
+
+
+def _count_images(kwargs: dict) -> int:
+    return sum(
+        1
+        for message in kwargs.get("messages", [])
+        if not isinstance(message.get("content"), str)
+        for part in message.get("content") or []
+        if part.get("type") == "image_url"
+    )
+
+
+def estimate_chat_tokens(kwargs: dict) -> int:
+    """Prompt text / CHARS_PER_TOKEN + per-image cost + max_tokens (OpenAI counts max_tokens against TPM)."""
+    chars, tokens = 0, 0
+    for message in kwargs.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for part in content or []:
+            if part.get("type") == "text":
+                chars += len(part.get("text", ""))
+            elif part.get("type") == "image_url":
+                tokens += IMAGE_TOKENS.get(part.get("image_url", {}).get("detail", "auto"), IMAGE_TOKENS["auto"])
+    return tokens + chars // CHARS_PER_TOKEN + int(kwargs.get("max_tokens") or 0)
+
+
+def chat_completion(client, **kwargs):
+    """client.chat.completions.create(**kwargs) through the scheduler, recording latency by model."""
+    model = kwargs.get("model", "")
+    trace_args = {"model": model}
+    if current_tracer() is not None:  # sizing the payload means serializing it; only when tracing
+        trace_args["request_bytes"] = len(json.dumps(kwargs.get("messages", [])))
+
+    def attempt():
+        start = time.monotonic()
+        with span("openai.chat", "openai", **trace_args) as args:
+            try:
+                resp = client.chat.completions.create(**kwargs)
+            except Exception:
+                _observe(model, "chat", "error", start)
+                raise
+            _observe(model, "chat", "ok", start)
+            args.update(_usage_args(resp))
+        return resp
+
+    resp = scheduler.run(model, estimate_chat_tokens(kwargs), attempt, lambda r: _usage_args(r).get("total_tokens"))
+    usage = _usage_args(resp)
+    record_call(
+        model,
+        prompt_tokens=usage.get("prompt_tokens", 0),
+        completion_tokens=usage.get("completion_tokens", 0),
+        images=_count_images(kwargs),
+    )
+    return resp
+
+
+def transcription(client, **kwargs):
+    """client.audio.transcriptions.create(**kwargs) through the scheduler, recording latency by model."""
+    model = kwargs.get("model", "")
+    trace_args = {"model": model}
+    f = kwargs.get("file")
+    if current_tracer() is not None and hasattr(f, "fileno"):
+        trace_args["request_bytes"] = os.fstat(f.fileno()).st_size
+
+    def attempt():
+        if hasattr(f, "seek"):
+            f.seek(0)  # a retried upload must send the file from the start
+        start = time.monotonic()
+        with span("openai.transcription", "openai", **trace_args) as args:
+            try:
+                resp = client.audio.transcriptions.create(**kwargs)
+            except Exception:
+                _observe(model, "transcription", "error", start)
+                raise
+            _observe(model, "transcription", "ok", start)
+            if getattr(resp, "duration", None) is not None:
+                args["audio_seconds"] = resp.duration
+        return resp
+
+    # Audio is limited by requests per minute only
+    resp = scheduler.run(model, 0, attempt)
+    record_call(model, audio_seconds=float(getattr(resp, "duration", None) or 0.0))
+    return resp
@@ -1,10 +1,13 @@
 """Media preprocessing: extract audio, frame diff, screenshot capture."""
 import shutil
 import subprocess
+import time
 from pathlib import Path
 
 import cv2
 
+from app.tracing import annotate, span, traced
+
 # Tunable
 DIFF_THRESHOLD = 0.035  # normalized MAD above this = meaningful change (lower = more sensitive)
 MIN_INTERVAL_MS = 1000  # min ms between screenshots (1s)
@@ -26,6 +29,7 @@ def _get_ffmpeg() -> str:
     return path
 
 
+@traced(cat="ffmpeg")
 def extract_audio(video_path: str, audio_path: str) -> None:
     """Extract audio to WAV using ffmpeg."""
     ffmpeg = _get_ffmpeg()
@@ -56,6 +60,21 @@ def extract_audio(video_path: str, audio_path: str) -> None:
         raise RuntimeError(f"ffmpeg failed: {stderr.strip() or e}")
 
 
+@traced()
+def video_duration_ms(video_path: str) -> int | None:
+    """Duration from container frame count / fps (None if the video can't be opened or reports no frames)."""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+        return int(frames / fps * 1000) if frames > 0 else None
+    finally:
+        cap.release()
+
+
+@traced()
 def capture_screenshots(video_path: str, screenshots_dir: str) -> None:
     """Decode video, compute pixel diff between consecutive frames, capture screenshot on meaningful change."""
     cap = cv2.VideoCapture(video_path)
@@ -64,11 +83,15 @@ def capture_screenshots(video_path: str, screenshots_dir: str) -> None:
     fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
     manifest = []
     prev_gray = None
+    last_capture_gray = None
     last_capture_ms = -MIN_INTERVAL_MS - 1
     frame_index = 0
+    decode_ns = 0  # per-frame spans would swamp the trace; decode time is reported as a total
 
     while True:
+        t = time.perf_counter_ns()
         ret, frame = cap.read()
+        decode_ns += time.perf_counter_ns() - t
         if not ret:
             break
         timestamp_ms = int((frame_index / fps) * 1000)
@@ -84,19 +107,26 @@ def capture_screenshots(video_path: str, screenshots_dir: str) -> None:
             if meaningful_change or overdue:
                 path = f"{timestamp_ms}.png"
                 out_path = Path(screenshots_dir) / path
-                cv2.imwrite(str(out_path), frame)
-                manifest.append({"timestamp_ms": timestamp_ms, "path": path})
+                with span("png_write", "io", path=path):
+                    cv2.imwrite(str(out_path), frame)
+                # Change since the previous screenshot (not the previous frame); vision routes small changes to a cheaper model
+                change = cv2.absdiff(last_capture_gray, gray).mean() / 255.0
+                manifest.append({"timestamp_ms": timestamp_ms, "path": path, "diff": round(float(change), 4)})
                 last_capture_ms = timestamp_ms
+                last_capture_gray = gray
         else:
             path = f"{timestamp_ms}.png"
             out_path = Path(screenshots_dir) / path
-            cv2.imwrite(str(out_path), frame)
-            manifest.append({"timestamp_ms": timestamp_ms, "path": path})
+            with span("png_write", "io", path=path):
+                cv2.imwrite(str(out_path), frame)
+            manifest.append({"timestamp_ms": timestamp_ms, "path": path, "diff": 1.0})
             last_capture_ms = timestamp_ms
+            last_capture_gray = gray
         prev_gray = gray
         frame_index += 1
 
     cap.release()
+    annotate(frames=frame_index, screenshots=len(manifest), decode_ms=round(decode_ns / 1e6, 1))
     manifest_path = Path(screenshots_dir) / "manifest.json"
     import json
     manifest_path.write_text(json.dumps(manifest, indent=2))
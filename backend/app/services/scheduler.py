@@ -0,0 +1,229 @@
+"""Process-wide scheduler for model calls: per-model rate limits, priorities and retries.
+
+Every OpenAI request goes through `scheduler.run()` (via app.services.llm). Per model, a call is
+admitted when both token buckets (requests/min and estimated tokens/min) have room and it is
+at the head of that model's queue: lower priority value first, FIFO within a priority. So a
+burst of vision calls from one job cannot starve another job's spec call, and an interactive
+regenerate-ac goes ahead of both.
+
+Priority comes from the calling context (`request_priority()` / `@prioritized`), so services
+don't pass it through every call. Retryable failures (429, 5xx, connection errors, timeouts)
+are retried with full-jitter exponential backoff, honoring Retry-After; a 429 also pauses the
+model's queue so the other waiting calls back off too.
+"""
+import functools
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, TypeVar
+
+from app.config import settings
+from app.metrics import OPENAI_QUEUE_DEPTH, OPENAI_QUEUE_WAIT, RETRIES
+from app.tracing import span
+
+logger = logging.getLogger("app.scheduler")
+
+T = TypeVar("T")
+
+# Lower runs first
+INTERACTIVE = 0  # a user is waiting on the response (regenerate-ac)
+PIPELINE = 1  # default: transcription, spec, acceptance criteria
+BULK = 2  # many independent calls per job (vision)
+PRIORITY_NAMES = {INTERACTIVE: "interactive", PIPELINE: "pipeline", BULK: "bulk"}
+
+_priority: ContextVar[int] = ContextVar("model_call_priority", default=PIPELINE)
+
+
+@contextmanager
+def request_priority(level: int) -> Iterator[None]:
+    """Model calls made inside the block are scheduled at `level`."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def prioritized(level: int):
+    """Decorator form of request_priority()."""
+
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*a, **kw):
+            with request_priority(level):
+                return fn(*a, **kw)
+
+        return inner
+
+    return wrap
+
+
+class TokenBucket:
+    """`per_minute` units refilled continuously, holding at most one minute's worth (0 = unlimited)."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._rate = per_minute / 60.0
+        self._stamp = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._stamp) * self._rate)
+        self._stamp = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken. A request larger than the whole bucket waits for a full bucket."""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self._rate
+
+    def take(self, amount: float) -> None:
+        if self.capacity > 0:
+            self.level -= amount  # may go negative for oversized requests; later calls wait it out
+
+    def give_back(self, amount: float) -> None:
+        if self.capacity > 0:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class _ModelQueue:
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.waiting: list[tuple[int, int]] = []  # heap of (priority, ticket)
+        self.paused_until = 0.0
+
+    def wait_time(self, est_tokens: int, now: float) -> float:
+        return max(
+            self.paused_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(est_tokens, now),
+        )
+
+
+class ModelScheduler:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._queues: dict[str, _ModelQueue] = {}
+        self._tickets = itertools.count()
+
+    def _queue(self, model: str) -> _ModelQueue:
+        q = self._queues.get(model)
+        if q is None:
+            q = _ModelQueue(
+                settings.openai_rpm.get(model, settings.openai_default_rpm),
+                settings.openai_tpm.get(model, settings.openai_default_tpm),
+            )
+            self._queues[model] = q
+        return q
+
+    def acquire(self, model: str, est_tokens: int) -> float:
+        """Block until the call may go out; consume its budget and return the seconds waited."""
+        level = _priority.get()
+        start = time.monotonic()
+        with span("openai.queue", "openai", model=model, priority=PRIORITY_NAMES.get(level, str(level))), self._cond:
+            q = self._queue(model)
+            entry = (level, next(self._tickets))
+            heapq.heappush(q.waiting, entry)
+            OPENAI_QUEUE_DEPTH.labels(model=model).inc()
+            try:
+                while True:
+                    wait = q.wait_time(est_tokens, time.monotonic()) if q.waiting[0] == entry else None
+                    if wait is not None and wait <= 0:
+                        break
+                    # The head sleeps until its budget refills; the rest until the head changes
+                    self._cond.wait(timeout=wait if wait is not None else 1.0)
+                q.requests.take(1)
+                q.tokens.take(est_tokens)
+            finally:
+                q.waiting.remove(entry)
+                heapq.heapify(q.waiting)
+                OPENAI_QUEUE_DEPTH.labels(model=model).dec()
+                self._cond.notify_all()
+        waited = time.monotonic() - start
+        OPENAI_QUEUE_WAIT.labels(model=model, priority=PRIORITY_NAMES.get(level, str(level))).observe(waited)
+        return waited
+
+    def settle(self, model: str, est_tokens: int, actual_tokens: int | None) -> None:
+        """Correct the token bucket once the response reports real usage."""
+        if actual_tokens is None:
+            return
+        with self._cond:
+            q = self._queue(model)
+            if actual_tokens < est_tokens:
+                q.tokens.give_back(est_tokens - actual_tokens)
+            else:
+                q.tokens.take(actual_tokens - est_tokens)
+            self._cond.notify_all()
+
+    def pause(self, model: str, seconds: float) -> None:
+        """Hold every queued call for `model` (after a 429) for `seconds`."""
+        with self._cond:
+            q = self._queue(model)
+            q.paused_until = max(q.paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def run(
+        self,
+        model: str,
+        est_tokens: int,
+        attempt: Callable[[], T],
+        usage: Callable[[T], int | None] = lambda _: None,
+    ) -> T:
+        """Schedule and run `attempt` (one API request), retrying retryable failures with backoff."""
+        for n in range(1, max(1, settings.openai_max_attempts) + 1):
+            self.acquire(model, est_tokens)
+            try:
+                result = attempt()
+            except Exception as e:
+                kind = _retry_kind(e)
+                if kind is None or n >= settings.openai_max_attempts:
+                    raise
+                delay = _backoff(n, _retry_after(e))
+                if kind == "openai_429":
+                    self.pause(model, delay)
+                RETRIES.labels(kind=kind).inc()
+                logger.warning("model call retry model=%s attempt=%s kind=%s delay=%.1fs error=%s", model, n, kind, delay, e)
+                time.sleep(delay)
+                continue
+            self.settle(model, est_tokens, usage(result))
+            return result
+        raise AssertionError("unreachable")
+
+
+def _retry_kind(e: Exception) -> str | None:
+    """Metric label for a retryable error, None if the error should propagate."""
+    import openai
+
+    if isinstance(e, openai.RateLimitError):
+        return "openai_429"
+    if isinstance(e, (openai.APITimeoutError, openai.APIConnectionError)):
+        return "openai_connection"
+    if isinstance(e, openai.APIStatusError) and e.status_code >= 500:
+        return "openai_5xx"
+    return None
+
+
+def _retry_after(e: Exception) -> float | None:
+    response = getattr(e, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def _backoff(attempt: int, retry_after: float | None) -> float:
+    """Full jitter: uniform(0, min(max, base * 2^(attempt-1))), but never sooner than Retry-After."""
+    delay = random.uniform(0, min(settings.openai_backoff_max_s, settings.openai_backoff_base_s * 2 ** (attempt - 1)))
+    return max(delay, retry_after or 0.0)
+
+
+scheduler = ModelScheduler()
@@ -0,0 +1,82 @@
+"""Screenshot lookup and on-demand thumbnails for serving evidence images."""
+import json
+import os
+import threading
+from pathlib import Path
+
+from app.metrics import CACHE_HITS
+from app.services.artifacts import artifact_cache
+
+# Thumbnail widths are snapped to these so the on-disk cache stays small and reusable
+THUMB_WIDTHS = (160, 320, 480, 640, 960)
+THUMB_JPEG_QUALITY = 80
+
+
+def _index_manifest(raw: bytes) -> dict[str, str]:
+    """Screenshot id (timestamp_ms) or file stem -> file name."""
+    index: dict[str, str] = {}
+    for e in json.loads(raw):
+        name = e.get("path", "")
+        if name:
+            index.setdefault(Path(name).stem, name)
+        if e.get("timestamp_ms") is not None:
+            index[str(e["timestamp_ms"])] = name or f"{e['timestamp_ms']}.png"
+    return index
+
+
+def _manifest_index(screens_dir: Path) -> dict[str, str] | None:
+    """Screenshot index for a job, rebuilt only when manifest.json changes (shared artifact cache)."""
+    try:
+        return artifact_cache.load(screens_dir / "manifest.json", _index_manifest)
+    except FileNotFoundError:
+        return None
+
+
+def resolve_screenshot(screens_dir: Path, screenshot_id: str) -> Path | None:
+    """Path of a screenshot by id (timestamp_ms, file stem, or a prefix of the file name); None if the job has no manifest."""
+    index = _manifest_index(screens_dir)
+    if index is None:
+        return None
+    name = index.get(screenshot_id)
+    if name is None:
+        # Ids used to resolve by file name prefix (first match in manifest order): keep old links working
+        name = next((n for n in index.values() if n.startswith(screenshot_id)), None)
+    return screens_dir / (name or f"{screenshot_id}.png")
+
+
+def snap_width(width: int) -> int:
+    for w in THUMB_WIDTHS:
+        if width <= w:
+            return w
+    return THUMB_WIDTHS[-1]
+
+
+def thumbnail(src: Path, width: int) -> Path:
+    """JPEG thumbnail of `src` at a snapped width, generated once under screenshots/thumbs/{width}/."""
+    width = snap_width(width)
+    out = src.parent / "thumbs" / str(width) / f"{src.stem}.jpg"
+    if out.exists() and out.stat().st_mtime_ns >= src.stat().st_mtime_ns:
+        CACHE_HITS.labels(cache="thumbnail").inc()
+        return out
+    import cv2  # only needed when a thumbnail is first generated
+
+    img = cv2.imread(str(src))
+    if img is None:
+        raise ValueError(f"Cannot read image: {src}")
+    h, w = img.shape[:2]
+    if w > width:
+        img = cv2.resize(img, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, THUMB_JPEG_QUALITY])
+    if not ok:
+        raise ValueError(f"Cannot encode thumbnail: {src}")
+    # Write then rename so concurrent requests never serve a half-written file
+    tmp = out.with_name(f"{out.stem}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(buf.tobytes())
+    os.replace(tmp, out)
+    return out
+
+
+def file_etag(path: Path) -> str:
+    st = path.stat()
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
@@ -0,0 +1,198 @@
+"""Full-text search over transcripts, user stories and acceptance criteria.
+
+One index row per searchable unit: a transcript segment, a story (title + story text) or an AC
+(given/when/then/and), carrying the timestamp and screenshot id its evidence points at so a hit
+can deep-link to the moment in the recording. SQLite uses an FTS5 table (porter stemming, bm25
+ranking); Postgres a table with a generated tsvector column and a GIN index (ts_rank_cd).
+
+A job's rows are replaced whenever its spec changes: when the pipeline completes, on PATCH spec
+and on regenerate-ac, in the same transaction as the job update.
+"""
+import bisect
+import re
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.services.artifacts import read_json
+
+TABLE = "search_index"
+SNIPPET_OPEN, SNIPPET_CLOSE = "«", "»"
+_COLUMNS = ("job_id", "kind", "ref", "title", "body", "timestamp_ms", "screenshot_id")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def create_index(conn: Connection) -> None:
+    """Create the search table for this database's dialect (used by migrations)."""
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(
+            f"""CREATE TABLE IF NOT EXISTS {TABLE} (
+                id BIGSERIAL PRIMARY KEY,
+                job_id VARCHAR(36) NOT NULL,
+                kind VARCHAR(16) NOT NULL,
+                ref VARCHAR(128),
+                title TEXT,
+                body TEXT NOT NULL,
+                timestamp_ms BIGINT,
+                screenshot_id VARCHAR(64),
+                tsv tsvector GENERATED ALWAYS AS (to_tsvector('english', body)) STORED
+            )"""
+        )
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_tsv ON {TABLE} USING GIN (tsv)")
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_job_id ON {TABLE} (job_id)")
+    else:
+        conn.exec_driver_sql(
+            f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+                body, job_id UNINDEXED, kind UNINDEXED, ref UNINDEXED, title UNINDEXED,
+                timestamp_ms UNINDEXED, screenshot_id UNINDEXED, tokenize='porter unicode61'
+            )"""
+        )
+
+
+def _evidence(item: dict) -> tuple[int | None, str | None]:
+    """Timestamp and screenshot of the first evidence ref that has either."""
+    for ref in item.get("evidence_refs") or []:
+        if not isinstance(ref, dict):
+            continue
+        ts, sid = ref.get("timestamp"), ref.get("screenshot_id")
+        if ts not in (None, "") or sid not in (None, ""):
+            try:
+                ts = int(float(ts)) if ts not in (None, "") else None
+            except (TypeError, ValueError):
+                ts = None
+            return ts, str(sid) if sid not in (None, "") else None
+    return None, None
+
+
+def _documents(job_id: str, job_dir: Path, spec: dict | None, story_ids: set[str] | None = None) -> list[dict]:
+    """Index rows of a job; with story_ids, only those stories and their ACs."""
+    docs = []
+    transcript_path = job_dir / "transcript.json"
+    manifest_path = job_dir / "screenshots" / "manifest.json"
+    if story_ids is None and transcript_path.exists():
+        shots = sorted(int(e["timestamp_ms"]) for e in read_json(manifest_path) if e.get("timestamp_ms") is not None) if manifest_path.exists() else []
+        for i, seg in enumerate(read_json(transcript_path).get("segments", [])):
+            body = (seg.get("text") or "").strip()
+            if not body:
+                continue
+            ts = int(float(seg.get("start", 0)) * 1000)
+            # Screenshot on screen when the segment starts (the last one captured at or before it)
+            at = bisect.bisect_right(shots, ts) - 1
+            docs.append({"kind": "transcript", "ref": str(i), "title": None, "body": body,
+                         "timestamp_ms": ts, "screenshot_id": str(shots[at]) if at >= 0 else None})
+    for n, story in enumerate((spec or {}).get("user_stories") or []):
+        if not isinstance(story, dict):
+            continue
+        story_id = str(story.get("id") or f"us-{n + 1}")
+        if story_ids is not None and story_id not in story_ids:
+            continue
+        title = str(story.get("title") or "")
+        ts, sid = _evidence(story)
+        body = "\n".join(p for p in (title, str(story.get("story_text") or "")) if p)
+        if body:
+            docs.append({"kind": "story", "ref": story_id, "title": title, "body": body, "timestamp_ms": ts, "screenshot_id": sid})
+        for ac in story.get("acceptance_criteria") or []:
+            if not isinstance(ac, dict):
+                continue
+            ands = ac.get("and") if isinstance(ac.get("and"), list) else []
+            body = "\n".join(
+                f"{label} {ac.get(key) or ''}".strip()
+                for label, key in (("GIVEN", "given"), ("WHEN", "when"), ("THEN", "then"))
+            )
+            body += "".join(f"\nAND {a}" for a in ands if a)
+            ts, sid = _evidence(ac)
+            docs.append({"kind": "ac", "ref": f"{story_id}/{ac.get('id') or ''}", "title": title, "body": body,
+                         "timestamp_ms": ts, "screenshot_id": sid})
+    return [{"job_id": job_id, **d} for d in docs]
+
+
+def remove_job(db: Session | Connection, job_id: str) -> None:
+    db.execute(text(f"DELETE FROM {TABLE} WHERE job_id = :job_id"), {"job_id": job_id})
+
+
+def _remove_stories(db: Session | Connection, job_id: str, story_ids: set[str]) -> None:
+    for story_id in story_ids:
+        db.execute(
+            text(
+                f"DELETE FROM {TABLE} WHERE job_id = :job_id AND kind IN ('story', 'ac') "
+                "AND (ref = :ref OR substr(ref, 1, length(:prefix)) = :prefix)"
+            ),
+            {"job_id": job_id, "ref": story_id, "prefix": f"{story_id}/"},
+        )
+
+
+def index_job(db: Session | Connection, job_id: str, job_dir: Path, spec: dict | None, story_ids: set[str] | None = None) -> int:
+    """Replace the job's index rows (caller commits); returns the number of rows written.
+
+    With story_ids only those stories' and their ACs' rows are replaced (after a story/AC edit).
+    """
+    if story_ids is None:
+        remove_job(db, job_id)
+    else:
+        _remove_stories(db, job_id, story_ids)
+    return _insert(db, _documents(job_id, job_dir, spec, story_ids))
+
+
+def index_transcript(db: Session | Connection, job_id: str, job_dir: Path) -> int:
+    """Replace only the job's transcript rows (caller commits), e.g. after screenshots were dropped; stories are left alone."""
+    db.execute(text(f"DELETE FROM {TABLE} WHERE job_id = :job_id AND kind = 'transcript'"), {"job_id": job_id})
+    return _insert(db, _documents(job_id, job_dir, None))
+
+
+def _insert(db: Session | Connection, docs: list[dict]) -> int:
+    if docs:
+        cols = ", ".join(_COLUMNS)
+        params = ", ".join(f":{c}" for c in _COLUMNS)
+        db.execute(text(f"INSERT INTO {TABLE} ({cols}) VALUES ({params})"), docs)
+    return len(docs)
+
+
+def _fts5_query(q: str) -> str | None:
+    """User text -> FTS5 query: every word must match (quoted, so no syntax errors); last word as a prefix."""
+    words = _WORD.findall(q)
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+async def search(db: AsyncSession, q: str, limit: int = 20, job_id: str | None = None, kind: str | None = None) -> list[dict]:
+    """Ranked hits (best first) with a highlighted snippet and the evidence timestamp/screenshot."""
+    filters, params = "", {"limit": limit}
+    if job_id:
+        filters += " AND job_id = :job_id"
+        params["job_id"] = job_id
+    if kind:
+        filters += " AND kind = :kind"
+        params["kind"] = kind
+    if db.bind.dialect.name == "postgresql":
+        params["q"] = q
+        sql = f"""
+            SELECT job_id, kind, ref, title, timestamp_ms, screenshot_id,
+                   ts_headline('english', body, query,
+                               'StartSel={SNIPPET_OPEN}, StopSel={SNIPPET_CLOSE}, MaxWords=24, MinWords=8') AS snippet,
+                   ts_rank_cd(tsv, query) AS score
+            FROM {TABLE}, websearch_to_tsquery('english', :q) AS query
+            WHERE tsv @@ query{filters}
+            ORDER BY score DESC LIMIT :limit"""
+    else:
+        match = _fts5_query(q)
+        if match is None:
+            return []
+        params["q"] = match
+        sql = f"""
+            SELECT job_id, kind, ref, title, timestamp_ms, screenshot_id,
+                   snippet({TABLE}, 0, '{SNIPPET_OPEN}', '{SNIPPET_CLOSE}', '…', 16) AS snippet,
+                   -bm25({TABLE}) AS score
+            FROM {TABLE}
+            WHERE {TABLE} MATCH :q{filters}
+            ORDER BY bm25({TABLE}) LIMIT :limit"""
+    rows = (await db.execute(text(sql), params)).mappings().all()
+    return [
+        {**row, "timestamp_ms": int(row["timestamp_ms"]) if row["timestamp_ms"] is not None else None, "score": float(row["score"])}
+        for row in rows
+    ]
@@ -1,38 +1,25 @@
 """Intermediate spec extraction: LLM converts grounded chunks to structured spec with evidence_refs."""
 import json
 from pathlib import Path
-from openai import OpenAI
 
 from app.config import settings, openai_client_kwargs
+from app.metrics import RETRIES
+from app.services.artifacts import full_transcript_text, read_json
+from app.services.llm import chat_completion
+from app.tracing import traced
 from app.schemas.spec_schema import validate_and_repair_spec, SPEC_REPAIR_PROMPT
 
 
-def _full_transcript_text(transcript_path: str | Path) -> str:
-    """Build full transcript as continuous text with timestamps (primary source)."""
-    path = Path(transcript_path)
-    if not path.exists():
-        return ""
-    data = json.loads(path.read_text())
-    segments = data.get("segments", [])
-    lines = []
-    for s in segments:
-        start = s.get("start", 0)
-        end = s.get("end", 0)
-        text = (s.get("text", "") or "").strip()
-        if text:
-            lines.append(f"[{start:.1f}s - {end:.1f}s] {text}")
-    return "\n".join(lines)
-
-
+@traced()
 def _build_context(grounded_path: str, transcript_path: str | Path | None = None, max_chars: int = 200000) -> str:
     parts = []
     # Full transcript first (primary source) so nothing is missed
-    if transcript_path and Path(transcript_path).exists():
-        full = _full_transcript_text(transcript_path)
+    if transcript_path:
+        full = full_transcript_text(transcript_path)
         if full:
             parts.append("## Full transcript (PRIMARY SOURCE – extract exhaustively from this)\n" + full)
     # Then grounded evidence (transcript excerpts + vision per screenshot)
-    data = json.loads(Path(grounded_path).read_text())
+    data = read_json(grounded_path)
     evidence_parts = []
     n = len(parts[0]) if parts else 0
     for chunk in data:
@@ -70,12 +57,16 @@ Rules:
 Return only the JSON object, no markdown."""
 
 
+@traced()
 def extract_spec(grounded_path: str, spec_path: str, transcript_path: str | Path | None = None) -> dict:
     """Call LLM with full transcript (primary) + grounded chunks; parse and repair JSON; save to spec_path; return spec dict."""
     context = _build_context(grounded_path, transcript_path=transcript_path)
+    from openai import OpenAI
+
     client = OpenAI(**openai_client_kwargs())
-    resp = client.chat.completions.create(
-        model="gpt-4o",
+    resp = chat_completion(
+        client,
+        model=settings.spec_model,
         messages=[
             {"role": "system", "content": "You output only valid JSON. Extract exhaustively from the transcript."},
             {"role": "user", "content": f"{EXTRACTION_PROMPT}\n\n{context}"},
@@ -91,8 +82,10 @@ def extract_spec(grounded_path: str, spec_path: str, transcript_path: str | Path
     try:
         data = json.loads(text)
     except json.JSONDecodeError:
-        repair_resp = client.chat.completions.create(
-            model="gpt-4o",
+        RETRIES.labels(kind="json_repair").inc()
+        repair_resp = chat_completion(
+            client,
+            model=settings.spec_model,
             messages=[
                 {"role": "user", "content": f"{SPEC_REPAIR_PROMPT}\n\nInvalid JSON:\n{text}"},
             ],
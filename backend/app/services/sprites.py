@@ -0,0 +1,73 @@
+"""Timeline sprites: contact sheets of all captured screenshots plus a WebVTT thumbnail track."""
+import json
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from app.services.artifacts import read_json
+from app.tracing import traced
+
+TILE_WIDTH = 160
+COLUMNS = 10
+TILES_PER_SHEET = 100  # 10x10 tiles per sheet; long recordings get several sheets
+SPRITE_JPEG_QUALITY = 75
+
+
+def _vtt_time(ms: int) -> str:
+    h, rem = divmod(int(ms), 3600_000)
+    m, rem = divmod(rem, 60_000)
+    s, ms = divmod(rem, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}"
+
+
+@traced()
+def build_sprites(screenshots_dir: Path, sprites_dir: Path, duration_ms: int | None = None) -> dict:
+    """Write sprites/{n}.jpg sheets, sprites.json (tile map) and thumbnails.vtt; return the tile map.
+
+    VTT cues span from each screenshot to the next (the last one to the end of the video), and
+    point at `sprites/{n}.jpg#xywh=x,y,w,h` relative to the VTT's URL.
+    """
+    manifest = read_json(screenshots_dir / "manifest.json")
+    sprites_dir.mkdir(parents=True, exist_ok=True)
+    for old in sprites_dir.glob("*.jpg"):
+        old.unlink()
+    tiles = []
+    tile_h = None
+    sheet = None
+    sheet_index = -1
+    entries = [e for e in manifest if (screenshots_dir / e.get("path", "")).is_file()]
+
+    def flush():
+        if sheet is not None:
+            cv2.imwrite(str(sprites_dir / f"{sheet_index}.jpg"), sheet, [cv2.IMWRITE_JPEG_QUALITY, SPRITE_JPEG_QUALITY])
+
+    for i, entry in enumerate(entries):
+        img = cv2.imread(str(screenshots_dir / entry["path"]), cv2.IMREAD_REDUCED_COLOR_2)
+        if img is None:
+            continue
+        if tile_h is None:
+            tile_h = max(1, round(TILE_WIDTH * img.shape[0] / img.shape[1]))
+        slot = len(tiles) % TILES_PER_SHEET
+        if slot == 0:
+            flush()
+            sheet_index += 1
+            rows = -(-min(TILES_PER_SHEET, len(entries) - i) // COLUMNS)
+            sheet = np.zeros((rows * tile_h, COLUMNS * TILE_WIDTH, 3), dtype=np.uint8)
+        x, y = (slot % COLUMNS) * TILE_WIDTH, (slot // COLUMNS) * tile_h
+        sheet[y:y + tile_h, x:x + TILE_WIDTH] = cv2.resize(img, (TILE_WIDTH, tile_h), interpolation=cv2.INTER_AREA)
+        ts = int(entry.get("timestamp_ms", 0))
+        tiles.append({"screenshot_id": str(ts), "timestamp_ms": ts, "sheet": sheet_index,
+                      "x": x, "y": y, "w": TILE_WIDTH, "h": tile_h})
+    flush()
+
+    cues = ["WEBVTT", ""]
+    for i, t in enumerate(tiles):
+        end = tiles[i + 1]["timestamp_ms"] if i + 1 < len(tiles) else max(duration_ms or 0, t["timestamp_ms"] + 1000)
+        cues.append(f"{_vtt_time(t['timestamp_ms'])} --> {_vtt_time(end)}")
+        cues.append(f"sprites/{t['sheet']}.jpg#xywh={t['x']},{t['y']},{t['w']},{t['h']}")
+        cues.append("")
+    (sprites_dir / "thumbnails.vtt").write_text("\n".join(cues))
+    out = {"sheets": sheet_index + 1, "columns": COLUMNS, "tile_width": TILE_WIDTH, "tile_height": tile_h, "tiles": tiles}
+    (sprites_dir / "sprites.json").write_text(json.dumps(out))
+    return out
@@ -0,0 +1,447 @@
+"""Normalized user stories and acceptance criteria, and partial edits of a job's spec.
+
+Each story and each AC of a job's spec is a row (UserStory, AcceptanceCriterion) with a version
+that is bumped on every change. `Job.spec` (and spec.json) is the materialized whole spec: whole-spec
+writes refresh it in the same transaction, while a story/AC edit writes only its row and bumps
+`Job.spec_version`, leaving it stale (`spec_view_version` behind) until a reader needs the whole
+spec: `current_spec` rebuilds it from the rows, `materialize` also stores it. Edits come in three shapes:
+
+- a whole spec (PATCH /spec with an object; regenerate-ac; a pipeline run): rows are synced to it,
+  and only rows whose content changed are written;
+- an RFC 6902 JSON Patch against the spec (PATCH /spec with an array);
+- a merge of fields into one story or one AC (PATCH /stories/{ref}[/acceptance-criteria/{ref}]).
+
+Optimistic concurrency: the spec has `Job.spec_version`, each row its own `version`; an edit
+based on a stale version is refused (If-Match), and whole-spec writes are conditional on the
+spec version read, so a row edit committed meanwhile is never dropped.
+"""
+import copy
+import json
+import os
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models import AcceptanceCriterion, Job, UserStory
+from app.services import dedup, search
+
+
+class NotFound(LookupError):
+    pass
+
+
+class VersionMismatch(Exception):
+    """The edit was based on an older version than the current one."""
+
+    def __init__(self, current: int):
+        super().__init__(f"current version is {current}")
+        self.current = current
+
+
+class SpecConflict(Exception):
+    """Another edit of the spec committed between our read and our write; retry from a fresh read."""
+
+
+class PatchError(ValueError):
+    """Malformed JSON Patch, or one that doesn't apply to the document."""
+
+
+class PatchTestFailed(PatchError):
+    pass
+
+
+def _story_key(story: dict, n: int) -> str:
+    """The story id used by search and dedup refs."""
+    return str(story.get("id") or f"us-{n + 1}")
+
+
+def _rows(spec: dict | None) -> list[tuple[str, str, dict, list[tuple[str, dict]]]]:
+    """(row ref, story key, story data, [(AC ref, AC data)]) per story; refs made unique within their scope."""
+    out, seen = [], set()
+    for n, story in enumerate((spec or {}).get("user_stories") or []):
+        if not isinstance(story, dict):
+            continue
+        key = _story_key(story, n)
+        ref = key if key not in seen else f"{key}#{n + 1}"
+        seen.add(ref)
+        acs, ac_seen = [], set()
+        for m, ac in enumerate(story.get("acceptance_criteria") or []):
+            if not isinstance(ac, dict):
+                continue
+            ac_ref = str(ac.get("id") or f"AC{m + 1}")
+            ac_ref = ac_ref if ac_ref not in ac_seen else f"{ac_ref}#{m + 1}"
+            ac_seen.add(ac_ref)
+            acs.append((ac_ref, ac))
+        data = {k: v for k, v in story.items() if k != "acceptance_criteria"}
+        out.append((ref, key, data, acs))
+    return out
+
+
+def sync_from_spec(db: Session, job_id: str, spec: dict | None) -> set[str]:
+    """Make the job's rows match `spec` (caller commits), writing only what changed.
+
+    Returns the keys of the stories that changed (their own fields or any of their ACs).
+    """
+    existing = {s.ref: s for s in db.scalars(select(UserStory).where(UserStory.job_id == job_id))}
+    acs_by_story: dict[int, dict[str, AcceptanceCriterion]] = defaultdict(dict)
+    for ac in db.scalars(select(AcceptanceCriterion).where(AcceptanceCriterion.job_id == job_id)):
+        acs_by_story[ac.story_id][ac.ref] = ac
+    changed: set[str] = set()
+    for position, (ref, key, data, acs) in enumerate(_rows(spec)):
+        row = existing.pop(ref, None)
+        if row is None:
+            row = UserStory(job_id=job_id, ref=ref, position=position, data=data, version=1)
+            db.add(row)
+            db.flush()  # row.id for its ACs
+            changed.add(key)
+        else:
+            if row.data != data:
+                row.data, row.version = data, row.version + 1
+                changed.add(key)
+            if row.position != position:
+                row.position = position
+        old = acs_by_story.pop(row.id, {})
+        for ac_position, (ac_ref, ac_data) in enumerate(acs):
+            ac = old.pop(ac_ref, None)
+            if ac is None:
+                db.add(AcceptanceCriterion(story_id=row.id, job_id=job_id, ref=ac_ref, position=ac_position, data=ac_data, version=1))
+                changed.add(key)
+                continue
+            if ac.data != ac_data:
+                ac.data, ac.version = ac_data, ac.version + 1
+                changed.add(key)
+            if ac.position != ac_position:
+                ac.position = ac_position
+        for ac in old.values():
+            db.delete(ac)
+            changed.add(key)
+    for row in existing.values():
+        for ac in acs_by_story.pop(row.id, {}).values():
+            db.delete(ac)
+        db.delete(row)
+        changed.add(str(row.data.get("id") or row.ref))
+    return changed
+
+
+def sync_job(db: Session, job: Job, base_version: int) -> set[str]:
+    """Rows for the spec the pipeline just set on the job, and the version bump (caller commits).
+
+    Conditional like every other spec write: raises SpecConflict when the spec was edited since
+    `base_version` (the version the run started from), rather than overwriting that edit.
+    """
+    changed = sync_from_spec(db, job.id, job.spec)
+    _save_view(db, job, job.spec, base_version)
+    return changed
+
+
+def index_changes(db: Session, job_id: str, job_dir: Path, spec: dict, story_keys: set[str]) -> None:
+    """Refresh search and near-duplicate entries of the changed stories only."""
+    if story_keys:
+        search.index_job(db, job_id, job_dir, spec, story_ids=story_keys)
+        dedup.index_job(db, job_id, spec, story_ids=story_keys)
+
+
+def spec_is_stale(job: Job) -> bool:
+    """A story/AC edit committed since the spec blob (and spec.json) was last built."""
+    return (job.spec_view_version or 0) != (job.spec_version or 0)
+
+
+def spec_from_rows(db: Session, job_id: str, spec: dict | None) -> dict:
+    """`spec` with its user_stories rebuilt from the job's rows, in position order."""
+    acs: dict[int, list[dict]] = defaultdict(list)
+    for ac in db.scalars(select(AcceptanceCriterion).where(AcceptanceCriterion.job_id == job_id).order_by(AcceptanceCriterion.position)):
+        acs[ac.story_id].append(ac.data)
+    rows = db.scalars(select(UserStory).where(UserStory.job_id == job_id).order_by(UserStory.position))
+    return {**(spec or {}), "user_stories": [{**row.data, "acceptance_criteria": acs[row.id]} for row in rows]}
+
+
+def current_spec(db: Session, job: Job) -> dict | None:
+    """The job's whole spec, rebuilt from the rows if it is stale (nothing is written)."""
+    return spec_from_rows(db, job.id, job.spec) if spec_is_stale(job) else job.spec
+
+
+def materialize(db: Session, job: Job, job_dir: Path, force: bool = False) -> dict | None:
+    """Bring a stale spec blob and spec.json up to date with the rows (caller commits); returns the current spec.
+
+    Doesn't bump the version: the spec's content is what the rows already said. `force` rebuilds
+    even when not stale (the blob was overwritten without its rows).
+    """
+    if not force and not spec_is_stale(job):
+        return job.spec
+    version = job.spec_version or 0
+    spec = spec_from_rows(db, job.id, job.spec)
+    stored = db.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.spec_version == version)
+        .values(spec=spec, spec_view_version=version)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    set_committed_value(job, "spec", spec)
+    if stored:  # else another edit landed meanwhile: still stale, the next reader rebuilds it
+        set_committed_value(job, "spec_view_version", version)
+        write_spec_file(job_dir, spec)
+    return spec
+
+
+def write_spec_file(job_dir: Path, spec: dict) -> None:
+    """spec.json follows the blob (regenerate-ac and the AC stage read it)."""
+    path = job_dir / "spec.json"
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_text(json.dumps(spec, indent=2))
+    os.replace(tmp, path)
+
+
+def etag(version: int, prefix: str = "") -> str:
+    return f'"{prefix}{version}"'
+
+
+def parse_if_match(value: str | None, prefix: str = "") -> int | None:
+    """Version named by an If-Match header (None when absent or "*"); a foreign tag matches no version."""
+    if value is None or value.strip() == "*":
+        return None
+    tag = value.strip().removeprefix("W/").strip('"')
+    if not tag.startswith(prefix) or not tag[len(prefix):].isdigit():
+        return -1
+    return int(tag[len(prefix):])
+
+
+def remove_job(db: Session, job_id: str) -> None:
+    db.execute(delete(AcceptanceCriterion).where(AcceptanceCriterion.job_id == job_id))
+    db.execute(delete(UserStory).where(UserStory.job_id == job_id))
+
+
+def _save_view(db: Session, job: Job, spec: dict, version: int | None = None) -> int:
+    """Store the whole spec blob and bump the spec version, if it is still `version` (default: the job's as read)."""
+    version = (job.spec_version or 0) if version is None else version
+    updated = db.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.spec_version == version)
+        .values(spec=spec, spec_version=version + 1, spec_view_version=version + 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not updated:
+        raise SpecConflict(f"the spec of job {job.id} changed meanwhile (version {version} is stale)")
+    # the session's copy of the job reflects the write without a reload (and without a second UPDATE)
+    set_committed_value(job, "spec", spec)
+    set_committed_value(job, "spec_version", version + 1)
+    set_committed_value(job, "spec_view_version", version + 1)
+    return version + 1
+
+
+def _bump_version(db: Session, job: Job) -> None:
+    """A row changed: new spec version (ETag), which leaves the blob stale. Unconditional; rows carry their own versions."""
+    db.execute(
+        update(Job)
+        .where(Job.id == job.id)
+        .values(spec_version=Job.spec_version + 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.expire(job, ["spec_version", "updated_at"])
+
+
+def replace_spec(db: Session, job: Job, spec: dict, if_match: int | None = None) -> set[str]:
+    """Whole-spec write (caller commits): sync rows, refresh the blob. Returns the changed story keys."""
+    if if_match is not None and if_match != (job.spec_version or 0):
+        raise VersionMismatch(job.spec_version or 0)
+    if not isinstance(spec.get("user_stories", []), list):
+        raise PatchError("user_stories must be a list")
+    changed = sync_from_spec(db, job.id, spec)
+    _save_view(db, job, spec)
+    return changed
+
+
+def patch_spec(db: Session, job: Job, ops: list, if_match: int | None = None) -> tuple[dict, set[str]]:
+    """Apply an RFC 6902 JSON Patch to the job's spec (caller commits); returns (new spec, changed story keys)."""
+    if if_match is not None and if_match != (job.spec_version or 0):
+        raise VersionMismatch(job.spec_version or 0)  # before applying: a stale patch may not even apply
+    spec = apply_json_patch(current_spec(db, job) or {}, ops)
+    if not isinstance(spec, dict):
+        raise PatchError("the patched spec must be an object")
+    return spec, replace_spec(db, job, spec, if_match)
+
+
+def _merge(data: dict, changes: dict, ref: str) -> dict:
+    """Top-level merge; a null value removes the field. The id can't change (it's the row's ref)."""
+    if "id" in changes and changes["id"] != data.get("id"):
+        raise PatchError("id cannot be changed")
+    merged = dict(data)
+    for k, v in changes.items():
+        if v is None:
+            merged.pop(k, None)
+        else:
+            merged[k] = v
+    return merged
+
+
+def _update_row(db: Session, model, row, data: dict, if_match: int | None) -> None:
+    if if_match is not None and if_match != row.version:
+        raise VersionMismatch(row.version)
+    updated = db.execute(
+        update(model)
+        .where(model.id == row.id, model.version == row.version)
+        .values(data=data, version=row.version + 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not updated:
+        db.refresh(row)
+        raise VersionMismatch(row.version)
+
+
+def _story_row(db: Session, job_id: str, ref: str) -> UserStory:
+    row = db.scalars(select(UserStory).where(UserStory.job_id == job_id, UserStory.ref == ref)).first()
+    if row is None:
+        raise NotFound(f"Story {ref} not found")
+    return row
+
+
+def ac_rows(db: Session, story_row_id: int) -> list[AcceptanceCriterion]:
+    return list(db.scalars(select(AcceptanceCriterion).where(AcceptanceCriterion.story_id == story_row_id).order_by(AcceptanceCriterion.position)))
+
+
+def update_story(db: Session, job: Job, ref: str, changes: dict, if_match: int | None = None) -> tuple[UserStory, str]:
+    """Merge `changes` into one story (caller commits); returns (row, story key). Its ACs are edited separately."""
+    if "acceptance_criteria" in changes:
+        raise PatchError("edit acceptance criteria through their own endpoint or a JSON Patch")
+    row = _story_row(db, job.id, ref)
+    data = _merge(row.data, changes, ref)
+    _update_row(db, UserStory, row, data, if_match)
+    _bump_version(db, job)
+    db.refresh(row)
+    return row, _story_key(data, row.position)
+
+
+def update_ac(db: Session, job: Job, story_ref: str, ac_ref: str, changes: dict, if_match: int | None = None) -> tuple[AcceptanceCriterion, str]:
+    """Merge `changes` into one acceptance criterion (caller commits); returns (row, its story's key)."""
+    story = _story_row(db, job.id, story_ref)
+    ac = db.scalars(select(AcceptanceCriterion).where(AcceptanceCriterion.story_id == story.id, AcceptanceCriterion.ref == ac_ref)).first()
+    if ac is None:
+        raise NotFound(f"Acceptance criterion {story_ref}/{ac_ref} not found")
+    _update_row(db, AcceptanceCriterion, ac, _merge(ac.data, changes, ac_ref), if_match)
+    _bump_version(db, job)
+    db.refresh(ac)
+    return ac, _story_key(story.data, story.position)
+
+
+def story_out(row: UserStory, acs: list[AcceptanceCriterion]) -> dict:
+    return {
+        "ref": row.ref,
+        "position": row.position,
+        "version": row.version,
+        "data": row.data,
+        "acceptance_criteria": [ac_out(ac) for ac in acs],
+    }
+
+
+def ac_out(ac: AcceptanceCriterion) -> dict:
+    return {"ref": ac.ref, "position": ac.position, "version": ac.version, "data": ac.data}
+
+
+async def list_stories(db: AsyncSession, job_id: str) -> list[dict]:
+    """The job's stories in spec order, each with its ACs and versions."""
+    rows = (await db.scalars(select(UserStory).where(UserStory.job_id == job_id).order_by(UserStory.position))).all()
+    acs: dict[int, list[AcceptanceCriterion]] = defaultdict(list)
+    for ac in (
+        await db.scalars(
+            select(AcceptanceCriterion).where(AcceptanceCriterion.job_id == job_id).order_by(AcceptanceCriterion.position)
+        )
+    ).all():
+        acs[ac.story_id].append(ac)
+    return [story_out(row, acs[row.id]) for row in rows]
+
+
+# RFC 6902 JSON Patch over RFC 6901 JSON Pointers
+
+
+def _pointer(path) -> list[str]:
+    if not isinstance(path, str) or (path and not path.startswith("/")):
+        raise PatchError(f"invalid JSON Pointer: {path!r}")
+    return [p.replace("~1", "/").replace("~0", "~") for p in path.split("/")[1:]] if path else []
+
+
+def _index(container: list, token: str, for_add: bool = False) -> int:
+    if for_add and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise PatchError(f"invalid array index {token!r}")
+    i = int(token)
+    if i > len(container) or (i == len(container) and not for_add):
+        raise PatchError(f"array index {i} out of range")
+    return i
+
+
+def _resolve(doc, tokens: list[str]):
+    for token in tokens:
+        if isinstance(doc, dict):
+            if token not in doc:
+                raise PatchError(f"path not found: /{'/'.join(tokens)}")
+            doc = doc[token]
+        elif isinstance(doc, list):
+            doc = doc[_index(doc, token)]
+        else:
+            raise PatchError(f"path not found: /{'/'.join(tokens)}")
+    return doc
+
+
+def _add(doc, tokens: list[str], value):
+    if not tokens:
+        return value
+    parent = _resolve(doc, tokens[:-1])
+    if isinstance(parent, dict):
+        parent[tokens[-1]] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, tokens[-1], for_add=True), value)
+    else:
+        raise PatchError(f"cannot add to a scalar at /{'/'.join(tokens[:-1])}")
+    return doc
+
+
+def _remove(doc, tokens: list[str]):
+    if not tokens:
+        raise PatchError("cannot remove the whole document")
+    parent = _resolve(doc, tokens[:-1])
+    if isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise PatchError(f"path not found: /{'/'.join(tokens)}")
+        return parent.pop(tokens[-1])
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, tokens[-1]))
+    raise PatchError(f"path not found: /{'/'.join(tokens)}")
+
+
+def apply_json_patch(doc, ops: list):
+    """Apply the operations to a copy of doc, all or nothing. Raises PatchError (PatchTestFailed for a failed "test")."""
+    if not isinstance(ops, list):
+        raise PatchError("a JSON Patch is an array of operations")
+    doc = copy.deepcopy(doc)
+    for n, op in enumerate(ops):
+        if not isinstance(op, dict) or "path" not in op:
+            raise PatchError(f"operation {n}: needs op and path")
+        kind, tokens = op.get("op"), _pointer(op["path"])
+        if kind in ("add", "replace", "test") and "value" not in op:
+            raise PatchError(f"operation {n}: {kind} needs a value")
+        if kind == "add":
+            doc = _add(doc, tokens, copy.deepcopy(op["value"]))
+        elif kind == "remove":
+            _remove(doc, tokens)
+        elif kind == "replace":
+            _resolve(doc, tokens)  # must exist
+            if tokens:
+                _remove(doc, tokens)
+            doc = _add(doc, tokens, copy.deepcopy(op["value"]))
+        elif kind in ("move", "copy"):
+            source = _pointer(op.get("from"))
+            if kind == "move" and tokens[: len(source)] == source and tokens != source:
+                raise PatchError(f"operation {n}: cannot move a value into itself")
+            value = _remove(doc, source) if kind == "move" else copy.deepcopy(_resolve(doc, source))
+            doc = _add(doc, tokens, value)
+        elif kind == "test":
+            if _resolve(doc, tokens) != op["value"]:
+                raise PatchTestFailed(f"operation {n}: test failed at {op['path']}")
+        else:
+            raise PatchError(f"operation {n}: unknown op {kind!r}")
+    return doc
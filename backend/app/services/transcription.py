@@ -2,9 +2,11 @@
 import json
 import logging
 from pathlib import Path
-from openai import OpenAI
 
 from app.config import settings, openai_client_kwargs
+from app.services.llm import transcription
+from app.services.vad import trim_silence
+from app.tracing import traced
 
 logger = logging.getLogger("app.transcription")
 
@@ -15,20 +17,7 @@ def _mask_key(k: str | None) -> str:
     return f"{k[:10]}...{k[-4:]}(len={len(k)})"
 
 
-def transcribe_audio(audio_path: str, transcript_path: str) -> None:
-    """Transcribe audio to timestamped segments; save to transcript.json."""
-    kwargs = openai_client_kwargs()
-    if not kwargs.get("api_key"):
-        raise ValueError("OPENAI_API_KEY is not set; check .env and restart backend")
-    logger.info("transcribe_audio: key=%s", _mask_key(kwargs.get("api_key")))
-    client = OpenAI(**kwargs)
-    with open(audio_path, "rb") as f:
-        transcript = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=f,
-            response_format="verbose_json",
-            timestamp_granularities=["segment"],
-        )
+def _segments(transcript) -> list[dict]:
     segments = []
     if hasattr(transcript, "segments") and transcript.segments:
         for s in transcript.segments:
@@ -41,5 +30,42 @@ def transcribe_audio(audio_path: str, transcript_path: str) -> None:
         text = getattr(transcript, "text", "") or ""
         if text:
             segments.append({"start": 0.0, "end": 0.0, "text": text})
+    return segments
+
+
+@traced()
+def transcribe_audio(audio_path: str, transcript_path: str) -> None:
+    """Transcribe audio to timestamped segments; save to transcript.json.
+
+    With VAD on, only the voiced regions are sent to Whisper and segment times are mapped back to
+    the recording's timeline (the regions are recorded under "vad").
+    """
+    kwargs = openai_client_kwargs()
+    if not kwargs.get("api_key"):
+        raise ValueError("OPENAI_API_KEY is not set; check .env and restart backend")
+    logger.info("transcribe_audio: key=%s", _mask_key(kwargs.get("api_key")))
+    voiced = trim_silence(audio_path, Path(audio_path).with_name("audio.voiced.wav")) if settings.vad_enabled else None
+    try:
+        from openai import OpenAI
+
+        client = OpenAI(**kwargs)
+        with open(voiced.path if voiced else audio_path, "rb") as f:
+            transcript = transcription(
+                client,
+                model="whisper-1",
+                file=f,
+                response_format="verbose_json",
+                timestamp_granularities=["segment"],
+            )
+        segments = _segments(transcript)
+        if voiced:
+            for seg in segments:
+                seg["start"] = round(voiced.to_original(seg["start"]), 3)
+                seg["end"] = round(voiced.to_original(seg["end"], end=True), 3)
+    finally:
+        if voiced is not None:
+            voiced.path.unlink(missing_ok=True)
     out = {"segments": segments}
+    if voiced is not None:
+        out["vad"] = voiced.summary()
     Path(transcript_path).write_text(json.dumps(out, indent=2))
@@ -0,0 +1,159 @@
+"""Per-job token and cost ledger, and the job's spend budget.
+
+process_job activates a UsageLedger for the run; app.services.llm records every successful model
+call into whichever ledger is active (prompt/completion tokens, audio seconds, images), tagged
+with the stage being run. The ledger is saved on the job (`Job.usage`) with each stage commit
+and served by GET /api/jobs/{id}/usage. Calls are aggregated per stage and model, so the ledger
+stays small however many screenshots a job has.
+
+Budget: once a job has spent `job_budget_degrade_ratio` of its budget, vision switches to low-detail images;
+once the budget is spent, vision stops describing further screenshots. Spec and acceptance
+criteria still run, so an over-budget job completes with partial visual context instead of failing.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Iterator
+
+from app.config import settings
+from app.metrics import OPENAI_COST, OPENAI_TOKENS
+
+logger = logging.getLogger("app.usage")
+
+BUDGET_OK = "ok"
+BUDGET_DEGRADED = "degraded"
+BUDGET_EXHAUSTED = "exhausted"
+
+_COUNTERS = ("calls", "prompt_tokens", "completion_tokens", "audio_seconds", "images", "cost_usd")
+
+_current: ContextVar["UsageLedger | None"] = ContextVar("usage_ledger", default=None)
+
+
+def call_cost_usd(model: str, prompt_tokens: int, completion_tokens: int, audio_seconds: float) -> float:
+    """Price of one call from settings.openai_prices_usd (unknown models cost 0)."""
+    price = settings.openai_prices_usd.get(model, {})
+    return (
+        prompt_tokens * price.get("input_per_1m", 0.0) / 1_000_000
+        + completion_tokens * price.get("output_per_1m", 0.0) / 1_000_000
+        + audio_seconds * price.get("per_minute", 0.0) / 60
+    )
+
+
+def _empty() -> dict:
+    return {k: 0 for k in _COUNTERS}
+
+
+def _rounded(counts: dict) -> dict:
+    return {k: round(v, 6) if isinstance(v, float) else v for k, v in counts.items()}
+
+
+class UsageLedger:
+    """Usage of one job, resumed from the stored ledger so reruns add to what earlier runs spent."""
+
+    def __init__(self, data: dict | None = None, budget_usd: float | None = None):
+        data = data or {}
+        self.stage: str | None = None  # set by the pipeline; calls are attributed to it
+        self.budget_usd = float(budget_usd if budget_usd is not None else data.get("budget_usd") or 0.0)
+        self._totals = {**_empty(), **data.get("totals", {})}
+        self._by_stage: dict[str, dict[str, dict]] = {
+            stage: {model: {**_empty(), **counts} for model, counts in models.items()}
+            for stage, models in data.get("by_stage", {}).items()
+        }
+        self._events: list[dict] = list(data.get("events", []))
+        self._lock = threading.Lock()
+        self._state = self._compute_state()
+
+    def _compute_state(self) -> str:
+        if self.budget_usd <= 0:
+            return BUDGET_OK
+        if self._totals["cost_usd"] >= self.budget_usd:
+            return BUDGET_EXHAUSTED
+        if self._totals["cost_usd"] >= self.budget_usd * settings.job_budget_degrade_ratio:
+            return BUDGET_DEGRADED
+        return BUDGET_OK
+
+    def record(
+        self,
+        model: str,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        audio_seconds: float = 0.0,
+        images: int = 0,
+    ) -> None:
+        cost = call_cost_usd(model, prompt_tokens, completion_tokens, audio_seconds)
+        call = {
+            "calls": 1,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "audio_seconds": audio_seconds,
+            "images": images,
+            "cost_usd": cost,
+        }
+        stage = self.stage or "other"
+        with self._lock:
+            per_model = self._by_stage.setdefault(stage, {}).setdefault(model, _empty())
+            for k, v in call.items():
+                per_model[k] += v
+                self._totals[k] += v
+            state = self._compute_state()
+            if state != self._state:
+                self._state = state
+                self._events.append({
+                    "at": datetime.utcnow().isoformat(),
+                    "stage": stage,
+                    "budget_state": state,
+                    "cost_usd": round(self._totals["cost_usd"], 6),
+                })
+                logger.warning(
+                    "job budget %s stage=%s spent=$%.4f budget=$%.4f", state, stage, self._totals["cost_usd"], self.budget_usd
+                )
+
+    @property
+    def cost_usd(self) -> float:
+        return self._totals["cost_usd"]
+
+    def budget_state(self) -> str:
+        return self._state
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "budget_usd": self.budget_usd,
+                "budget_state": self._state,
+                "totals": _rounded(self._totals),
+                "by_stage": {stage: {m: _rounded(c) for m, c in models.items()} for stage, models in self._by_stage.items()},
+                "events": list(self._events),
+            }
+
+
+def current_ledger() -> UsageLedger | None:
+    return _current.get()
+
+
+@contextmanager
+def activate_ledger(ledger: UsageLedger) -> Iterator[UsageLedger]:
+    """Record model calls made in this context (and code it calls) into `ledger`."""
+    token = _current.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _current.reset(token)
+
+
+def record_call(model: str, prompt_tokens: int = 0, completion_tokens: int = 0, audio_seconds: float = 0.0, images: int = 0) -> None:
+    """Count a call in the process metrics and in the active ledger, if any."""
+    if prompt_tokens:
+        OPENAI_TOKENS.labels(model=model, kind="prompt").inc(prompt_tokens)
+    if completion_tokens:
+        OPENAI_TOKENS.labels(model=model, kind="completion").inc(completion_tokens)
+    OPENAI_COST.labels(model=model).inc(call_cost_usd(model, prompt_tokens, completion_tokens, audio_seconds))
+    ledger = _current.get()
+    if ledger is not None:
+        ledger.record(model, prompt_tokens, completion_tokens, audio_seconds, images)
+
+
+def job_budget_usd(job) -> float:
+    """The job's own budget if it set one at upload, else the configured default (0 = unlimited)."""
+    return job.budget_usd if job.budget_usd is not None else settings.job_budget_usd
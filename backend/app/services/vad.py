@@ -0,0 +1,168 @@
+"""Voice activity detection: cut silence out of the audio before transcription and map times back."""
+import bisect
+import logging
+import wave
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from app.config import settings
+from app.tracing import annotate, traced
+
+logger = logging.getLogger("app.vad")
+
+_FULL_SCALE_POWER = 32768.0**2
+_SILENCE_DBFS = -55.0  # frames below this are silence whatever the noise floor
+_PEAK_FRAMES = 10  # loudness of the recording = mean of its loudest frames (a single click can't set it)
+_MIN_RANGE_DB = 10.0  # less spread than this between quiet and loud frames: no pauses to cut
+_BLOCK_FRAMES = 4096  # frames converted to float at a time
+
+
+def read_pcm(wav_path: Path | str) -> tuple[np.ndarray, int]:
+    """Memory-mapped int16 samples and sample rate of a mono 16-bit PCM WAV. Raises ValueError otherwise."""
+    path = Path(wav_path)
+    with path.open("rb") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            raise ValueError(f"{path.name} is not a WAV file")
+        fmt = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                raise ValueError(f"{path.name} has no data chunk")
+            chunk_id, size = chunk[:4], int.from_bytes(chunk[4:], "little")
+            if chunk_id == b"fmt ":
+                fmt = f.read(size)
+                f.seek(size % 2, 1)
+            elif chunk_id == b"data":
+                offset = f.tell()
+                break
+            else:
+                f.seek(size + size % 2, 1)  # chunks are word-aligned
+    if fmt is None or len(fmt) < 16:
+        raise ValueError(f"{path.name} has no fmt chunk")
+    audio_format = int.from_bytes(fmt[0:2], "little")
+    channels = int.from_bytes(fmt[2:4], "little")
+    rate = int.from_bytes(fmt[4:8], "little")
+    bits = int.from_bytes(fmt[14:16], "little")
+    if audio_format != 1 or channels != 1 or bits != 16:
+        raise ValueError(f"{path.name}: expected mono 16-bit PCM, got format={audio_format} channels={channels} bits={bits}")
+    # ffmpeg may leave the data size unset on a non-seekable output; trust the file length instead
+    count = (min(size, path.stat().st_size - offset)) // 2
+    if count <= 0:
+        return np.zeros(0, dtype="<i2"), rate
+    return np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(count,)), rate
+
+
+def frame_energy_db(samples: np.ndarray, frame_len: int) -> np.ndarray:
+    """Mean power of each whole frame in dBFS, computed a block of frames at a time."""
+    n_frames = len(samples) // frame_len
+    power = np.empty(n_frames, dtype=np.float64)
+    for i in range(0, n_frames, _BLOCK_FRAMES):
+        j = min(n_frames, i + _BLOCK_FRAMES)
+        block = np.asarray(samples[i * frame_len : j * frame_len], dtype=np.float32).reshape(j - i, frame_len)
+        power[i:j] = np.einsum("ij,ij->i", block, block, dtype=np.float64) / frame_len
+    return 10 * np.log10(power / _FULL_SCALE_POWER + 1e-12)
+
+
+def voiced_regions(samples: np.ndarray, rate: int) -> list[tuple[int, int]]:
+    """[start, end) sample ranges of speech, padded and with short pauses bridged."""
+    frame_len = max(1, rate * settings.vad_frame_ms // 1000)
+    energy = frame_energy_db(samples, frame_len)
+    if not len(energy):
+        return []
+    # The loudest frames, not a high percentile: narration may fill only a few percent of a screen capture
+    floor, loud = np.percentile(energy, 10), float(np.sort(energy)[-_PEAK_FRAMES:].mean())
+    if loud < _SILENCE_DBFS:
+        return []
+    if loud - floor < _MIN_RANGE_DB:
+        return [(0, len(samples))]  # steady level throughout (e.g. continuous speech or music)
+    voiced = energy > max(floor + settings.vad_threshold_db, _SILENCE_DBFS)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced.astype(np.int8), [0]))))
+    min_speech = max(1, settings.vad_min_speech_ms // settings.vad_frame_ms)
+    pad = rate * settings.vad_padding_ms // 1000
+    bridge = rate * settings.vad_min_silence_ms // 1000
+    regions: list[tuple[int, int]] = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        if end - start < min_speech:
+            continue  # a click or a pop, not speech
+        a = max(0, int(start) * frame_len - pad)
+        b = min(len(samples), int(end) * frame_len + pad)
+        if regions and a - regions[-1][1] < bridge:
+            regions[-1] = (regions[-1][0], b)
+        else:
+            regions.append((a, b))
+    return regions
+
+
+@dataclass
+class VoicedAudio:
+    """Voiced regions of a recording written back to back; maps times back to the original."""
+
+    path: Path
+    rate: int
+    original_s: float
+    regions: list[tuple[int, int]] = field(default_factory=list)
+
+    def __post_init__(self):
+        self._out_starts: list[int] = []
+        pos = 0
+        for a, b in self.regions:
+            self._out_starts.append(pos)
+            pos += b - a
+
+    @property
+    def voiced_s(self) -> float:
+        return sum(b - a for a, b in self.regions) / self.rate
+
+    def to_original(self, t: float, end: bool = False) -> float:
+        """Time in the voiced audio -> time in the recording.
+
+        A time on the seam between two regions is both the end of one and the start of the next:
+        it maps to the next region's start, or with `end` (a segment's end time) to the previous
+        region's end, so a segment never stretches over the cut silence.
+        """
+        if not self.regions:
+            return t
+        pos = t * self.rate
+        find = bisect.bisect_left if end else bisect.bisect_right
+        i = max(0, find(self._out_starts, pos) - 1)
+        a, b = self.regions[i]
+        return (a + min(max(pos - self._out_starts[i], 0), b - a)) / self.rate
+
+    def summary(self) -> dict:
+        return {
+            "original_s": round(self.original_s, 3),
+            "voiced_s": round(self.voiced_s, 3),
+            "regions": [[round(a / self.rate, 3), round(b / self.rate, 3)] for a, b in self.regions],
+        }
+
+
+@traced()
+def trim_silence(wav_path: Path | str, out_path: Path | str) -> VoicedAudio | None:
+    """Write the voiced regions of wav_path to out_path. None when trimming isn't worth it, possible or
+    safe (no voiced regions found): transcribe the original then."""
+    try:
+        samples, rate = read_pcm(wav_path)
+    except ValueError as e:
+        logger.warning("vad skipped: %s", e)
+        return None
+    original_s = len(samples) / rate if rate else 0.0
+    regions = voiced_regions(samples, rate)
+    voiced = VoicedAudio(path=Path(out_path), rate=rate, original_s=original_s, regions=regions)
+    annotate(original_s=round(original_s, 3), voiced_s=round(voiced.voiced_s, 3), regions=len(regions))
+    if not regions:
+        # Silence, or speech too quiet to tell from the noise: let Whisper decide, never drop the transcript
+        logger.info("vad found no voiced regions in %.1fs; sending the original audio", original_s)
+        return None
+    if voiced.voiced_s > original_s * (1 - settings.vad_min_savings):
+        return None
+    with wave.open(str(out_path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        for a, b in regions:
+            w.writeframes(np.ascontiguousarray(samples[a:b]).tobytes())
+    logger.info("vad original=%.1fs voiced=%.1fs regions=%s", original_s, voiced.voiced_s, len(regions))
+    return voiced
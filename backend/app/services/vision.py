@@ -1,12 +1,23 @@
-"""Visual understanding: per-screenshot vision API + cache."""
+"""Visual understanding: per-screenshot vision API + cache, within the job's spend budget."""
 import json
 import base64
+import logging
+import time
 from pathlib import Path
-from openai import OpenAI
 
 from app.config import settings, openai_client_kwargs
+from app.metrics import CACHE_HITS, SCREENSHOTS_ANALYZED, VISION_TIER_DURATION
+from app.services.artifacts import read_json
+from app.services.llm import chat_completion
+from app.services.scheduler import BULK, prioritized
+from app.services.usage import BUDGET_DEGRADED, BUDGET_EXHAUSTED, BUDGET_OK, current_ledger
+from app.tracing import annotate, traced
+
+logger = logging.getLogger("app.vision")
 
 VISION_SCHEMA_KEYS = ("page", "elements", "errors_or_banners", "empty_states", "navigation_context")
+# A fast-tier description with fewer non-empty keys than this is re-asked of the full model
+VISION_MIN_FILLED_KEYS = 2
 PROMPT = """Describe this UI screenshot in JSON with exactly these keys (use empty array/string if none):
 - page: string (page or section name)
 - elements: array of strings (visible UI elements: buttons, inputs, tabs, modals, links)
@@ -36,50 +47,119 @@ def _repair_vision_response(data: dict) -> dict:
     return out
 
 
-def describe_screenshots(job_dir: Path) -> None:
-    """For each screenshot in manifest, call vision API (or use cache), save to cache/vision/{basename}.json."""
+def _empty_description() -> dict:
+    return {k: "" if k in ("page", "empty_states", "navigation_context") else [] for k in VISION_SCHEMA_KEYS}
+
+
+def _mostly_empty(data: dict) -> bool:
+    return sum(1 for k in VISION_SCHEMA_KEYS if data.get(k)) < VISION_MIN_FILLED_KEYS
+
+
+def _tiers(entry: dict) -> tuple[str, ...]:
+    """Models to try for a screenshot, cheapest first: the fast tier only for small changes."""
+    diff = entry.get("diff")
+    if settings.vision_fast_model and diff is not None and diff < settings.vision_fast_max_diff:
+        return ("fast", "full")
+    return ("full",)
+
+
+def _vision_call(client, model: str, b64: str, detail: str) -> dict | None:
+    """One vision request; the repaired description, or None when the response isn't usable JSON."""
+    try:
+        resp = chat_completion(
+            client,
+            model=model,
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": PROMPT},
+                        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{b64}", "detail": detail}},
+                    ],
+                }
+            ],
+            max_tokens=1024,
+        )
+        text = resp.choices[0].message.content or "{}"
+        text = text.strip()
+        if text.startswith("```"):
+            start = text.find("{")
+            end = text.rfind("}") + 1
+            if start >= 0 and end > start:
+                text = text[start:end]
+        return _repair_vision_response(json.loads(text))
+    except Exception:
+        return None
+
+
+def _describe(client, entry: dict, b64: str, detail: str, counts: dict[str, int]) -> dict:
+    tiers = _tiers(entry)
+    data = None
+    for tier in tiers:
+        model = settings.vision_fast_model if tier == "fast" else settings.vision_model
+        start = time.monotonic()
+        data = _vision_call(client, model, b64, detail)
+        if tier != tiers[-1] and (data is None or _mostly_empty(data)):
+            outcome = "escalated"
+        else:
+            outcome = "ok" if data is not None else "failed"
+        VISION_TIER_DURATION.labels(tier=tier, outcome=outcome).observe(time.monotonic() - start)
+        counts[tier] += 1
+        if outcome != "escalated":
+            break
+        counts["escalated"] += 1
+    return data if data is not None else _empty_description()
+
+
+@traced()
+@prioritized(BULK)  # one call per screenshot; yields to other jobs' spec/AC calls
+def describe_screenshots(job_dir: Path) -> int:
+    """For each screenshot in manifest, call vision API (or use cache), save to cache/vision/{basename}.json.
+
+    Small changes go to the fast model tier first (see _tiers), escalating to the full model when
+    the fast answer is unusable. Past job_budget_degrade_ratio of the job's budget, images go at low
+    detail; with the budget spent, the remaining screenshots are left undescribed (grounding then
+    uses their transcript only). Returns how many were left undescribed that way.
+    """
     manifest_path = job_dir / "screenshots" / "manifest.json"
     if not manifest_path.exists():
-        return
-    manifest = json.loads(manifest_path.read_text())
+        return 0
+    manifest = read_json(manifest_path)
+    annotate(screenshots=len(manifest))
     cache_dir = job_dir / "cache" / "vision"
     cache_dir.mkdir(parents=True, exist_ok=True)
+    from openai import OpenAI
+
     client = OpenAI(**openai_client_kwargs())
     screenshots_dir = job_dir / "screenshots"
+    ledger = current_ledger()
+    low_detail, over_budget = 0, 0
+    tier_counts = {"fast": 0, "full": 0, "escalated": 0}
 
     for entry in manifest:
         path = entry.get("path", "")
         basename = Path(path).stem
         cache_file = cache_dir / f"{basename}.json"
         if cache_file.exists():
+            CACHE_HITS.labels(cache="vision").inc()
             continue
         img_path = screenshots_dir / path
         if not img_path.exists():
             continue
+        budget = ledger.budget_state() if ledger else BUDGET_OK
+        if budget == BUDGET_EXHAUSTED:
+            over_budget += 1
+            continue
+        detail = "auto"
+        if budget == BUDGET_DEGRADED:
+            detail = "low"
+            low_detail += 1
         b64 = _encode_image(img_path)
-        try:
-            resp = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": PROMPT},
-                            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{b64}"}},
-                        ],
-                    }
-                ],
-                max_tokens=1024,
-            )
-            text = resp.choices[0].message.content or "{}"
-            text = text.strip()
-            if text.startswith("```"):
-                start = text.find("{")
-                end = text.rfind("}") + 1
-                if start >= 0 and end > start:
-                    text = text[start:end]
-            data = json.loads(text)
-            data = _repair_vision_response(data)
-        except Exception:
-            data = {k: "" if k in ("page", "empty_states", "navigation_context") else [] for k in VISION_SCHEMA_KEYS}
+        SCREENSHOTS_ANALYZED.inc()
+        data = _describe(client, entry, b64, detail, tier_counts)
         cache_file.write_text(json.dumps(data, indent=2))
+    annotate(fast_calls=tier_counts["fast"], full_calls=tier_counts["full"], escalated=tier_counts["escalated"])
+    if low_detail or over_budget:
+        logger.warning("describe_screenshots budget: low_detail=%s skipped=%s job_dir=%s", low_detail, over_budget, job_dir)
+        annotate(low_detail=low_detail, skipped_over_budget=over_budget)
+    return over_budget
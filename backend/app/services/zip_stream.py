@@ -0,0 +1,67 @@
+"""Streaming ZIP writer: yields archive bytes as entries are added, never holding the whole archive."""
+import io
+import time
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator
+
+CHUNK_SIZE = 256 * 1024
+ZIP64_THRESHOLD = 1 << 31
+# Already-compressed formats are stored as-is; deflating them only burns CPU
+STORED_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".mp4", ".webm", ".gz", ".zip"}
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable write target. zipfile falls back to data descriptors and we drain bytes as they arrive."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def file_entry(path: Path) -> Iterator[bytes]:
+    """Read a file in CHUNK_SIZE blocks (use as an entry source)."""
+    with open(path, "rb") as f:
+        while block := f.read(CHUNK_SIZE):
+            yield block
+
+
+def stream_zip(entries: Iterable[tuple[str, bytes | Path]]) -> Iterator[bytes]:
+    """Yield a ZIP archive of (archive name, bytes or file path) entries, produced lazily.
+
+    Memory stays bounded by one read block plus the compressor state; entries (and the
+    iterable itself) are only evaluated as the consumer pulls bytes.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w") as zf:
+        for name, source in entries:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = (
+                zipfile.ZIP_STORED if Path(name).suffix.lower() in STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+            )
+            size = source.stat().st_size if isinstance(source, Path) else len(source)
+            with zf.open(info, "w", force_zip64=size >= ZIP64_THRESHOLD) as dest:
+                blocks = file_entry(source) if isinstance(source, Path) else (source,)
+                for block in blocks:
+                    dest.write(block)
+                    if data := sink.drain():
+                        yield data
+            if data := sink.drain():
+                yield data
+    yield sink.drain()
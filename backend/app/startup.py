@@ -0,0 +1,95 @@
+"""Startup timing: how long importing and initializing the API took, checked against a budget.
+
+main.py marks phases as it imports and as the lifespan runs; the report is logged once the app is
+ready (a warning when over `startup_budget_ms`) and served at /api/health/startup.
+
+`python -m app.startup` measures a cold `import app.main` in a fresh interpreter, lists the most
+expensive imports and exits 1 when over budget, so it can run as a CI check.
+"""
+import argparse
+import logging
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+logger = logging.getLogger("app.startup")
+
+_started = time.perf_counter()
+_last = _started
+_phases: list[tuple[str, float]] = []
+
+
+def mark(phase: str) -> None:
+    """Record the time since the previous mark (or since this module was imported) as `phase`."""
+    global _last
+    now = time.perf_counter()
+    _phases.append((phase, now - _last))
+    _last = now
+
+
+def report() -> dict:
+    from app.config import settings
+
+    total_ms = sum(s for _, s in _phases) * 1000
+    return {
+        "phases": [{"name": name, "ms": round(s * 1000, 1)} for name, s in _phases],
+        "total_ms": round(total_ms, 1),
+        "budget_ms": settings.startup_budget_ms,
+        "within_budget": total_ms <= settings.startup_budget_ms,
+    }
+
+
+def log_report() -> None:
+    r = report()
+    phases = " ".join(f"{p['name']}={p['ms']}ms" for p in r["phases"])
+    if r["within_budget"]:
+        logger.info("startup ready total=%.1fms budget=%sms %s", r["total_ms"], r["budget_ms"], phases)
+    else:
+        logger.warning("startup over budget total=%.1fms budget=%sms %s", r["total_ms"], r["budget_ms"], phases)
+
+
+def _import_times(module: str) -> tuple[float, list[tuple[float, float, str]]]:
+    """(total ms, [(cumulative ms, self ms, module)]) from `python -X importtime -c "import <module>"`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows, total = [], 0.0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # header row
+        cum_ms, self_ms = int(cum_us) / 1000, int(self_us) / 1000
+        if not name.startswith("  "):  # top-level import: its cumulative time covers its children
+            total += cum_ms
+        rows.append((cum_ms, self_ms, name.strip()))
+    return total, rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    from app.config import settings
+
+    parser = argparse.ArgumentParser(description="Measure cold import cost of the API against the startup budget.")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=settings.startup_budget_ms)
+    parser.add_argument("--top", type=int, default=15, help="show the N most expensive imports")
+    args = parser.parse_args(argv)
+
+    total, rows = _import_times(args.module)
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cum_ms, self_ms, name in sorted(rows, reverse=True)[: args.top]:
+        print(f"{cum_ms:14.1f} {self_ms:9.1f}  {name}")
+    over = total > args.budget_ms
+    print(f"import {args.module}: {total:.1f}ms (budget {args.budget_ms:.0f}ms){' OVER BUDGET' if over else ''}")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""Per-job execution traces in Chrome trace event format (open in ui.perfetto.dev or chrome://tracing).
+
+process_job activates a Tracer for the job; `span()` / `@traced` record complete ("X") events
+into whichever tracer is active in the current context and cost almost nothing when none is.
+The trace is written to {job_dir}/trace.json when the run ends, whether it completed or failed.
+Work done in another process records into its own Tracer and is grafted into the job's.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Iterator
+
+TRACE_FILENAME = "trace.json"
+
+_current: ContextVar["Tracer | None"] = ContextVar("tracer", default=None)
+_span_args: ContextVar[dict | None] = ContextVar("span_args", default=None)
+
+
+class Tracer:
+    """Collects trace events for one run; timestamps are microseconds since the tracer was created."""
+
+    def __init__(self, name: str, **metadata: Any):
+        self.name = name
+        self.metadata = metadata
+        self._t0 = time.perf_counter_ns()
+        self._wall_start = time.time()
+        self._events: list[dict] = []
+        self._threads: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def _ts(self, ns: int) -> float:
+        return (ns - self._t0) / 1000
+
+    def _tid(self) -> int:
+        tid = threading.get_ident()
+        if tid not in self._threads:
+            self._threads[tid] = threading.current_thread().name
+        return tid
+
+    def complete(self, name: str, cat: str, start_ns: int, end_ns: int, args: dict | None = None) -> None:
+        event = {"name": name, "cat": cat, "ph": "X", "ts": self._ts(start_ns), "dur": (end_ns - start_ns) / 1000, "pid": 1}
+        if args:
+            event["args"] = args
+        with self._lock:
+            event["tid"] = self._tid()
+            self._events.append(event)
+
+    def instant(self, name: str, cat: str, args: dict | None = None) -> None:
+        event = {"name": name, "cat": cat, "ph": "i", "s": "t", "ts": self._ts(time.perf_counter_ns()), "pid": 1}
+        if args:
+            event["args"] = args
+        with self._lock:
+            event["tid"] = self._tid()
+            self._events.append(event)
+
+    def export(self) -> dict:
+        """This tracer's events, for graft() into a tracer in another process."""
+        with self._lock:
+            return {"started_at": self._wall_start, "events": [dict(e) for e in self._events]}
+
+    def graft(self, exported: dict) -> None:
+        """Add another process's events (its export()) on the current thread, aligned by wall clock."""
+        offset_us = (exported["started_at"] - self._wall_start) * 1e6
+        with self._lock:
+            tid = self._tid()
+            self._events.extend({**e, "ts": e["ts"] + offset_us, "pid": 1, "tid": tid} for e in exported["events"])
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            meta = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": self.name}}]
+            meta += [
+                {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": tname}}
+                for tid, tname in self._threads.items()
+            ]
+            events = meta + sorted(self._events, key=lambda e: e["ts"])
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"started_at": self._wall_start, **self.metadata},
+        }
+
+    def write(self, path: Path) -> None:
+        tmp = path.with_name(f"{path.name}.tmp")
+        tmp.write_text(json.dumps(self.to_dict(), separators=(",", ":")))
+        os.replace(tmp, path)
+
+
+def current_tracer() -> Tracer | None:
+    return _current.get()
+
+
+@contextmanager
+def activate(tracer: Tracer) -> Iterator[Tracer]:
+    """Make `tracer` the target of spans recorded in this context (and code it calls)."""
+    token = _current.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, cat: str = "app", **args: Any) -> Iterator[dict]:
+    """Record a complete event around the block. Yields the args dict so the block can add to it."""
+    tracer = _current.get()
+    if tracer is None:
+        yield args
+        return
+    token = _span_args.set(args)
+    start = time.perf_counter_ns()
+    try:
+        yield args
+    except BaseException as e:
+        args["error"] = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        tracer.complete(name, cat, start, time.perf_counter_ns(), args)
+        _span_args.reset(token)
+
+
+def instant(name: str, cat: str = "app", **args: Any) -> None:
+    """Record a zero-duration marker (e.g. a skipped stage), if tracing."""
+    tracer = _current.get()
+    if tracer is not None:
+        tracer.instant(name, cat, args)
+
+
+def annotate(**args: Any) -> None:
+    """Add args (counts, sizes, aggregate timings) to the innermost open span, if tracing."""
+    current = _span_args.get()
+    if current is not None:
+        current.update(args)
+
+
+def traced(name: str | None = None, cat: str = "service"):
+    """Decorator form of span(), named after the function unless `name` is given."""
+
+    def wrap(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def inner(*a, **kw):
+            if _current.get() is None:
+                return fn(*a, **kw)
+            with span(label, cat):
+                return fn(*a, **kw)
+
+        return inner
+
+    return wrap
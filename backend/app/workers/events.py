@@ -0,0 +1,72 @@
+"""In-process job change notifications so long-poll status requests wake up as soon as a job changes.
+
+Every change takes the next value of a process-wide sequence as the job's version. Waiters are
+asyncio Events, set through their loop from whichever thread committed the change (pipeline
+threads, the threadpool, the event loop). Versions are kept for at most `_MAX_TRACKED` jobs, and a
+finished or deleted job's is dropped (its waiters are still woken): an unknown job reads as
+version 0, and any later change gets a version it never had before.
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+
+_MAX_TRACKED = 4096  # most recently changed jobs; older ones read as 0 until they change again
+
+_lock = threading.Lock()
+_sequence = 0
+_versions: OrderedDict[str, int] = OrderedDict()
+_waiters: dict[str, set[tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+
+
+def notify_job_changed(job_id: str, finished: bool = False) -> None:
+    """Give the job a new version and wake its waiters (called after every committed job update).
+
+    `finished` (completed, failed or deleted): no more pipeline updates are expected, so the
+    version isn't kept.
+    """
+    global _sequence
+    with _lock:
+        _sequence += 1
+        waiters = list(_waiters.get(job_id, ()))
+        if finished:
+            _versions.pop(job_id, None)
+        else:
+            _versions[job_id] = _sequence
+            _versions.move_to_end(job_id)
+            while len(_versions) > _MAX_TRACKED:
+                _versions.popitem(last=False)
+    for loop, event in waiters:
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:  # the waiter's loop has closed
+            pass
+
+
+def job_version(job_id: str) -> int:
+    with _lock:
+        return _versions.get(job_id, 0)
+
+
+async def wait_for_job_change(job_id: str, since: int, timeout: float) -> bool:
+    """Wait until the job changes (is notified, or its version isn't `since`) or `timeout` seconds elapse; True if it changed.
+
+    Only sees changes made in this process; callers should still re-read the DB after a timeout
+    (other workers/instances may have updated the row).
+    """
+    waiter = (asyncio.get_running_loop(), asyncio.Event())
+    with _lock:
+        if _versions.get(job_id, 0) != since:
+            return True
+        _waiters.setdefault(job_id, set()).add(waiter)
+    try:
+        await asyncio.wait_for(waiter[1].wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return job_version(job_id) != since
+    finally:
+        with _lock:
+            waiting = _waiters.get(job_id)
+            if waiting is not None:
+                waiting.discard(waiter)
+                if not waiting:
+                    del _waiters[job_id]
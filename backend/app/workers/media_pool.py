@@ -0,0 +1,198 @@
+"""Media stage (audio extraction, screenshot capture) in spawned, resource-limited worker processes."""
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import traceback
+from contextlib import nullcontext
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+
+from app.config import settings
+from app.metrics import MEDIA_WORKERS_BUSY
+from app.tracing import Tracer, activate, current_tracer, span
+
+logger = logging.getLogger("app.media_pool")
+
+_KILL_GRACE_S = 30.0  # past the worker's own alarm, the pipeline gives up on it and kills it
+
+_semaphore: threading.BoundedSemaphore | None = None  # one slot per worker process
+_slots_lock = threading.Lock()
+_running: set[BaseProcess] = set()
+
+
+class MediaTimeout(TimeoutError):
+    pass
+
+
+class _RemoteTraceback(Exception):
+    """The worker's traceback, chained to the exception it raised there."""
+
+    def __str__(self) -> str:
+        return self.args[0]
+
+
+def _on_alarm(signum, frame):
+    raise MediaTimeout(f"media stage exceeded {settings.media_worker_timeout_s}s")
+
+
+def _init_worker(nice: int, memory_mb: int, timeout_s: int) -> None:
+    """Runs in each new worker before its task."""
+    if hasattr(os, "setsid"):
+        os.setsid()  # own process group (and session), so _kill reaches ffmpeg too
+    if nice:
+        os.nice(nice)
+    if memory_mb:
+        try:
+            import resource
+
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as e:  # no RLIMIT_AS on this platform
+            logger.warning("media worker memory limit not applied: %s", e)
+    settings.media_worker_timeout_s = timeout_s  # for the alarm message; the worker re-imported config
+    if timeout_s:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.alarm(timeout_s)
+    # One thread each for OpenCV and the BLAS/OpenMP pools numpy brings (their per-thread buffers
+    # would also eat into the address-space limit); set before the first import in this process
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(var, "1")
+    import cv2
+
+    cv2.setNumThreads(1)
+
+
+def _worker_main(conn: Connection, video_path: str, job_dir: str, trace: bool, nice: int, memory_mb: int, timeout_s: int) -> None:
+    """Worker process entry point: sends back ("ok", stats, None) or ("error", exception, traceback)."""
+    try:
+        _init_worker(nice, memory_mb, timeout_s)
+        result = ("ok", run_media(video_path, job_dir, trace), None)
+    except BaseException as e:  # MediaTimeout, MemoryError, ffmpeg errors: raised again in the pipeline
+        result = ("error", e, traceback.format_exc())
+    finally:
+        if timeout_s:
+            signal.alarm(0)
+    try:
+        conn.send(result)
+    except Exception:  # an exception that doesn't pickle
+        conn.send(("error", RuntimeError(f"{type(result[1]).__name__}: {result[1]}"), result[2]))
+    conn.close()
+
+
+def run_media(video_path: str, job_dir: str, trace: bool = False) -> dict:
+    """The media stage proper (also the in-process path): audio.wav, screenshots/ and their manifest.
+
+    With `trace` (in a worker of a traced job) its spans are recorded and returned under "trace".
+    """
+    from app.services.media import capture_screenshots, extract_audio
+
+    tracer = Tracer("media_worker") if trace else None
+    started = time.process_time()
+    with activate(tracer) if tracer else nullcontext():
+        extract_audio(video_path, str(Path(job_dir) / "audio.wav"))
+        screenshots_dir = Path(job_dir) / "screenshots"
+        screenshots_dir.mkdir(exist_ok=True)
+        capture_screenshots(video_path, str(screenshots_dir))
+    stats = {"pid": os.getpid(), "cpu_s": round(time.process_time() - started, 2), "max_rss_mb": _max_rss_mb()}
+    if tracer:
+        stats["trace"] = tracer.export()
+    return stats
+
+
+def _max_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is KiB on Linux (bytes on macOS); ffmpeg counts as a child
+    kib = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(kib / 1024, 1)
+
+
+def _slots() -> threading.BoundedSemaphore:
+    global _semaphore
+    with _slots_lock:
+        if _semaphore is None:
+            _semaphore = threading.BoundedSemaphore(settings.media_workers)
+        return _semaphore
+
+
+def _kill_groups(pids: list[int]) -> None:
+    """SIGKILL each worker's process group: the worker and its ffmpeg (or what's left of them)."""
+    for pid in pids:
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass  # the whole group has exited
+
+
+def _kill(proc: BaseProcess) -> None:
+    if hasattr(os, "killpg"):
+        _kill_groups([proc.pid])
+    else:  # no process groups: the worker only
+        proc.kill()
+
+
+def shutdown() -> None:
+    """Kill running workers (API shutdown): their jobs fail like any interrupted pipeline run."""
+    for proc in list(_running):
+        _kill(proc)
+
+
+def _spawn(video_path: Path, job_dir: Path, trace: bool) -> tuple[BaseProcess, Connection]:
+    """A worker process for one task, so a crash or a kill never takes another job's media stage with it."""
+    # spawn: a fork of the API process would copy its threads' locks and its memory
+    ctx = multiprocessing.get_context("spawn")
+    receiver, sender = ctx.Pipe(duplex=False)
+    proc = ctx.Process(
+        target=_worker_main,
+        args=(sender, str(video_path), str(job_dir), trace,
+              settings.media_worker_nice, settings.media_worker_memory_mb, settings.media_worker_timeout_s),
+        name="media-worker",
+    )
+    proc.start()
+    sender.close()  # the worker holds the only write end: its exit reads as EOF
+    return proc, receiver
+
+
+def process_media(video_path: Path, job_dir: Path) -> dict:
+    """Run the media stage for a job, in a worker process unless `media_workers` is 0. Blocks until done."""
+    if settings.media_workers <= 0:
+        return run_media(str(video_path), str(job_dir))
+    timeout = settings.media_worker_timeout_s + _KILL_GRACE_S if settings.media_worker_timeout_s else None
+    tracer = current_tracer()
+    with span("media_worker", "process") as args:
+        queued = time.monotonic()
+        with _slots():
+            args["wait_s"] = round(time.monotonic() - queued, 3)
+            proc, receiver = _spawn(video_path, job_dir, tracer is not None)
+            _running.add(proc)
+            MEDIA_WORKERS_BUSY.inc()
+            done = False
+            try:
+                if not receiver.poll(timeout):
+                    raise MediaTimeout(f"media worker did not finish within {timeout:.0f}s; killed")
+                try:
+                    outcome, value, remote_tb = receiver.recv()
+                except EOFError:
+                    raise RuntimeError("media worker died (killed, or out of memory: see media_worker_memory_mb)") from None
+                if outcome == "error":
+                    raise value from _RemoteTraceback(remote_tb)  # e.g. the worker's own alarm (MediaTimeout)
+                stats, done = value, True
+            finally:
+                if not done:
+                    _kill(proc)  # a hung worker, or an ffmpeg a failed one leaves in its group
+                proc.join()  # the process has exited before its slot is handed on
+                receiver.close()
+                _running.discard(proc)
+                MEDIA_WORKERS_BUSY.dec()
+        worker_trace = stats.pop("trace", None)
+        if tracer is not None and worker_trace:
+            tracer.graft(worker_trace)
+        args.update(stats)
+    logger.info("media worker pid=%s cpu=%.1fs max_rss=%sMB video=%s", stats["pid"], stats["cpu_s"], stats["max_rss_mb"], video_path.name)
+    return stats
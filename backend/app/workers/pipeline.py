@@ -1,122 +1,377 @@
-"""Full pipeline: media -> transcription -> vision -> grounding -> spec -> AC."""
+"""Full pipeline: media -> sprites -> transcription -> vision -> grounding -> spec -> AC.
+
+Each stage records a checkpoint on the job (completion time + input fingerprint). A rerun
+skips every stage whose checkpoint still matches its inputs and whose artifacts exist. A stage
+that reruns rewrites its outputs, which changes the fingerprints of the stages that read them,
+so invalidation cascades only as far as the data actually changed.
+"""
+import hashlib
 import json
+import logging
+import time
+from datetime import datetime
 from pathlib import Path
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal
 from app.models import Job
 from app.config import settings
-from app.services.media import extract_audio, capture_screenshots
-from app.services.transcription import transcribe_audio
-from app.services.vision import describe_screenshots
-from app.services.grounding import build_grounded_chunks
-from app.services.spec_extraction import extract_spec
-from app.services.acceptance_criteria import generate_acceptance_criteria
+from app.metrics import FAILURES, JOBS_IN_FLIGHT, SCREENSHOTS_CAPTURED, STAGE_DURATION
+from app.profiling import PROFILE_DIRNAME, job_mode, profiled
+from app.services.artifacts import read_json, read_json_copy
+from app.services import dedup, search, stories
+from app.services.usage import UsageLedger, activate_ledger, job_budget_usd
+from app.tracing import TRACE_FILENAME, Tracer, activate, instant, span
+from app.workers.events import notify_job_changed
+
+# Stage services (and their cv2/openai dependencies) are imported inside each runner so that
+# importing this module from the API - for merge_ac_into_spec / record_checkpoint - stays cheap.
+
+logger = logging.getLogger("app.pipeline")
+
+STAGES = ("media", "sprites", "transcription", "vision", "grounding", "spec", "ac")
+
+
+def _video_path(job_dir: Path) -> Path:
+    for p in job_dir.glob("video.*"):
+        return p
+    return job_dir / "video.mp4"
+
+
+def _stage_io(stage: str, job_dir: Path) -> tuple[list[Path], list[Path]]:
+    """(inputs, outputs) of a stage. Inputs feed the fingerprint; outputs must exist to skip the stage."""
+    screenshots_dir = job_dir / "screenshots"
+    manifest = screenshots_dir / "manifest.json"
+    transcript = job_dir / "transcript.json"
+    vision_cache = job_dir / "cache" / "vision"
+    grounded = job_dir / "grounded_chunks.json"
+    spec = job_dir / "spec.json"
+    if stage == "media":
+        return [_video_path(job_dir)], [job_dir / "audio.wav", manifest]
+    if stage == "sprites":
+        sprites_dir = job_dir / "sprites"
+        return [manifest], [sprites_dir / "sprites.json", sprites_dir / "thumbnails.vtt"]
+    if stage == "transcription":
+        return [job_dir / "audio.wav"], [transcript]
+    if stage == "vision":
+        return [manifest], [vision_cache]
+    if stage == "grounding":
+        vision_files = sorted(vision_cache.glob("*.json")) if vision_cache.exists() else []
+        return [manifest, transcript, *vision_files], [grounded]
+    if stage == "spec":
+        return [grounded, transcript], [spec]
+    if stage == "ac":
+        return [spec, transcript], [job_dir / "acceptance_criteria.json"]
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def _fingerprint(stage: str, job_dir: Path) -> str:
+    """Cheap stat-based fingerprint (name, size, mtime) of a stage's inputs."""
+    inputs, _ = _stage_io(stage, job_dir)
+    h = hashlib.sha256(stage.encode())
+    for p in inputs:
+        try:
+            st = p.stat()
+            h.update(f"{p.relative_to(job_dir)}:{st.st_size}:{st.st_mtime_ns};".encode())
+        except FileNotFoundError:
+            h.update(f"{p.relative_to(job_dir)}:missing;".encode())
+    return h.hexdigest()
+
+
+def _is_valid(stage: str, job_dir: Path, checkpoints: dict) -> bool:
+    cp = checkpoints.get(stage)
+    if not cp or not cp.get("completed_at"):
+        return False
+    _, outputs = _stage_io(stage, job_dir)
+    # Outputs the storage lifecycle deleted after completion (e.g. audio.wav) don't invalidate the stage
+    pruned = set(cp.get("pruned", ()))
+    if not all(p.exists() or str(p.relative_to(job_dir)) in pruned for p in outputs):
+        return False
+    return cp.get("fingerprint") == _fingerprint(stage, job_dir)
+
+
+def _pruned_producer(stage: str, job_dir: Path, checkpoints: dict) -> str | None:
+    """Earlier stage that produced (and the lifecycle then pruned) an input `stage` needs to rerun."""
+    inputs, _ = _stage_io(stage, job_dir)
+    missing = {str(p.relative_to(job_dir)) for p in inputs if not p.exists()}
+    for earlier in STAGES[: STAGES.index(stage)]:
+        if missing & set((checkpoints.get(earlier) or {}).get("pruned", ())):
+            return earlier
+    return None
+
+
+def record_checkpoint(job: Job, stage: str, job_dir: Path) -> None:
+    checkpoints = dict(job.stage_checkpoints or {})
+    checkpoints[stage] = {
+        "completed_at": datetime.utcnow().isoformat(),
+        "fingerprint": _fingerprint(stage, job_dir),
+    }
+    job.stage_checkpoints = checkpoints
+
+
+def valid_stages(job: Job, job_dir: Path) -> list[str]:
+    """Stages whose checkpoint still matches their inputs and outputs."""
+    return [s for s in STAGES if _is_valid(s, job_dir, job.stage_checkpoints or {})]
+
+
+def refresh_checkpoints(job: Job, job_dir: Path, stages: list[str], pruned: dict[str, list[str]]) -> None:
+    """Re-fingerprint still-valid stages after their files were compacted or pruned (not rerun)."""
+    checkpoints = dict(job.stage_checkpoints or {})
+    for stage in stages:
+        cp = {**checkpoints[stage], "fingerprint": _fingerprint(stage, job_dir)}
+        if pruned.get(stage):
+            cp["pruned"] = sorted(set(cp.get("pruned", ())) | set(pruned[stage]))
+        checkpoints[stage] = cp
+    job.stage_checkpoints = checkpoints
+
+
+def merge_ac_into_spec(spec_data: dict, ac_data: dict) -> dict:
+    """Merge ACs into spec.user_stories (each story gets its acceptance_criteria).
+
+    Preserve spec fields (persona, story_text, tags) and only merge acceptance_criteria.
+    """
+    ac_stories = ac_data.get("user_stories", [])
+    if not ac_stories:
+        return spec_data
+    spec_user_stories = spec_data.get("user_stories", [])
+    # Match by id or index and merge acceptance_criteria only
+    for i, spec_us in enumerate(spec_user_stories):
+        spec_us_id = spec_us.get("id", f"us-{i+1}")
+        # Find matching AC story
+        matched = False
+        for ac_us in ac_stories:
+            if ac_us.get("id") == spec_us_id or (i < len(ac_stories) and ac_stories[i].get("id") == ac_us.get("id")):
+                spec_us["acceptance_criteria"] = ac_us.get("acceptance_criteria", [])
+                matched = True
+                break
+        if not matched:
+            # No match found, try by index
+            if i < len(ac_stories):
+                spec_us["acceptance_criteria"] = ac_stories[i].get("acceptance_criteria", [])
+            else:
+                spec_us["acceptance_criteria"] = []
+    spec_data["user_stories"] = spec_user_stories
+    return spec_data
+
+
+def _run_media(job: Job, job_dir: Path) -> None:
+    from app.workers.media_pool import process_media
+
+    # In a worker process; its outputs come back through the job dir
+    process_media(_video_path(job_dir), job_dir)
+    manifest_path = job_dir / "screenshots" / "manifest.json"
+    if manifest_path.exists():
+        job.screenshots_captured = len(read_json(manifest_path))
+        SCREENSHOTS_CAPTURED.inc(job.screenshots_captured)
+
+
+def _run_sprites(job: Job, job_dir: Path) -> None:
+    from app.services.media import video_duration_ms
+    from app.services.sprites import build_sprites
+
+    duration_ms = video_duration_ms(str(_video_path(job_dir)))
+    build_sprites(job_dir / "screenshots", job_dir / "sprites", duration_ms)
+
+
+def _run_transcription(job: Job, job_dir: Path) -> None:
+    from app.services.transcription import transcribe_audio
+
+    transcript_path = job_dir / "transcript.json"
+    transcribe_audio(str(job_dir / "audio.wav"), str(transcript_path))
+    if transcript_path.exists():
+        transcript_data = read_json(transcript_path)
+        job.transcript_segments = len(transcript_data.get("segments", []))
+
+
+def _run_vision(job: Job, job_dir: Path) -> bool:
+    from app.services.vision import describe_screenshots
+
+    over_budget = describe_screenshots(job_dir)
+    cache_vision = job_dir / "cache" / "vision"
+    if cache_vision.exists():
+        job.screenshots_analyzed = len(list(cache_vision.glob("*.json")))
+    return not over_budget  # screenshots left undescribed: a retry (e.g. with a higher budget) describes them
+
+
+def _run_grounding(job: Job, job_dir: Path) -> None:
+    from app.services.grounding import build_grounded_chunks
+
+    build_grounded_chunks(job_dir, str(job_dir / "grounded_chunks.json"))
+
+
+def _run_spec(job: Job, job_dir: Path) -> None:
+    from app.services.spec_extraction import extract_spec
+
+    # Pass full transcript so extraction is exhaustive
+    spec_path = job_dir / "spec.json"
+    job.spec = extract_spec(
+        str(job_dir / "grounded_chunks.json"),
+        str(spec_path),
+        transcript_path=job_dir / "transcript.json",
+    )
+
+
+def _run_ac(job: Job, job_dir: Path) -> None:
+    from app.services.acceptance_criteria import generate_acceptance_criteria
+
+    # Acceptance criteria are generated nested under user stories
+    spec_path = job_dir / "spec.json"
+    ac_path = job_dir / "acceptance_criteria.json"
+    ac_data = generate_acceptance_criteria(str(spec_path), str(ac_path), job_dir)
+    if ac_data.get("user_stories"):
+        spec_data = merge_ac_into_spec(read_json_copy(spec_path), ac_data)
+        # Update spec.json with merged data
+        spec_path.write_text(json.dumps(spec_data, indent=2))
+        job.spec = spec_data
+    job.acceptance_criteria = ac_data
+    manifest_path = job_dir / "screenshots" / "manifest.json"
+    evidence_map = {}
+    if manifest_path.exists():
+        manifest = read_json(manifest_path)
+        for entry in manifest:
+            sid = str(entry.get("timestamp_ms", entry.get("path", "")))
+            evidence_map[sid] = entry.get("path", f"{sid}.png")
+        if job.screenshots_captured is None:
+            job.screenshots_captured = len(manifest)
+    job.evidence_map = evidence_map
+
+
+# A runner returning False finished without all of its work: the run goes on, but the stage gets no checkpoint
+_STAGE_RUNNERS = {
+    "media": _run_media,
+    "sprites": _run_sprites,
+    "transcription": _run_transcription,
+    "vision": _run_vision,
+    "grounding": _run_grounding,
+    "spec": _run_spec,
+    "ac": _run_ac,
+}
+
+
+def _next_stage(job: Job, job_dir: Path, after: str | None) -> str | None:
+    """First stage after `after` that must run, logging the ones skipped on a valid checkpoint.
+
+    Checked only once the previous stage has finished: an upstream rerun invalidates downstream
+    stages via their fingerprints.
+    """
+    start = STAGES.index(after) + 1 if after else 0
+    for stage in STAGES[start:]:
+        if not _is_valid(stage, job_dir, job.stage_checkpoints or {}):
+            # If it needs a file the lifecycle pruned, regenerate that first (its rerun cascades back here)
+            return _pruned_producer(stage, job_dir, job.stage_checkpoints or {}) or stage
+        logger.info("process_job skip job_id=%s stage=%s (checkpoint valid)", job.id, stage)
+        instant(f"skip {stage}", "stage", reason="checkpoint valid")
+    return None
 
 
 def process_job(job_id: str) -> None:
+    """Run (or resume) a pending job's pipeline; the run's trace is written to {job_dir}/trace.json."""
+    tracer = Tracer(f"job {job_id}", job_id=job_id)
+    with activate(tracer):
+        with span("process_job", "job", job_id=job_id):
+            job_dir = _process_job(job_id)
+    if job_dir is not None:
+        try:
+            tracer.write(job_dir / TRACE_FILENAME)
+        except OSError:
+            logger.warning("process_job could not write trace job_id=%s", job_id, exc_info=True)
+
+
+def _process_job(job_id: str) -> Path | None:
+    """The pipeline run itself; returns the job dir if the job was claimed and has one."""
     db: Session = SessionLocal()
+    job = None
+    job_dir = None
+    claimed = 0
+    running = None  # stage the failure is attributed to; the session can't say after a failed flush
+    ledger = None
     try:
+        # Claim the job atomically so two runners (e.g. a double retry) never process it at once
+        claimed = (
+            db.query(Job)
+            .filter(Job.id == job_id, Job.status == "pending")
+            .update({"status": "processing", "error_message": None, "compacted_at": None}, synchronize_session=False)
+        )
+        _commit(db, job_id)
+        if not claimed:
+            return None
+        JOBS_IN_FLIGHT.inc()
         job = db.query(Job).filter(Job.id == job_id).first()
-        if not job or job.status not in ("pending",):
-            return
         job_dir = Path(settings.storage_root) / "jobs" / job_id
         if not job_dir.exists():
             _fail(db, job, "Job directory not found")
-            return
-        job.status = "processing"
-        db.commit()
-
-        # 1. Media
-        video_path = job_dir / "video.mp4"
-        for p in job_dir.glob("video.*"):
-            video_path = p
-            break
-        audio_path = job_dir / "audio.wav"
-        extract_audio(str(video_path), str(audio_path))
-        screenshots_dir = job_dir / "screenshots"
-        screenshots_dir.mkdir(exist_ok=True)
-        capture_screenshots(str(video_path), str(screenshots_dir))
-        manifest_path = screenshots_dir / "manifest.json"
-        if manifest_path.exists():
-            manifest = json.loads(manifest_path.read_text())
-            job.screenshots_captured = len(manifest)
-        db.commit()
-
-        # 2. Transcription
-        transcript_path = job_dir / "transcript.json"
-        transcribe_audio(str(audio_path), str(transcript_path))
-        if transcript_path.exists():
-            transcript_data = json.loads(transcript_path.read_text())
-            job.transcript_segments = len(transcript_data.get("segments", []))
-        db.commit()
-
-        # 3. Vision (per screenshot)
-        describe_screenshots(job_dir)
-        cache_vision = job_dir / "cache" / "vision"
-        if cache_vision.exists():
-            job.screenshots_analyzed = len(list(cache_vision.glob("*.json")))
-        db.commit()
-
-        # 4. Grounding
-        grounded_path = job_dir / "grounded_chunks.json"
-        build_grounded_chunks(job_dir, str(grounded_path))
+            return None
 
-        # 5. Spec extraction (pass full transcript so extraction is exhaustive)
-        spec_path = job_dir / "spec.json"
-        spec_data = extract_spec(str(grounded_path), str(spec_path), transcript_path=transcript_path)
-        job.spec = spec_data
-        db.commit()
-
-        # 6. Acceptance criteria (generated nested under user stories)
-        ac_path = job_dir / "acceptance_criteria.json"
-        ac_data = generate_acceptance_criteria(str(spec_path), str(ac_path), job_dir)
-        # Merge ACs into spec.user_stories (each story gets its acceptance_criteria)
-        # Preserve spec fields (persona, story_text, tags) and only merge acceptance_criteria
-        ac_stories = ac_data.get("user_stories", [])
-        if ac_stories:
-            spec_user_stories = spec_data.get("user_stories", [])
-            # Match by id or index and merge acceptance_criteria only
-            for i, spec_us in enumerate(spec_user_stories):
-                spec_us_id = spec_us.get("id", f"us-{i+1}")
-                # Find matching AC story
-                matched = False
-                for ac_us in ac_stories:
-                    if ac_us.get("id") == spec_us_id or (i < len(ac_stories) and ac_stories[i].get("id") == ac_us.get("id")):
-                        spec_us["acceptance_criteria"] = ac_us.get("acceptance_criteria", [])
-                        matched = True
-                        break
-                if not matched:
-                    # No match found, try by index
-                    if i < len(ac_stories):
-                        spec_us["acceptance_criteria"] = ac_stories[i].get("acceptance_criteria", [])
-                    else:
-                        spec_us["acceptance_criteria"] = []
-            spec_data["user_stories"] = spec_user_stories
-            # Update spec.json with merged data
-            Path(spec_path).write_text(json.dumps(spec_data, indent=2))
-            job.spec = spec_data
-        job.acceptance_criteria = ac_data
-        manifest_path = job_dir / "screenshots" / "manifest.json"
-        evidence_map = {}
-        if manifest_path.exists():
-            manifest = json.loads(manifest_path.read_text())
-            for entry in manifest:
-                sid = str(entry.get("timestamp_ms", entry.get("path", "")))
-                evidence_map[sid] = entry.get("path", f"{sid}.png")
-        job.evidence_map = evidence_map
-        job.status = "completed"
-        if job.screenshots_captured is None and manifest_path.exists():
-            job.screenshots_captured = len(json.loads(manifest_path.read_text()))
-        db.commit()
+        # Story/AC edits only wrote their rows: bring spec.json up to date before checkpoints are
+        # compared (an edited spec reruns the AC stage)
+        stories.materialize(db, job, job_dir)
+        base_spec_version = job.spec_version or 0  # edits after this win over the spec this run produces
+        # Model calls are costed into the job's ledger; a rerun adds to what earlier runs spent
+        ledger = UsageLedger(job.usage, budget_usd=job_budget_usd(job))
+        stage = _next_stage(job, job_dir, after=None)
+        # Opt-in profile of the run (job.profile or profile_jobs), saved to {job_dir}/profiles/
+        with activate_ledger(ledger), profiled(job_mode(job), job_dir / PROFILE_DIRNAME, "process_job"):
+            while stage is not None:
+                # Drop the old checkpoint first so a half-finished rerun is never mistaken for valid.
+                # One write per stage: this commit also carries the previous stage's checkpoint and results.
+                job.stage_checkpoints = {k: v for k, v in (job.stage_checkpoints or {}).items() if k != stage}
+                job.current_stage = running = stage
+                _commit(db, job_id)
+                ledger.stage = stage
+                stage_start = time.monotonic()
+                try:
+                    with span(stage, "stage"):
+                        complete = _STAGE_RUNNERS[stage](job, job_dir) is not False
+                except Exception:
+                    STAGE_DURATION.labels(stage=stage, outcome="error").observe(time.monotonic() - stage_start)
+                    raise
+                finally:
+                    job.usage = ledger.to_dict()  # also saved when the stage fails: its calls were billed
+                STAGE_DURATION.labels(stage=stage, outcome="ok").observe(time.monotonic() - stage_start)
+                if complete:
+                    record_checkpoint(job, stage, job_dir)
+                else:
+                    logger.info("process_job job_id=%s stage=%s incomplete; no checkpoint", job_id, stage)
+                stage = _next_stage(job, job_dir, after=stage)
+            job.current_stage = running = "index"  # until the indexes commit, so a failure there is attributed to it
+            _commit(db, job_id)  # the last stage's results, kept if the spec sync below is rolled back
+            with span("index_job", "db"):  # story rows, search + near-duplicate indexes, committed with the status
+                try:
+                    stories.sync_job(db, job, base_spec_version)
+                except stories.SpecConflict:
+                    # Edited during the run: keep the edit (the rows), and put the blob and spec.json back to it
+                    db.rollback()
+                    logger.warning("process_job job_id=%s spec edited during the run; keeping the edit", job_id)
+                    stories.materialize(db, job, job_dir, force=True)
+                search.index_job(db, job_id, job_dir, job.spec)
+                dedup.index_job(db, job_id, job.spec)
+            job.current_stage = None
+            job.status = "completed"
+            _commit(db, job_id, finished=True)
     except Exception as e:
-        _fail(db, job, str(e))
+        logger.exception("process_job failed job_id=%s stage=%s", job_id, running)
+        FAILURES.labels(stage=running or "setup").inc()
+        _fail(db, job, str(e), stage=running, usage=ledger.to_dict() if ledger else None)
     finally:
+        if claimed:
+            JOBS_IN_FLIGHT.dec()
         db.close()
+    return job_dir
 
 
-def _fail(db: Session, job: Job | None, message: str) -> None:
+def _commit(db: Session, job_id: str, finished: bool = False) -> None:
+    with span("db.commit", "db"):
+        db.commit()
+    notify_job_changed(job_id, finished)
+
+
+def _fail(db: Session, job: Job | None, message: str, stage: str | None = None, usage: dict | None = None) -> None:
     if job:
+        db.rollback()  # a failed flush leaves the session unusable until rolled back
+        if stage is not None:
+            job.current_stage = stage
+        if usage is not None:
+            job.usage = usage  # the failed run's model calls were billed
         job.status = "failed"
         job.error_message = message
-        db.commit()
+        _commit(db, job.id, finished=True)
@@ -0,0 +1,49 @@
+"""Diff two benchmark result files and flag stages that got slower.
+
+    python -m benchmarks.compare baseline.json current.json --threshold 0.15
+
+Exits 1 when any stage's median wall time regressed by more than the threshold.
+"""
+import argparse
+import json
+from pathlib import Path
+
+METRICS = ("wall_s", "cpu_s", "py_heap_peak_mb", "rss_delta_mb", "throughput_per_s")
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> tuple[list[str], list[str]]:
+    lines, regressions = [], []
+    lines.append(f"{'stage':32} {'metric':18} {'baseline':>12} {'current':>12} {'change':>8}")
+    for stage, cur in current.get("stages", {}).items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base:
+            lines.append(f"{stage:32} (new stage)")
+            continue
+        for metric in METRICS:
+            b, c = base.get(metric), cur.get(metric)
+            if b is None or c is None:
+                continue
+            change = (c - b) / b if b else 0.0
+            lines.append(f"{stage:32} {metric:18} {b:12.4f} {c:12.4f} {change:+8.1%}")
+            if metric == "wall_s" and change > threshold:
+                regressions.append(f"{stage}: wall_s {b:.4f}s -> {c:.4f}s ({change:+.1%})")
+    return lines, regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative wall-time increase")
+    args = parser.parse_args()
+    baseline = json.loads(Path(args.baseline).read_text())
+    current = json.loads(Path(args.current).read_text())
+    lines, regressions = compare(baseline, current, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print("\nREGRESSIONS:\n  " + "\n  ".join(regressions))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Local fake OpenAI-compatible server for benchmarks and load tests (no real API spend).
+
+Serves /v1/chat/completions (vision, spec and AC shaped replies) and /v1/audio/transcriptions
+(verbose_json segments sized from the upload) with configurable latency and 429 rate.
+
+    python -m benchmarks.fake_openai --port 8900 --latency-ms 800
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.synthetic import WORDS
+
+
+def _words(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def _evidence(rng: random.Random) -> list[dict]:
+    ts = rng.randrange(0, 60000, 1000)
+    return [{"timestamp": ts, "transcript_excerpt": _words(rng, 8), "screenshot_id": str(ts)}]
+
+
+def _vision_reply(rng: random.Random) -> dict:
+    return {
+        "page": _words(rng, 2),
+        "elements": [_words(rng, 2) for _ in range(rng.randint(3, 10))],
+        "errors_or_banners": [],
+        "empty_states": "",
+        "navigation_context": "Home > " + rng.choice(WORDS),
+    }
+
+
+def _spec_reply(rng: random.Random, n_stories: int) -> dict:
+    return {
+        "feature_summary": _words(rng, 25),
+        "actors": [{"name": "Manager", "role": _words(rng, 4), "evidence_refs": _evidence(rng)}],
+        "user_stories": [
+            {
+                "id": f"us-{i + 1}",
+                "title": _words(rng, 4),
+                "persona": "Manager",
+                "story_text": f"As a Manager / I need {_words(rng, 6)} / So that {_words(rng, 6)}",
+                "tags": [rng.choice(WORDS)],
+                "evidence_refs": _evidence(rng),
+            }
+            for i in range(n_stories)
+        ],
+        "workflows": [{"name": _words(rng, 3), "steps": [_words(rng, 5) for _ in range(4)], "evidence_refs": _evidence(rng)}],
+        "business_rules": [{"description": _words(rng, 10), "evidence_refs": _evidence(rng)}],
+        "permissions": [],
+        "open_questions": [_words(rng, 8) + "?"],
+    }
+
+
+def _ac_reply(rng: random.Random, n_stories: int) -> dict:
+    return {
+        "user_stories": [
+            {
+                "id": f"us-{i + 1}",
+                "title": _words(rng, 4),
+                "persona": "Manager",
+                "story_text": _words(rng, 12),
+                "acceptance_criteria": [
+                    {
+                        "id": f"AC{j + 1}",
+                        "given": _words(rng, 8),
+                        "when": _words(rng, 6),
+                        "then": _words(rng, 8),
+                        "and": [_words(rng, 5)],
+                        "evidence_refs": _evidence(rng),
+                    }
+                    for j in range(rng.randint(2, 5))
+                ],
+            }
+            for i in range(n_stories)
+        ]
+    }
+
+
+class FakeOpenAIServer:
+    """Threaded HTTP server; use as a context manager or call start()/stop()."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, stories: int = 5, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.stories = stories
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors_injected": 0, "bytes_in": 0}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("content-length") or 0))
+                status, payload = server._handle(self.path, self.headers.get("content-type", ""), body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                if status == 429:
+                    self.send_header("retry-after", "1")
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handle(self, path: str, content_type: str, body: bytes) -> tuple[int, dict]:
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["bytes_in"] += len(body)
+            inject_error = self._rng.random() < self.error_rate
+            delay = max(self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms), 0) / 1000.0
+            rng = random.Random(self._rng.random())
+            if inject_error:
+                self.stats["errors_injected"] += 1
+        time.sleep(delay)
+        if inject_error:
+            return 429, {"error": {"message": "Rate limit reached (injected)", "type": "requests", "code": "rate_limit_exceeded"}}
+        if path.endswith("/audio/transcriptions"):
+            return 200, self._transcription(body, rng)
+        if path.endswith("/chat/completions"):
+            return 200, self._chat(json.loads(body or b"{}"), rng)
+        return 404, {"error": {"message": f"Unknown path {path}"}}
+
+    def _transcription(self, body: bytes, rng: random.Random) -> dict:
+        duration = max(len(body) / 32000.0, 1.0)  # 16 kHz mono s16le
+        segments = []
+        t = 0.0
+        while t < duration:
+            end = min(t + 4.0, duration)
+            segments.append({"id": len(segments), "seek": 0, "start": t, "end": end, "text": " " + _words(rng, 12),
+                             "tokens": [], "temperature": 0.0, "avg_logprob": -0.2, "compression_ratio": 1.2,
+                             "no_speech_prob": 0.01})
+            t = end
+        return {"task": "transcribe", "language": "english", "duration": duration,
+                "text": " ".join(s["text"] for s in segments), "segments": segments}
+
+    def _chat(self, req: dict, rng: random.Random) -> dict:
+        messages = req.get("messages", [])
+        has_image = any(
+            isinstance(m.get("content"), list) and any(p.get("type") == "image_url" for p in m["content"])
+            for m in messages
+        )
+        system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system" and isinstance(m.get("content"), str))
+        if has_image:
+            reply = _vision_reply(rng)
+        elif "acceptance_criteria" in system:
+            reply = _ac_reply(rng, self.stories)
+        else:
+            reply = _spec_reply(rng, self.stories)
+        content = json.dumps(reply)
+        prompt_tokens = len(json.dumps(messages)) // 4
+        completion_tokens = len(content) // 4
+        return {
+            "id": f"chatcmpl-fake-{rng.randrange(1 << 30)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": req.get("model", "gpt-4o"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--stories", type=int, default=5)
+    args = parser.parse_args()
+    server = FakeOpenAIServer(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.stories)
+    print(f"fake OpenAI listening on {server.base_url}", flush=True)
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+"""HTTP load test: N simulated users upload, poll, fetch screenshots and export against a real server.
+
+Starts `app.main:app` under uvicorn in a subprocess (scratch storage and SQLite DB, every model
+call going to the local fake OpenAI server) and drives it over HTTP. Each user, after a random
+ramp-up delay, runs `--iterations` sessions of:
+
+    POST /api/jobs                                  upload the recording
+    GET  /api/jobs/{id}  (or /status?wait=, --poll status)   until completed/failed
+    GET  /api/jobs/{id}/screenshots/{sid}?w=320     thumbnails of evidence screenshots
+    GET  /api/jobs/{id}/screenshots/{sid}           full size
+    GET  /api/jobs/{id}/export?format=md|json
+
+and the report gives per-route p50/p95/p99 latency, request and error counts, job outcomes, and
+the server process's RSS (sampled from /proc; start, peak, end). The result is compared to a
+baseline run, benchmarks/baselines/loadtest.json unless `--baseline` names another (or
+`--no-baseline`), and the exit code is 1 on regression (p95 latency, error rate, peak RSS, job
+failures):
+
+    cd backend
+    python -m benchmarks.loadtest                   # against the committed baseline
+    python -m benchmarks.loadtest --users 8 --iterations 2 --no-baseline --out load.json
+    python -m benchmarks.loadtest --users 8 --iterations 2 --baseline load.json
+
+Baselines are machine-specific: record one on the machine (or CI runner) that compares against it,
+with the same parameters (the baseline's are in its meta.params; differences are reported). The
+committed one was recorded with the defaults; re-record it with
+`--no-baseline --out benchmarks/baselines/loadtest.json` when the machine or the defaults change.
+Jobs need `ffmpeg` on PATH to get past audio extraction; without it they fail and are reported so.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.synthetic import RecordingSpec, mux_audio, write_narration_wav, write_recording
+
+SCHEMA_VERSION = 1
+DONE_STATUSES = ("completed", "failed")
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _rss_mb(pid: int) -> float | None:
+    """Resident set size of a process (Linux /proc); None when unavailable."""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class RssSampler(threading.Thread):
+    """Samples a process's RSS every `interval_s` until stopped."""
+
+    def __init__(self, pid: int, interval_s: float = 0.25):
+        super().__init__(daemon=True)
+        self.pid, self.interval_s = pid, interval_s
+        self.samples: list[float] = []
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            rss = _rss_mb(self.pid)
+            if rss is not None:
+                self.samples.append(rss)
+            self._stop_event.wait(self.interval_s)
+
+    def stop(self) -> dict:
+        self._stop_event.set()
+        self.join()
+        if not self.samples:
+            return {"start_mb": None, "peak_mb": None, "end_mb": None, "samples": 0}
+        return {
+            "start_mb": round(self.samples[0], 1),
+            "peak_mb": round(max(self.samples), 1),
+            "end_mb": round(self.samples[-1], 1),
+            "samples": len(self.samples),
+        }
+
+
+def serve(workdir: Path, openai_base_url: str, port: int) -> None:
+    """Server subprocess entry point: point the app at scratch storage and the fake server, run uvicorn."""
+    import app.config  # loads .env (override=True); re-assert our values afterwards
+
+    os.environ["STORAGE_ROOT"] = str(workdir / "storage")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'load.db'}"
+    s = app.config.settings
+    s.storage_root = workdir / "storage"
+    s.openai_api_key = "sk-load-0000000000000000"
+    s.openai_base_url = openai_base_url
+    s.lifecycle_sweep_interval_s = 0
+    import uvicorn
+
+    from app.main import app as asgi_app
+
+    uvicorn.run(asgi_app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def _start_server(
+    workdir: Path, openai_base_url: str, port: int, log_path: Path, timeout_s: float = 60.0, env: dict | None = None
+) -> subprocess.Popen:
+    """Server subprocess; `env` adds settings (e.g. MEDIA_WORKERS) to its environment."""
+    cmd = [sys.executable, "-m", "benchmarks.loadtest", "--serve", str(workdir), openai_base_url, str(port)]
+    log = log_path.open("wb")
+    proc = subprocess.Popen(
+        cmd, cwd=Path(__file__).resolve().parent.parent, stdout=log, stderr=subprocess.STDOUT, env={**os.environ, **(env or {})}
+    )
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}; see {log_path}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1.0).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"server did not become healthy within {timeout_s}s; see {log_path}")
+
+
+def _make_video(workdir: Path, args) -> tuple[Path, dict]:
+    """Synthetic recording, with narration muxed in when ffmpeg is available."""
+    spec = RecordingSpec(args.duration, args.width, args.height, args.fps, args.change_rate, args.seed)
+    video = workdir / "recording.mp4"
+    stats = write_recording(video, spec)
+    stats["narration"] = False
+    if shutil.which("ffmpeg"):
+        narration = workdir / "narration.wav"
+        write_narration_wav(narration, args.duration, seed=args.seed)
+        muxed = workdir / "recording_av.mp4"
+        if mux_audio(video, narration, muxed):
+            video, stats["narration"] = muxed, True
+    return video, {**vars(spec), **stats, "bytes": video.stat().st_size}
+
+
+def _evidence_screenshots(job: dict) -> list[str]:
+    """Screenshot ids the job's evidence refs point at (as the UI shows them), then the rest of the captures."""
+    captured = list(job.get("evidence_map") or {})
+    ids = []
+    for story in (job.get("spec") or {}).get("user_stories") or []:
+        for item in [story, *(story.get("acceptance_criteria") or [])]:
+            for ref in item.get("evidence_refs") or []:
+                sid = str(ref.get("screenshot_id") or "")
+                if sid in captured and sid not in ids:
+                    ids.append(sid)
+    return ids + [sid for sid in captured if sid not in ids]
+
+
+class LoadTest:
+    def __init__(self, base_url: str, video: Path, args):
+        self.base_url = base_url
+        self.video_bytes = video.read_bytes()
+        self.args = args
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.error_samples: list[str] = []
+        self.jobs: list[dict] = []
+
+    async def _request(self, client: httpx.AsyncClient, route: str, method: str, url: str, ok=(200, 304), **kwargs):
+        start = time.perf_counter()
+        try:
+            resp = await client.request(method, url, **kwargs)
+            await resp.aread()
+        except httpx.HTTPError as e:
+            resp, detail = None, f"{route} {type(e).__name__}: {e}"
+        else:
+            detail = f"{route} {resp.status_code} {resp.text[:200]}" if resp.status_code not in ok else None
+        self.latencies[route].append(time.perf_counter() - start)
+        if detail:
+            self.errors[route] += 1
+            if len(self.error_samples) < 10:
+                self.error_samples.append(detail)
+            return None
+        return resp
+
+    async def _poll(self, client: httpx.AsyncClient, job_id: str) -> str | None:
+        deadline = time.monotonic() + self.args.job_timeout_s
+        etag = None
+        while time.monotonic() < deadline:
+            if self.args.poll == "status":
+                headers = {"If-None-Match": etag} if etag else {}
+                resp = await self._request(
+                    client, "GET /api/jobs/{id}/status", "GET", f"/api/jobs/{job_id}/status",
+                    params={"wait": self.args.poll_wait_s}, headers=headers,
+                )
+                if resp is not None and resp.status_code == 200:
+                    etag = resp.headers.get("etag")
+                    if resp.json().get("status") in DONE_STATUSES:
+                        return resp.json()["status"]
+                    continue
+            else:
+                resp = await self._request(client, "GET /api/jobs/{id}", "GET", f"/api/jobs/{job_id}")
+                if resp is not None and resp.json().get("status") in DONE_STATUSES:
+                    return resp.json()["status"]
+            await asyncio.sleep(self.args.poll_interval_s)
+        return None
+
+    async def _session(self, client: httpx.AsyncClient, rng: random.Random) -> None:
+        started = time.perf_counter()
+        resp = await self._request(
+            client, "POST /api/jobs", "POST", "/api/jobs", ok=(200,),
+            files={"video": ("recording.mp4", self.video_bytes, "video/mp4")},
+        )
+        if resp is None:
+            self.jobs.append({"id": None, "status": "upload_failed"})
+            return
+        job_id = resp.json()["id"]
+        status = await self._poll(client, job_id)
+        record = {"id": job_id, "status": status or "timeout", "seconds": round(time.perf_counter() - started, 2)}
+        self.jobs.append(record)
+        if status != "completed":
+            resp = await self._request(client, "GET /api/jobs/{id}", "GET", f"/api/jobs/{job_id}")
+            if resp is not None:
+                record["error"] = resp.json().get("error_message")
+            return
+        resp = await self._request(client, "GET /api/jobs/{id}", "GET", f"/api/jobs/{job_id}")
+        shots = _evidence_screenshots(resp.json()) if resp is not None else []
+        for sid in shots[: self.args.screenshots]:
+            await self._request(client, "GET /api/jobs/{id}/screenshots/{sid}?w=", "GET",
+                                f"/api/jobs/{job_id}/screenshots/{sid}", params={"w": 320})
+        if shots:
+            await self._request(client, "GET /api/jobs/{id}/screenshots/{sid}", "GET",
+                                f"/api/jobs/{job_id}/screenshots/{rng.choice(shots)}")
+        for fmt in self.args.export_formats:
+            await self._request(client, "GET /api/jobs/{id}/export", "GET", f"/api/jobs/{job_id}/export",
+                                params={"format": fmt}, headers={"Accept-Encoding": "gzip"})
+
+    async def _user(self, client: httpx.AsyncClient, n: int) -> None:
+        rng = random.Random(self.args.seed + n)
+        await asyncio.sleep(rng.uniform(0, self.args.ramp_s))
+        for _ in range(self.args.iterations):
+            await self._session(client, rng)
+
+    async def run(self) -> float:
+        timeout = httpx.Timeout(self.args.request_timeout_s)
+        limits = httpx.Limits(max_connections=self.args.users * 2, max_keepalive_connections=self.args.users * 2)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=timeout, limits=limits) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(self._user(client, n) for n in range(self.args.users)))
+            return time.perf_counter() - start
+
+    def report(self) -> dict:
+        routes = {}
+        for route in sorted(set(self.latencies) | set(self.errors)):
+            vs = self.latencies[route]
+            routes[route] = {
+                "count": len(vs),
+                "errors": self.errors[route],
+                "error_rate": round(self.errors[route] / len(vs), 4) if vs else None,
+                **{f"p{int(q * 100)}_ms": round(1000 * _percentile(vs, q), 2) if vs else None for q in (0.5, 0.95, 0.99)},
+                "max_ms": round(1000 * max(vs), 2) if vs else None,
+            }
+        outcomes = defaultdict(int)
+        for job in self.jobs:
+            outcomes[job["status"]] += 1
+        done = [j["seconds"] for j in self.jobs if j["status"] == "completed"]
+        return {
+            "routes": routes,
+            "jobs": {
+                "count": len(self.jobs),
+                "outcomes": dict(outcomes),
+                "p50_s": _percentile(done, 0.5),
+                "max_s": max(done) if done else None,
+                "failures": [j for j in self.jobs if j["status"] != "completed"][:10],
+            },
+            "error_samples": self.error_samples,
+        }
+
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "loadtest.json"
+
+
+def param_differences(baseline: dict, params: dict) -> list[str]:
+    """Parameters that differ from the baseline's: its numbers are only comparable with the same ones."""
+    base = baseline.get("meta", {}).get("params", {})
+    return [f"{k}={base.get(k)!r} in the baseline, {v!r} now" for k, v in params.items() if k in base and base[k] != v]
+
+
+def compare(baseline: dict, current: dict, latency_threshold: float, min_latency_ms: float,
+            error_rate_slack: float, rss_threshold: float) -> list[str]:
+    """Regressions of `current` against `baseline` (empty when none)."""
+    regressions = []
+    for route, cur in current["routes"].items():
+        base = baseline.get("routes", {}).get(route)
+        if not base or not cur["count"]:
+            continue
+        b, c = base.get("p95_ms"), cur.get("p95_ms")
+        # Relative threshold, but ignore changes of a few ms on fast routes (scheduler noise)
+        if b is not None and c is not None and c > b * (1 + latency_threshold) and c - b > min_latency_ms:
+            regressions.append(f"{route}: p95 {b:.1f}ms -> {c:.1f}ms ({(c - b) / b:+.0%})")
+        b, c = base.get("error_rate") or 0.0, cur.get("error_rate") or 0.0
+        if c > b + error_rate_slack:
+            regressions.append(f"{route}: error rate {b:.2%} -> {c:.2%}")
+    b, c = baseline.get("memory", {}).get("peak_mb"), current["memory"].get("peak_mb")
+    if b and c and c > b * (1 + rss_threshold):
+        regressions.append(f"server peak RSS {b:.0f}MB -> {c:.0f}MB ({(c - b) / b:+.0%})")
+    b = baseline.get("jobs", {}).get("outcomes", {}).get("completed", 0) / max(1, baseline.get("jobs", {}).get("count", 0))
+    c = current["jobs"]["outcomes"].get("completed", 0) / max(1, current["jobs"]["count"])
+    if c < b:
+        regressions.append(f"jobs completed {b:.0%} -> {c:.0%}")
+    return regressions
+
+
+def run(args) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="video2ac-load-"))
+    fake = FakeOpenAIServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, stories=args.stories, seed=args.seed)
+    fake.start()
+    proc = None
+    try:
+        video, recording = _make_video(workdir, args)
+        port = _free_port()
+        proc = _start_server(workdir, fake.base_url, port, workdir / "server.log")
+        sampler = RssSampler(proc.pid)
+        sampler.start()
+        test = LoadTest(f"http://127.0.0.1:{port}", video, args)
+        wall_s = asyncio.run(test.run())
+        memory = sampler.stop()
+        result = test.report()
+        requests = sum(r["count"] for r in result["routes"].values())
+        errors = sum(r["errors"] for r in result["routes"].values())
+        return {
+            "schema": SCHEMA_VERSION,
+            "meta": {
+                "revision": _git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "params": {k: v for k, v in vars(args).items() if k not in ("serve", "out", "baseline", "no_baseline")},
+                "recording": recording,
+                "fake_openai": {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, **fake.stats},
+            },
+            "wall_s": round(wall_s, 2),
+            "requests": requests,
+            "errors": errors,
+            "error_rate": round(errors / requests, 4) if requests else None,
+            "throughput_rps": round(requests / wall_s, 2) if wall_s > 0 else None,
+            "memory": memory,
+            **result,
+        }
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        fake.stop()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _print_summary(result: dict) -> None:
+    print(f"{'route':44} {'count':>6} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}", file=sys.stderr)
+    for route, r in result["routes"].items():
+        p = [f"{r[k]:9.1f}" if r[k] is not None else f"{'-':>9}" for k in ("p50_ms", "p95_ms", "p99_ms")]
+        print(f"{route:44} {r['count']:6d} {r['errors']:5d} {' '.join(p)}", file=sys.stderr)
+    m = result["memory"]
+    print(f"jobs {result['jobs']['outcomes']}  wall {result['wall_s']}s  {result['throughput_rps']} req/s  "
+          f"server RSS start/peak/end {m['start_mb']}/{m['peak_mb']}/{m['end_mb']} MB", file=sys.stderr)
+
+
+def main() -> None:
+    if len(sys.argv) == 5 and sys.argv[1] == "--serve":
+        serve(Path(sys.argv[2]), sys.argv[3], int(sys.argv[4]))
+        return
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=4, help="concurrent simulated users")
+    parser.add_argument("--iterations", type=int, default=1, help="upload/poll/export sessions per user")
+    parser.add_argument("--ramp-s", type=float, default=2.0, help="users start at random times within this window")
+    parser.add_argument("--poll", choices=("detail", "status"), default="detail",
+                        help="poll GET /api/jobs/{id} every --poll-interval-s, or long-poll /status?wait= like the UI")
+    parser.add_argument("--poll-interval-s", type=float, default=1.0)
+    parser.add_argument("--poll-wait-s", type=int, default=25, help="wait= for --poll status")
+    parser.add_argument("--screenshots", type=int, default=6, help="evidence thumbnails fetched per job")
+    parser.add_argument("--export-formats", nargs="+", default=["md", "json"])
+    parser.add_argument("--job-timeout-s", type=float, default=300.0)
+    parser.add_argument("--request-timeout-s", type=float, default=60.0)
+    parser.add_argument("--duration", type=float, default=30.0, help="recording length (s)")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=float, default=10.0)
+    parser.add_argument("--change-rate", type=float, default=0.2, help="screen changes per second")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="fake OpenAI latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--stories", type=int, default=5, help="user stories in fake spec replies")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory (server.log, DB, storage)")
+    parser.add_argument("--out", help="write JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help=f"earlier result to compare against; exit 1 on regression (default: {DEFAULT_BASELINE.relative_to(DEFAULT_BASELINE.parents[2])})")
+    parser.add_argument("--no-baseline", action="store_true", help="don't compare (e.g. when recording a baseline)")
+    parser.add_argument("--latency-threshold", type=float, default=0.25, help="allowed relative p95 increase")
+    parser.add_argument("--min-latency-ms", type=float, default=20.0, help="ignore p95 increases smaller than this")
+    parser.add_argument("--error-rate-slack", type=float, default=0.01, help="allowed absolute error-rate increase")
+    parser.add_argument("--rss-threshold", type=float, default=0.25, help="allowed relative peak RSS increase")
+    args = parser.parse_args()
+
+    result = run(args)
+    text = json.dumps(result, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+    _print_summary(result)
+    baseline_path = None if args.no_baseline else Path(args.baseline) if args.baseline else DEFAULT_BASELINE
+    if baseline_path is not None:
+        baseline = json.loads(baseline_path.read_text())
+        for diff in param_differences(baseline, result["meta"]["params"]):
+            print(f"note: {diff}", file=sys.stderr)
+        regressions = compare(baseline, result, args.latency_threshold,
+                              args.min_latency_ms, args.error_rate_slack, args.rss_threshold)
+        if regressions:
+            print(f"\nREGRESSIONS against {baseline_path}:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            raise SystemExit(1)
+        print(f"\nno regressions against {baseline_path}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""API latency while large videos go through the media stage, in-process vs in media worker processes.
+
+For each configuration (`media_workers=0`, the stage in the pipeline thread inside the API process;
+then `--media-workers N`) starts the real app under uvicorn (as benchmarks.loadtest does) and:
+
+1. idle: `--probers` clients send light requests back to back for `--idle-s` seconds;
+2. loaded: `--videos` large recordings are uploaded at once and the probers keep going until every
+   job has left the media stage.
+
+Probe requests are GET /api/health, GET /api/jobs?limit=20 and GET /api/jobs/{id}/status. The
+report gives their p50/p95/p99 per phase, the time each job spent reaching the end of its media
+stage, and the server's RSS. Exit code 1 when, with media workers:
+
+- the loaded p99 exceeds the idle p99 by more than `--latency-threshold` (and `--min-latency-ms`);
+- the loaded p99 exceeds the in-process loaded p99 by more than `--max-ratio` (and
+  `--min-latency-ms`): the workers must not make the API slower than running media in-process;
+- any upload, job or probe request fails.
+
+The latency checks need a core for the API besides the workers: with fewer than
+`--media-workers` + 1 cores they are skipped ("skipped_checks" in the report, SKIP on stderr).
+
+    cd backend
+    python -m benchmarks.media_isolation --videos 4 --duration 60 --width 1920 --height 1080
+
+Needs `ffmpeg` on PATH (audio extraction is part of the media stage). Run on an otherwise quiet
+machine. benchmarks/baselines/media_isolation.json is a run on a single core, where the latency
+checks were skipped (the machine is in "meta"); tests/test_media_isolation.py enforces them where
+there are enough cores.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.loadtest import DONE_STATUSES, RssSampler, _free_port, _percentile, _start_server
+from benchmarks.synthetic import RecordingSpec, write_recording
+
+
+def _past_media(progress: dict) -> bool:
+    stage = progress.get("current_stage")
+    return progress.get("status") in DONE_STATUSES or bool(stage and stage != "media")
+
+
+class Probe:
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.latencies: dict[str, list[float]] = {"idle": [], "loaded": []}
+        self.errors = 0
+        self.phase = "idle"
+        self.job_ids: list[str] = []
+        self.progress: dict[str, dict] = {}
+        self._stop = asyncio.Event()
+
+    async def _get(self, url: str, **params) -> httpx.Response | None:
+        start = time.perf_counter()
+        try:
+            resp = await self.client.get(url, params=params)
+        except httpx.HTTPError:
+            resp = None
+        self.latencies[self.phase].append(time.perf_counter() - start)
+        if resp is None or resp.status_code != 200:
+            self.errors += 1
+            return None
+        return resp
+
+    async def run(self, worker: int) -> None:
+        n = worker
+        while not self._stop.is_set():
+            await self._get("/api/health")
+            await self._get("/api/jobs", limit=20)
+            if self.job_ids:
+                job_id = self.job_ids[n % len(self.job_ids)]
+                resp = await self._get(f"/api/jobs/{job_id}/status")
+                if resp is not None:
+                    self.progress[job_id] = resp.json()
+                n += 1
+            await asyncio.sleep(0.01)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+async def _scenario(base_url: str, video_bytes: bytes, args) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout_s) as client:
+        probe = Probe(client)
+        probers = [asyncio.create_task(probe.run(i)) for i in range(args.probers)]
+        await asyncio.sleep(args.idle_s)
+
+        probe.phase = "loaded"
+        started = time.monotonic()
+        uploads = await asyncio.gather(*(
+            client.post("/api/jobs", files={"video": ("large.mp4", video_bytes, "video/mp4")}) for _ in range(args.videos)
+        ))
+        probe.job_ids = [r.json()["id"] for r in uploads if r.status_code == 200]
+        past_media: dict[str, float] = {}
+        deadline = started + args.job_timeout_s
+        while len(past_media) < len(probe.job_ids) and time.monotonic() < deadline:
+            for job_id in probe.job_ids:
+                if job_id not in past_media and _past_media(probe.progress.get(job_id, {})):
+                    past_media[job_id] = round(time.monotonic() - started, 2)
+            await asyncio.sleep(0.2)
+        loaded_s = time.monotonic() - started
+        probe.stop()
+        await asyncio.gather(*probers)
+
+    phases = {}
+    for phase, values in probe.latencies.items():
+        ms = [v * 1000 for v in values]
+        phases[phase] = {
+            "requests": len(ms),
+            **{f"p{int(q * 100)}_ms": round(_percentile(ms, q), 1) if ms else None for q in (0.5, 0.95, 0.99)},
+        }
+    phases["idle"]["seconds"] = args.idle_s
+    phases["loaded"]["seconds"] = round(loaded_s, 2)
+    failed = [j for j in probe.job_ids if probe.progress.get(j, {}).get("status") == "failed"]
+    return {
+        "phases": phases,
+        "probe_errors": probe.errors,
+        "uploads_failed": args.videos - len(probe.job_ids),
+        "jobs_past_media_s": sorted(past_media.values()),
+        "jobs_timed_out": len(probe.job_ids) - len(past_media),
+        "jobs_failed": len(failed),
+        "errors": sorted({probe.progress[j].get("error_message") or "" for j in failed}),
+    }
+
+
+def run_config(media_workers: int, video: Path, fake: FakeOpenAIServer, args) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="video2ac-media-"))
+    port = _free_port()
+    env = {"MEDIA_WORKERS": str(media_workers), "MEDIA_WORKER_NICE": str(args.nice), "MEDIA_WORKER_MEMORY_MB": str(args.memory_mb)}
+    proc = _start_server(workdir, fake.base_url, port, workdir / "server.log", env=env)
+    try:
+        sampler = RssSampler(proc.pid)
+        sampler.start()
+        result = asyncio.run(_scenario(f"http://127.0.0.1:{port}", video.read_bytes(), args))
+        result["server_rss"] = sampler.stop()
+        return {"media_workers": media_workers, **result}
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def check(results: dict, media_workers: int, args) -> tuple[list[str], list[str]]:
+    """(problems, skipped checks) of the media-worker configuration: latency, job outcomes and errors."""
+    problems, skipped = [], []
+    result = results[f"media_workers={media_workers}"]
+    phases = result["phases"]
+    idle, loaded = phases["idle"]["p99_ms"], phases["loaded"]["p99_ms"]
+    if idle is None or loaded is None:
+        return ["no probe requests recorded"], skipped
+    cores = os.cpu_count() or 1
+    in_process = results.get("media_workers=0")
+    if cores < media_workers + 1:
+        # The API then shares a core with the workers (and their interpreter start-up): nothing to isolate
+        skipped.append(f"latency: {cores} cores < media_workers + 1 = {media_workers + 1}, the API has no core of its own")
+    else:
+        if loaded > idle * (1 + args.latency_threshold) and loaded - idle > args.min_latency_ms:
+            problems.append(f"p99 {idle:.1f} ms idle -> {loaded:.1f} ms while processing videos")
+        baseline = in_process["phases"]["loaded"]["p99_ms"] if in_process else None
+        if in_process is None:
+            skipped.append("in-process ratio: --skip-in-process")
+        elif baseline is not None and loaded > baseline * args.max_ratio and loaded - baseline > args.min_latency_ms:
+            problems.append(f"loaded p99 {loaded:.1f} ms with media workers vs {baseline:.1f} ms in-process (max ratio {args.max_ratio})")
+    if result["jobs_timed_out"] or result["uploads_failed"]:
+        problems.append(f"{result['uploads_failed']} uploads failed, {result['jobs_timed_out']} jobs never left the media stage")
+    if result["jobs_failed"]:
+        problems.append(f"{result['jobs_failed']} jobs failed: {'; '.join(result['errors'])}")
+    if result["probe_errors"]:
+        problems.append(f"{result['probe_errors']} probe requests failed")
+    return problems, skipped
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=4, help="large recordings uploaded at once")
+    parser.add_argument("--media-workers", type=int, default=2)
+    parser.add_argument("--nice", type=int, default=10, help="MEDIA_WORKER_NICE")
+    parser.add_argument("--memory-mb", type=int, default=4096, help="MEDIA_WORKER_MEMORY_MB")
+    parser.add_argument("--skip-in-process", action="store_true", help="only run the media-worker configuration")
+    parser.add_argument("--probers", type=int, default=4, help="concurrent probe clients")
+    parser.add_argument("--idle-s", type=float, default=10.0)
+    parser.add_argument("--job-timeout-s", type=float, default=600.0)
+    parser.add_argument("--request-timeout-s", type=float, default=60.0)
+    parser.add_argument("--duration", type=float, default=60.0, help="recording length (s)")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--fps", type=float, default=15.0)
+    parser.add_argument("--change-rate", type=float, default=0.5, help="screen changes per second")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="fake OpenAI latency per call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-threshold", type=float, default=0.5, help="allowed relative p99 increase under load")
+    parser.add_argument("--max-ratio", type=float, default=1.0, help="allowed loaded p99 with media workers / in-process")
+    parser.add_argument("--min-latency-ms", type=float, default=20.0, help="ignore p99 increases smaller than this")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directories (server.log, DB, storage)")
+    parser.add_argument("--out", help="write JSON results here (default: stdout)")
+    args = parser.parse_args()
+
+    scratch = Path(tempfile.mkdtemp(prefix="video2ac-media-video-"))
+    fake = FakeOpenAIServer(latency_ms=args.latency_ms, seed=args.seed)
+    fake.start()
+    try:
+        video = scratch / "large.mp4"
+        spec = RecordingSpec(args.duration, args.width, args.height, args.fps, args.change_rate, args.seed)
+        recording = {**vars(spec), **write_recording(video, spec), "bytes": video.stat().st_size}
+        configs = [] if args.skip_in_process else [0]
+        results = {f"media_workers={n}": run_config(n, video, fake, args) for n in [*configs, args.media_workers]}
+    finally:
+        fake.stop()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    problems, skipped = check(results, args.media_workers, args)
+    meta = {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(), "ffmpeg": shutil.which("ffmpeg")}
+    result = {"params": vars(args), "meta": meta, "recording": recording, "configs": results,
+              "problems": problems, "skipped_checks": skipped}
+    text = json.dumps(result, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+    print(f"{'config':18} {'phase':7} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  media stage done (s)", file=sys.stderr)
+    for name, r in results.items():
+        for phase, p in r["phases"].items():
+            cells = " ".join(f"{p[k]:8.1f}" if p[k] is not None else f"{'-':>8}" for k in ("p50_ms", "p95_ms", "p99_ms"))
+            done = r["jobs_past_media_s"] if phase == "loaded" else ""
+            print(f"{name:18} {phase:7} {p['requests']:8d} {cells}  {done}", file=sys.stderr)
+    for name in skipped:
+        print(f"SKIP {name}", file=sys.stderr)
+    for problem in problems:
+        print(f"FAIL {problem}", file=sys.stderr)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
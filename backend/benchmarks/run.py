@@ -0,0 +1,238 @@
+"""Stage-level pipeline benchmarks against synthetic recordings and a fake OpenAI server.
+
+Runs capture_screenshots, describe_screenshots, build_grounded_chunks, _build_context,
+extract_spec, generate_acceptance_criteria and (when ffmpeg is available) process_job end to
+end, and writes wall time, CPU time, memory and throughput per stage as JSON:
+
+    cd backend
+    python -m benchmarks.run --duration 120 --width 1280 --height 720 --fps 10 \\
+        --change-rate 0.2 --latency-ms 300 --out bench.json
+    python -m benchmarks.compare baseline.json bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.synthetic import RecordingSpec, make_transcript, mux_audio, write_narration_wav, write_recording
+
+SCHEMA_VERSION = 1
+
+
+def _rss_mb() -> float:
+    """Current resident set size (Linux /proc), falling back to the peak from getrusage."""
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, IndexError):
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3  # bytes on macOS, KiB elsewhere
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(fn, items_fn=None, unit: str = "items", repeat: int = 1, setup=None) -> dict:
+    """Run fn `repeat` times; report median wall/CPU time, Python heap peak, RSS and throughput."""
+    walls, cpus, heap_peaks, rss_deltas = [], [], [], []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        rss_before = _rss_mb()
+        tracemalloc.start()
+        cpu0, t0 = time.process_time(), time.perf_counter()
+        fn()
+        walls.append(time.perf_counter() - t0)
+        cpus.append(time.process_time() - cpu0)
+        heap_peaks.append(tracemalloc.get_traced_memory()[1] / 1e6)
+        tracemalloc.stop()
+        rss_deltas.append(_rss_mb() - rss_before)
+    wall = statistics.median(walls)
+    items = items_fn() if items_fn else None
+    return {
+        "wall_s": round(wall, 4),
+        "wall_s_runs": [round(w, 4) for w in walls],
+        "cpu_s": round(statistics.median(cpus), 4),
+        "py_heap_peak_mb": round(max(heap_peaks), 2),
+        "rss_delta_mb": round(max(rss_deltas), 2),
+        "rss_peak_mb": round(_peak_rss_mb(), 2),
+        "items": items,
+        "unit": unit,
+        "throughput_per_s": round(items / wall, 3) if items and wall > 0 else None,
+    }
+
+
+def _configure_app(workdir: Path, base_url: str) -> None:
+    """Point the app at scratch storage, a scratch DB and the fake server before app modules read them."""
+    import app.config  # loads .env (override=True); re-assert our values afterwards
+
+    os.environ["STORAGE_ROOT"] = str(workdir / "storage")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'bench.db'}"
+    app.config.settings.storage_root = workdir / "storage"
+    app.config.settings.openai_api_key = "sk-bench-0000000000000000"
+    app.config.settings.openai_base_url = base_url
+
+
+def run(args) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="video2ac-bench-"))
+    server = FakeOpenAIServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, stories=args.stories, seed=args.seed)
+    server.start()
+    try:
+        _configure_app(workdir, server.base_url)
+        from app.database import SessionLocal, get_engine
+        from app.migrations import run_migrations
+        from app.models import Job
+        from app.services.acceptance_criteria import generate_acceptance_criteria
+        from app.services.grounding import build_grounded_chunks
+        from app.services.media import capture_screenshots
+        from app.services.spec_extraction import _build_context, extract_spec
+        from app.services.vision import describe_screenshots
+
+        spec = RecordingSpec(args.duration, args.width, args.height, args.fps, args.change_rate, args.seed)
+        job_dir = workdir / "storage" / "jobs" / "bench"
+        screens = job_dir / "screenshots"
+        screens.mkdir(parents=True)
+        video = workdir / "recording.mp4"
+        t0 = time.perf_counter()
+        rec_stats = write_recording(video, spec)
+        synth_s = time.perf_counter() - t0
+        (job_dir / "transcript.json").write_text(json.dumps(make_transcript(args.duration, seed=args.seed)))
+
+        def manifest_len() -> int:
+            return len(json.loads((screens / "manifest.json").read_text()))
+
+        def reset_screens():
+            shutil.rmtree(screens, ignore_errors=True)
+            screens.mkdir()
+
+        def reset_vision():
+            shutil.rmtree(job_dir / "cache", ignore_errors=True)
+
+        grounded = job_dir / "grounded_chunks.json"
+        stages = {}
+        stages["capture_screenshots"] = measure(
+            lambda: capture_screenshots(str(video), str(screens)),
+            items_fn=lambda: rec_stats["frames"], unit="frames", repeat=args.repeat, setup=reset_screens,
+        )
+        stages["capture_screenshots"]["screenshots"] = manifest_len()
+        stages["describe_screenshots"] = measure(
+            lambda: describe_screenshots(job_dir), items_fn=manifest_len, unit="screenshots",
+            repeat=args.repeat, setup=reset_vision,
+        )
+        stages["build_grounded_chunks"] = measure(
+            lambda: build_grounded_chunks(job_dir, str(grounded)), items_fn=manifest_len, unit="chunks",
+            repeat=args.repeat,
+        )
+        context = {}
+        stages["_build_context"] = measure(
+            lambda: context.update(text=_build_context(str(grounded), transcript_path=job_dir / "transcript.json")),
+            items_fn=manifest_len, unit="chunks", repeat=args.repeat,
+        )
+        stages["_build_context"]["context_chars"] = len(context["text"])
+        stages["extract_spec"] = measure(
+            lambda: extract_spec(str(grounded), str(job_dir / "spec.json"), transcript_path=job_dir / "transcript.json"),
+            items_fn=lambda: 1, unit="calls", repeat=args.repeat,
+        )
+        stages["generate_acceptance_criteria"] = measure(
+            lambda: generate_acceptance_criteria(str(job_dir / "spec.json"), str(job_dir / "acceptance_criteria.json"), job_dir),
+            items_fn=lambda: args.stories, unit="stories", repeat=args.repeat,
+        )
+
+        skipped = {}
+        if args.skip_e2e:
+            skipped["process_job"] = "--skip-e2e"
+        elif not shutil.which("ffmpeg"):
+            skipped["process_job"] = "ffmpeg not on PATH"
+        else:
+            from app.workers.pipeline import process_job
+
+            run_migrations(get_engine())
+            narration = workdir / "narration.wav"
+            write_narration_wav(narration, args.duration, seed=args.seed)
+            muxed = workdir / "recording_av.mp4"
+            mux_audio(video, narration, muxed)
+
+            def e2e_setup():
+                job_id = str(uuid.uuid4())
+                d = workdir / "storage" / "jobs" / job_id
+                d.mkdir(parents=True)
+                shutil.copy(muxed, d / "video.mp4")
+                with SessionLocal() as db:
+                    db.add(Job(id=job_id, status="pending", video_path=str(d / "video.mp4")))
+                    db.commit()
+                e2e_setup.job_id = job_id
+
+            stages["process_job"] = measure(
+                lambda: process_job(e2e_setup.job_id), items_fn=lambda: args.duration, unit="video_seconds",
+                repeat=args.repeat, setup=e2e_setup,
+            )
+            with SessionLocal() as db:
+                job = db.query(Job).filter(Job.id == e2e_setup.job_id).first()
+                stages["process_job"]["status"] = job.status
+                stages["process_job"]["error"] = job.error_message
+
+        return {
+            "schema": SCHEMA_VERSION,
+            "meta": {
+                "revision": _git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "recording": {**vars(spec), **rec_stats, "synthesis_s": round(synth_s, 3)},
+                "fake_openai": {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, **server.stats},
+                "repeat": args.repeat,
+            },
+            "stages": stages,
+            "skipped": skipped,
+        }
+    finally:
+        server.stop()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=60.0, help="recording length (s)")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=float, default=10.0)
+    parser.add_argument("--change-rate", type=float, default=0.2, help="screen changes per second")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="fake OpenAI latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--stories", type=int, default=5, help="user stories in fake spec replies")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per stage (median reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-e2e", action="store_true", help="skip process_job end to end")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    parser.add_argument("--out", help="write JSON results here (default: stdout)")
+    args = parser.parse_args()
+    result = json.dumps(run(args), indent=2)
+    if args.out:
+        Path(args.out).write_text(result + "\n")
+    else:
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""SQLite concurrency check: N simulated pipelines committing while API readers poll the same DB.
+
+Each pipeline runs the real `process_job` (claim, per-stage checkpoint commits, completion) with
+stage runners replaced by short sleeps that write the stage outputs, so the write pattern matches
+production without ffmpeg or OpenAI. Reader threads hit the job list, job detail and status
+routes through the ASGI app meanwhile (as asyncio tasks on one loop, like a server worker). Exits 1 if any pipeline fails or any read errors
+(e.g. "database is locked"):
+
+    cd backend
+    python -m benchmarks.sqlite_concurrency --pipelines 8 --readers 8 --stage-ms 100
+    python -m benchmarks.sqlite_concurrency --journal-mode DELETE   # compare with rollback journal
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def _configure_app(workdir: Path, args) -> None:
+    import app.config  # loads .env (override=True); re-assert our values afterwards
+
+    os.environ["STORAGE_ROOT"] = str(workdir / "storage")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'concurrency.db'}"
+    s = app.config.settings
+    s.storage_root = workdir / "storage"
+    if args.journal_mode:
+        s.sqlite_journal_mode = args.journal_mode
+    if args.busy_timeout_ms is not None:
+        s.sqlite_busy_timeout_ms = args.busy_timeout_ms
+
+
+def _simulated_runners(stage_ms: float, rng: random.Random):
+    """Stage runners that sleep and then write the stage's outputs, like the real ones."""
+    from app.workers import pipeline
+
+    lock = threading.Lock()
+
+    def make(stage):
+        def run(job, job_dir):
+            with lock:
+                delay = stage_ms * rng.uniform(0.5, 1.5) / 1000
+            time.sleep(delay)
+            for out in pipeline._stage_io(stage, job_dir)[1]:
+                if out.suffix:
+                    out.parent.mkdir(parents=True, exist_ok=True)
+                    # Shaped like the real artifacts (completion indexes the manifest and transcript)
+                    data = [] if out.name == "manifest.json" else {"stage": stage, "segments": [], "user_stories": []}
+                    out.write_text(json.dumps(data))
+                else:
+                    out.mkdir(parents=True, exist_ok=True)
+            if stage == "spec":
+                job.spec = {"feature_summary": "simulated", "user_stories": []}
+        return run
+
+    return {stage: make(stage) for stage in pipeline.STAGES}
+
+
+def run(args) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="video2ac-sqlite-"))
+    _configure_app(workdir, args)
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from app.config import settings
+    from app.database import SessionLocal, get_engine
+    from app.main import app
+    from app.models import Job
+    from app.workers import pipeline
+
+    engine = get_engine()
+    commits = [0]
+    event.listen(engine, "commit", lambda conn: commits.__setitem__(0, commits[0] + 1))
+    pipeline._STAGE_RUNNERS.update(_simulated_runners(args.stage_ms, random.Random(args.seed)))
+
+    job_ids = []
+    with TestClient(app):  # runs the lifespan once: migrations, storage dirs
+        for _ in range(args.pipelines):
+            job_id = str(uuid.uuid4())
+            job_dir = settings.storage_root / "jobs" / job_id
+            job_dir.mkdir(parents=True)
+            (job_dir / "video.mp4").write_bytes(b"\0" * 1024)
+            with SessionLocal() as db:
+                db.add(Job(id=job_id, status="pending", video_path=str(job_dir / "video.mp4")))
+                db.commit()
+            job_ids.append(job_id)
+    commits[0] = 0
+
+    stop = threading.Event()
+    latencies: dict[str, list[float]] = {"list": [], "detail": [], "status": []}
+    errors: list[str] = []
+
+    async def reader(client, seed: int):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            job_id = rng.choice(job_ids)
+            route, url = rng.choice((
+                ("list", "/api/jobs?limit=20"),
+                ("detail", f"/api/jobs/{job_id}"),
+                ("status", f"/api/jobs/{job_id}/status"),
+            ))
+            start = time.perf_counter()
+            try:
+                resp = await client.get(url)
+                ok = resp.status_code in (200, 304)
+                detail = f"{route} {resp.status_code} {resp.text[:200]}"
+            except Exception as e:
+                ok, detail = False, f"{route} {type(e).__name__}: {e}"
+            latencies[route].append(time.perf_counter() - start)
+            if not ok:
+                errors.append(detail)
+
+    async def read_load():
+        # One event loop for all readers, as in a server process (the async engine is bound to its loop)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await asyncio.gather(*(reader(client, args.seed + i) for i in range(args.readers)))
+
+    readers = threading.Thread(target=asyncio.run, args=(read_load(),), daemon=True)
+    pipelines = [threading.Thread(target=pipeline.process_job, args=(job_id,)) for job_id in job_ids]
+    readers.start()
+    start = time.perf_counter()
+    for t in pipelines:
+        t.start()
+    for t in pipelines:
+        t.join()
+    pipelines_s = time.perf_counter() - start
+    stop.set()
+    readers.join()
+
+    with SessionLocal() as db:
+        rows = db.query(Job.id, Job.status, Job.error_message).filter(Job.id.in_(job_ids)).all()
+    failed = [{"id": r.id, "status": r.status, "error": r.error_message} for r in rows if r.status != "completed"]
+    with engine.connect() as conn:
+        journal_mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+
+    all_reads = [v for vs in latencies.values() for v in vs]
+    return {
+        "params": {**vars(args), "journal_mode": journal_mode},
+        "pipelines": {
+            "count": args.pipelines,
+            "wall_s": round(pipelines_s, 3),
+            "failed": failed,
+            "commits": commits[0],
+            "commits_per_job": round(commits[0] / max(1, args.pipelines), 1),
+        },
+        "reads": {
+            "count": len(all_reads),
+            "errors": len(errors),
+            "error_samples": errors[:5],
+            "per_route_ms": {
+                route: {
+                    "count": len(vs),
+                    "p50": round(1000 * statistics.median(vs), 2) if vs else None,
+                    "p95": round(1000 * _percentile(vs, 0.95), 2) if vs else None,
+                    "max": round(1000 * max(vs), 2) if vs else None,
+                }
+                for route, vs in latencies.items()
+            },
+        },
+        "ok": not failed and not errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pipelines", type=int, default=8, help="concurrent simulated pipelines")
+    parser.add_argument("--readers", type=int, default=8, help="concurrent API reader threads")
+    parser.add_argument("--stage-ms", type=float, default=100.0, help="mean simulated stage duration")
+    parser.add_argument("--journal-mode", help="override sqlite_journal_mode (e.g. DELETE to compare)")
+    parser.add_argument("--busy-timeout-ms", type=int, help="override sqlite_busy_timeout_ms")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write JSON results here (default: stdout)")
+    args = parser.parse_args()
+    result = run(args)
+    text = json.dumps(result, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+    raise SystemExit(0 if result["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Synthetic inputs for benchmarks: screen-recording-like videos, narration audio and transcripts."""
+import random
+import shutil
+import subprocess
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+WORDS = (
+    "click the approve button then open the request details and check the status "
+    "the manager sees pending approvals in the dashboard filter by date and export "
+    "when the form is invalid an error banner appears and the save button is disabled"
+).split()
+
+
+@dataclass
+class RecordingSpec:
+    duration_s: float = 60.0
+    width: int = 1280
+    height: int = 720
+    fps: float = 10.0
+    change_rate: float = 0.2  # "screen changes" (new page/modal) per second
+    seed: int = 0
+
+
+def _draw_screen(rng: random.Random, width: int, height: int) -> np.ndarray:
+    """A fake app screen: header bar, sidebar and a few panels/buttons with text."""
+    frame = np.full((height, width, 3), 245, dtype=np.uint8)
+    accent = tuple(rng.randint(40, 200) for _ in range(3))
+    cv2.rectangle(frame, (0, 0), (width, height // 12), accent, -1)
+    cv2.rectangle(frame, (0, height // 12), (width // 6, height), (225, 225, 225), -1)
+    for _ in range(rng.randint(3, 8)):
+        x = rng.randint(width // 6 + 10, width - 120)
+        y = rng.randint(height // 12 + 10, height - 60)
+        w = rng.randint(80, max(81, width // 3))
+        h = rng.randint(30, max(31, height // 4))
+        color = tuple(rng.randint(150, 255) for _ in range(3))
+        cv2.rectangle(frame, (x, y), (min(x + w, width - 1), min(y + h, height - 1)), color, -1)
+        label = " ".join(rng.choice(WORDS) for _ in range(2))
+        cv2.putText(frame, label, (x + 5, y + 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (30, 30, 30), 1)
+    return frame
+
+
+def write_recording(path: Path, spec: RecordingSpec) -> dict:
+    """Write an MP4 (mp4v) that alternates static screens with a moving cursor; returns stats."""
+    rng = random.Random(spec.seed)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), spec.fps, (spec.width, spec.height))
+    if not writer.isOpened():
+        raise RuntimeError(f"cv2.VideoWriter could not open {path}")
+    n_frames = int(spec.duration_s * spec.fps)
+    change_p = min(spec.change_rate / spec.fps, 1.0)
+    screen = _draw_screen(rng, spec.width, spec.height)
+    changes = 0
+    cx, cy = spec.width // 2, spec.height // 2
+    for _ in range(n_frames):
+        if rng.random() < change_p:
+            screen = _draw_screen(rng, spec.width, spec.height)
+            changes += 1
+        frame = screen.copy()
+        cx = min(max(cx + rng.randint(-8, 8), 0), spec.width - 1)
+        cy = min(max(cy + rng.randint(-8, 8), 0), spec.height - 1)
+        cv2.circle(frame, (cx, cy), 6, (0, 0, 0), -1)
+        writer.write(frame)
+    writer.release()
+    return {"frames": n_frames, "screen_changes": changes}
+
+
+def write_narration_wav(path: Path, duration_s: float, seed: int = 0, speech_ratio: float = 0.6) -> None:
+    """16 kHz mono PCM: tone bursts ("speech") separated by near-silence."""
+    rng = np.random.default_rng(seed)
+    sr = 16000
+    samples = np.zeros(int(duration_s * sr), dtype=np.float32)
+    t = 0
+    while t < len(samples):
+        burst = int(rng.uniform(0.5, 3.0) * sr)
+        if rng.random() < speech_ratio:
+            n = min(burst, len(samples) - t)
+            freq = rng.uniform(120, 300)
+            samples[t:t + n] = 0.3 * np.sin(2 * np.pi * freq * np.arange(n) / sr)
+        t += burst
+    samples += rng.normal(0, 0.002, len(samples)).astype(np.float32)
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes(pcm.tobytes())
+
+
+def mux_audio(video_path: Path, audio_path: Path, out_path: Path) -> bool:
+    """Mux narration into the recording with ffmpeg; False when ffmpeg is unavailable."""
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        return False
+    subprocess.run(
+        [ffmpeg, "-y", "-i", str(video_path), "-i", str(audio_path), "-c:v", "copy", "-c:a", "aac", "-shortest", str(out_path)],
+        check=True,
+        capture_output=True,
+    )
+    return True
+
+
+def make_transcript(duration_s: float, segment_s: float = 4.0, seed: int = 0) -> dict:
+    """transcript.json payload with a segment every `segment_s` seconds."""
+    rng = random.Random(seed)
+    segments = []
+    t = 0.0
+    while t < duration_s:
+        end = min(t + segment_s, duration_s)
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20)))
+        segments.append({"start": round(t, 2), "end": round(end, 2), "text": text})
+        t = end
+    return {"segments": segments}
@@ -0,0 +1,140 @@
+"""Silence trimming (app.services.vad) on synthetic narration: speed, savings and timestamp mapping.
+
+Writes a narration WAV (tone bursts separated by near-silence, as benchmarks.run muxes into its
+recordings), runs `trim_silence` on it and reports wall/CPU time, audio seconds per second and
+how much audio would be sent to Whisper. Then checks `VoicedAudio.to_original` the way the
+transcription stage uses it: every seam between two voiced regions must map to the next region's
+start as a segment start and to the previous region's end as a segment end, and segments laid
+over the trimmed audio must map to non-empty, ordered ranges inside the voiced regions. Then runs
+fixed cases (a long capture with a few seconds of narration, a quiet microphone, silence): each
+must either keep all of its speech or send the original audio. Exits 1 on any error:
+
+    cd backend
+    python -m benchmarks.vad --duration 600 --speech-ratio 0.5
+"""
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.synthetic import write_narration_wav
+
+
+def check_mapping(voiced, segment_s: float) -> list[str]:
+    """Mapping errors of voiced.to_original at region seams and over consecutive segments."""
+    problems = []
+    rate, regions = voiced.rate, voiced.regions
+    seam = 0
+    for (prev_start, prev_end), (next_start, _) in zip(regions, regions[1:]):
+        seam += prev_end - prev_start
+        t = seam / rate
+        if abs(voiced.to_original(t, end=True) - prev_end / rate) > 1e-6:
+            problems.append(f"end at seam {t:.3f}s -> {voiced.to_original(t, end=True):.3f}s, not {prev_end / rate:.3f}s")
+        if abs(voiced.to_original(t) - next_start / rate) > 1e-6:
+            problems.append(f"start at seam {t:.3f}s -> {voiced.to_original(t):.3f}s, not {next_start / rate:.3f}s")
+    bounds = [(a / rate, b / rate) for a, b in regions]
+    t, last_end = 0.0, 0.0
+    while t < voiced.voiced_s:
+        start, end = voiced.to_original(t), voiced.to_original(min(t + segment_s, voiced.voiced_s), end=True)
+        if end < start or start < last_end - 1e-6:
+            problems.append(f"segment {t:.3f}s -> [{start:.3f}, {end:.3f}] after {last_end:.3f}")
+        if not any(a - 1e-6 <= start <= b + 1e-6 for a, b in bounds) or not any(a - 1e-6 <= end <= b + 1e-6 for a, b in bounds):
+            problems.append(f"segment {t:.3f}s -> [{start:.3f}, {end:.3f}] outside the voiced regions")
+        last_end = end
+        t += segment_s
+    return problems
+
+
+# name -> (duration s, speech (start, end) s, speech amplitude, noise amplitude)
+SPEECH_CASES = {
+    "sparse": (90.0, [(40.0, 45.0)], 0.3, 0.0005),  # 5 s of normal narration in a 90 s screen capture
+    "quiet_mic": (60.0, [(5.0, 12.0), (30.0, 38.0)], 0.003, 0.0003),
+    "silence": (30.0, [], 0.0, 0.002),
+}
+
+
+def _write_case(path: Path, duration_s: float, speech: list[tuple[float, float]], amplitude: float, noise: float) -> None:
+    sr = 16000
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0, noise, int(duration_s * sr)).astype(np.float32)
+    for a, b in speech:
+        n = int((b - a) * sr)
+        samples[int(a * sr):int(a * sr) + n] += amplitude * np.sin(2 * np.pi * 180 * np.arange(n) / sr)
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+
+
+def check_speech_cases(scratch: Path) -> tuple[dict, list[str]]:
+    """Run SPEECH_CASES; speech cut away (rather than the original audio sent) is a problem."""
+    from app.services.vad import trim_silence
+
+    report, problems = {}, []
+    for name, (duration_s, speech, amplitude, noise) in SPEECH_CASES.items():
+        wav = scratch / f"{name}.wav"
+        _write_case(wav, duration_s, speech, amplitude, noise)
+        voiced = trim_silence(wav, scratch / f"{name}.voiced.wav")
+        kept = [[round(a / voiced.rate, 2), round(b / voiced.rate, 2)] for a, b in voiced.regions] if voiced else None
+        report[name] = {"sent": "trimmed" if voiced else "original", "regions": kept}
+        for a, b in speech:
+            if kept is not None and not any(x <= a and b <= y for x, y in kept):
+                problems.append(f"{name}: speech {a}-{b}s cut (kept {kept})")
+    return report, problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=300.0, help="narration length (s)")
+    parser.add_argument("--speech-ratio", type=float, default=0.6, help="share of bursts that are voiced")
+    parser.add_argument("--segment-s", type=float, default=2.0, help="length of the segments laid over the trimmed audio")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write JSON results here (default: stdout)")
+    args = parser.parse_args()
+
+    from app.services.vad import trim_silence
+
+    scratch = Path(tempfile.mkdtemp(prefix="video2ac-vad-"))
+    try:
+        wav = scratch / "audio.wav"
+        write_narration_wav(wav, args.duration, seed=args.seed, speech_ratio=args.speech_ratio)
+        wall, cpu = time.perf_counter(), time.process_time()
+        voiced = trim_silence(wav, scratch / "audio.voiced.wav")
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        problems = check_mapping(voiced, args.segment_s) if voiced is not None else []
+        cases, case_problems = check_speech_cases(scratch)
+        problems += case_problems
+        result = {
+            "params": vars(args),
+            "wall_s": round(wall, 3),
+            "cpu_s": round(cpu, 3),
+            "audio_s_per_s": round(args.duration / wall, 1) if wall else None,
+            "trimmed": voiced is not None,
+            "original_s": round(voiced.original_s, 3) if voiced else args.duration,
+            "voiced_s": round(voiced.voiced_s, 3) if voiced else args.duration,
+            "regions": len(voiced.regions) if voiced else None,
+            "cases": cases,
+            "errors": problems,
+        }
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    text = json.dumps(result, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+    for problem in problems:
+        print(f"FAIL {problem}", file=sys.stderr)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Concurrent pipelines and API readers on one SQLite DB (benchmarks.sqlite_concurrency at a small N)."""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+def test_pipelines_and_readers_share_sqlite(tmp_path):
+    out = tmp_path / "result.json"
+    # Own process: the app binds its engine to DATABASE_URL at import, and the harness points it at a scratch DB
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.sqlite_concurrency", "--pipelines", "4", "--readers", "4", "--stage-ms", "20", "--out", str(out)],
+        cwd=BACKEND,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert out.exists(), proc.stderr[-2000:]
+    result = json.loads(out.read_text())
+
+    failed = result["pipelines"]["failed"]
+    reads = result["reads"]
+    locked = [e for e in reads["error_samples"] + [f["error"] or "" for f in failed] if "database is locked" in e]
+    assert not locked, locked
+    assert failed == [], failed
+    assert reads["errors"] == 0, reads["error_samples"]
+    assert reads["count"] > 0
+    assert result["ok"] and proc.returncode == 0
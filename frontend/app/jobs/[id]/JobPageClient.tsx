@@ -36,6 +36,7 @@ type JobResponse = {
   transcript_segments?: number | null;
   screenshots_captured?: number | null;
   screenshots_analyzed?: number | null;
+  current_stage?: string | null;
 };
 
 export default function JobPageClient() {
@@ -66,14 +67,28 @@ export default function JobPageClient() {
       try {
         const data = await fetchJob();
         if (cancelled) return;
+        setLoading(false);
         if (data?.status === "pending" || data?.status === "processing") {
-          const t = setInterval(async () => {
-            const d = await fetch(`${API_BASE}/api/jobs/${jobId}`).then((r) => r.json());
+          // Long-poll the compact status endpoint; fetch the full job only once it settles
+          let etag: string | null = null;
+          while (!cancelled) {
+            const res = await fetch(`${API_BASE}/api/jobs/${jobId}/status?wait=25`, {
+              headers: etag ? { "If-None-Match": etag } : {},
+            });
             if (cancelled) return;
-            setJob(d);
-            if (d.status !== "pending" && d.status !== "processing") clearInterval(t);
-          }, 2000);
-          return () => clearInterval(t);
+            if (res.status === 304) continue;
+            if (!res.ok) {
+              await new Promise((r) => setTimeout(r, 2000));
+              continue;
+            }
+            etag = res.headers.get("ETag");
+            const s: Partial<JobResponse> = await res.json();
+            setJob((prev) => (prev ? { ...prev, ...s } : prev));
+            if (s.status !== "pending" && s.status !== "processing") {
+              await fetchJob();
+              break;
+            }
+          }
         }
       } catch {
         if (!cancelled) setJob(null);
@@ -147,7 +162,7 @@ export default function JobPageClient() {
           </Link>
           <h1 className="text-2xl font-bold mb-2">Job {jobId.slice(0, 8)}</h1>
           <div className="flex items-center gap-4 text-sm text-muted-foreground">
-            <span className="font-medium">Status: {job.status}</span>
+            <span className="font-medium">Status: {job.status}{job.status === "processing" && job.current_stage ? ` (${job.current_stage})` : ""}</span>
             {isComplete && (job.transcript_segments != null || job.screenshots_captured != null || job.screenshots_analyzed != null) && (
               <>
                 <span>•</span>
@@ -273,7 +288,7 @@ export default function JobPageClient() {
                                       {ac.evidence_refs.map((r, j) => (
                                         <div key={j} className="flex items-start gap-3 text-xs text-muted-foreground">
                                           <img
-                                            src={`${API_BASE}/api/jobs/${jobId}/screenshots/${r.screenshot_id}`}
+                                            src={`${API_BASE}/api/jobs/${jobId}/screenshots/${r.screenshot_id}?w=320`}
                                             alt=""
                                             className="w-24 h-14 object-cover rounded border"
                                           />